@@ -1,20 +1,47 @@
 import os
 import uuid
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from typing import List
-import shutil
 
 # Karena struktur Vercel, kita perlu menyesuaikan cara impor
-from app import schemas, tasks
-from app.job_store import create_job, get_job_status, document_paths
+from app import document_store, schemas, warmup
+from app.admission import admit_request, get_admission, queue_full_error
+from app.config import settings
+from app.executor import PRIORITIES, QueueFullError, get_executor
+from app.job_store import get_job_status, get_document_path
 from app.ai_utils import parse_pdf, run_cv_evaluation, run_project_evaluation, run_final_summary
+from app.uploads import UploadSizeLimit, save_upload
 
-# Vercel menggunakan direktori /tmp untuk penyimpanan sementara
-UPLOAD_DIR = "/tmp/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-app = FastAPI(title="AI CV Evaluator API")
+# Vercel hanya mengizinkan penulisan ke /tmp
+DOCUMENT_STORE = document_store.DocumentStore(
+    "/tmp/documents", settings.DOCUMENT_TTL_SECONDS, settings.DOCUMENT_STORE_MAX_BYTES
+)
+# Job store dan cache LLM berbasis file dengan path relatif juga dipindah ke /tmp;
+# memory://, redis://, dan path absolut yang dikonfigurasi tetap dipakai.
+if settings.JOB_STORE_URL.startswith("sqlite:///") and not os.path.isabs(settings.JOB_STORE_URL[len("sqlite:///"):]):
+    settings.JOB_STORE_URL = "sqlite:////tmp/job_store.sqlite3"
+if settings.LLM_CACHE_PATH and not os.path.isabs(settings.LLM_CACHE_PATH):
+    settings.LLM_CACHE_PATH = "/tmp/llm_cache.sqlite3"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    executor = get_executor()
+    if settings.EXECUTOR_MODE != "external":
+        await executor.start()
+        await executor.recover()
+    # Referensi task disimpan: event loop hanya memegang weak reference ke task.
+    app.state.warmup_task = warmup.start_background_warmup() if settings.WARMUP_ON_STARTUP else None
+    gc_task = document_store.start_document_gc(DOCUMENT_STORE)
+    yield
+    if gc_task is not None:
+        gc_task.cancel()
+    if settings.EXECUTOR_MODE != "external":
+        await executor.drain(settings.EXECUTOR_DRAIN_TIMEOUT)
+
+app = FastAPI(title="AI CV Evaluator API", lifespan=lifespan)
 
 # Konfigurasi CORS agar frontend Anda bisa mengakses API ini
 app.add_middleware(
@@ -24,6 +51,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadSizeLimit)
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    serving = settings.EXECUTOR_MODE == "external" or get_executor().stats()["accepting"]
+    status = warmup.readiness(serving)
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
 @app.post("/upload")
 async def upload_files(
@@ -34,13 +72,7 @@ async def upload_files(
     files_to_process = {"cv": cv_file, "project_report": project_report_file}
 
     for doc_type, file in files_to_process.items():
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        document_paths[file_id] = file_path
+        file_id = await save_upload(file, DOCUMENT_STORE)
         uploaded_files.append(schemas.UploadResponseItem(
             file_name=file.filename, document_id=file_id, document_type=doc_type
         ))
@@ -49,26 +81,35 @@ async def upload_files(
 
 
 @app.post("/evaluate")
-def evaluate_candidate(
-    request: schemas.EvaluateRequest,
-    background_tasks: BackgroundTasks
-):
-    cv_path = document_paths.get(request.cv_document_id)
-    report_path = document_paths.get(request.project_report_id)
-
-    if not cv_path or not report_path or not os.path.exists(cv_path) or not os.path.exists(report_path):
+async def evaluate_candidate(request: schemas.EvaluateRequest, http_request: Request):
+    cv_path = get_document_path(request.cv_document_id)
+    report_path = get_document_path(request.project_report_id)
+    if not cv_path or not report_path:
         raise HTTPException(status_code=404, detail="One or both document files not found on the server.")
 
     job_id = str(uuid.uuid4())
-    create_job(job_id)
-
-    background_tasks.add_task(
-        tasks.process_evaluation_sync,
-        job_id=job_id,
-        cv_path=cv_path,
-        report_path=report_path,
-        job_title=request.job_title,
-    )
+    # Admission control yang sama dengan app.main: 429 + Retry-After, kuota per klien.
+    await admit_request(job_id, http_request)
+    if not document_store.acquire(job_id, cv_path, report_path):
+        get_admission().release(job_id)
+        raise HTTPException(status_code=404, detail="One or both document files not found on the server.")
+
+    task = {
+        "type": "evaluation",
+        "args": {
+            "cv_path": cv_path,
+            "report_path": report_path,
+            "job_title": request.job_title,
+            "use_cache": request.use_cache,
+        },
+    }
+
+    try:
+        await get_executor().enqueue(job_id, task, priority=PRIORITIES[request.priority])
+    except QueueFullError as e:
+        get_admission().release(job_id)
+        document_store.release(job_id, cv_path, report_path)
+        raise queue_full_error(e)
 
     return schemas.EvaluateResponse(id=job_id, status="queued")
 
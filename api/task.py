@@ -1,9 +1,27 @@
 # /app/tasks.py
-import os
+import asyncio
+import functools
+from app import document_store
 from .ai_utils import parse_pdf, run_cv_evaluation, run_project_evaluation, run_final_summary
-from .job_store import update_job_status
+from app.job_store import update_job_status
+from app.pipeline import Stage, run_graph
 
-def process_evaluation_sync(job_id: str, cv_path: str, report_path: str, job_title: str):
+
+def _parse_required(path: str) -> str:
+    text = parse_pdf(path)
+    if not text:
+        raise ValueError("Failed to parse one or both PDF documents.")
+    return text
+
+
+async def _summarize(cv_result: dict, project_result: dict) -> dict:
+    return await run_final_summary(
+        cv_feedback=cv_result.get("cv_feedback", ""),
+        project_feedback=project_result.get("project_feedback", "")
+    )
+
+
+async def process_evaluation(job_id: str, cv_path: str, report_path: str, job_title: str):
     """
     Fungsi yang menjalankan seluruh pipeline evaluasi AI.
     """
@@ -11,20 +29,15 @@ def process_evaluation_sync(job_id: str, cv_path: str, report_path: str, job_tit
     try:
         update_job_status(job_id, "processing")
 
-        cv_text = parse_pdf(cv_path)
-        report_text = parse_pdf(report_path)
+        results = await run_graph([
+            Stage("cv_text", lambda: _parse_required(cv_path)),
+            Stage("report_text", lambda: _parse_required(report_path)),
+            Stage("cv_result", functools.partial(run_cv_evaluation, job_title=job_title), deps=("cv_text",)),
+            Stage("project_result", run_project_evaluation, deps=("report_text",)),
+            Stage("summary_result", _summarize, deps=("cv_result", "project_result")),
+        ])
 
-        if not cv_text or not report_text:
-            raise ValueError("Failed to parse one or both PDF documents.")
-
-        cv_result = run_cv_evaluation(cv_text, job_title)
-        project_result = run_project_evaluation(report_text)
-        summary_result = run_final_summary(
-            cv_feedback=cv_result.get("cv_feedback", ""),
-            project_feedback=project_result.get("project_feedback", "")
-        )
-
-        final_result = {**cv_result, **project_result, **summary_result}
+        final_result = {**results["cv_result"], **results["project_result"], **results["summary_result"]}
         update_job_status(job_id, "completed", final_result)
         print(f"Evaluation completed successfully for job_id: {job_id}")
 
@@ -32,7 +45,9 @@ def process_evaluation_sync(job_id: str, cv_path: str, report_path: str, job_tit
         print(f"Error during evaluation for job_id {job_id}: {e}")
         update_job_status(job_id, "failed", {"error": str(e)})
     finally:
-        if os.path.exists(cv_path):
-            os.remove(cv_path)
-        if os.path.exists(report_path):
-            os.remove(report_path)
+        document_store.release(job_id, cv_path, report_path)
+
+
+def process_evaluation_sync(job_id: str, cv_path: str, report_path: str, job_title: str):
+    """Versi blocking dari process_evaluation."""
+    asyncio.run(process_evaluation(job_id, cv_path, report_path, job_title))
@@ -0,0 +1,241 @@
+# /app/admission.py
+
+import hashlib
+import math
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+from . import metrics
+from .config import settings
+
+
+class AdmissionRejected(Exception):
+    """Request ditolak admission control; `retry_after` dalam detik (untuk header Retry-After)."""
+
+    def __init__(self, reason: str, retry_after: int, detail: str, retryable: bool = True):
+        super().__init__(detail)
+        self.reason = reason
+        self.retry_after = retry_after
+        # False: request tidak akan pernah muat (mis. lebih besar dari kuota), jangan diulang.
+        self.retryable = retryable
+
+
+def client_id(api_key: Optional[str], host: Optional[str], forwarded_for: Optional[str] = None) -> str:
+    """
+    Identitas klien untuk kuota: API key (di-hash, tidak disimpan mentah) atau
+    alamat IP. X-Forwarded-For hanya dipakai jika ADMISSION_TRUST_FORWARDED_FOR aktif.
+    """
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    if forwarded_for and settings.ADMISSION_TRUST_FORWARDED_FOR:
+        host = forwarded_for.split(",")[0].strip()
+    return f"ip:{host or 'unknown'}"
+
+
+class AdmissionController:
+    """
+    Admission control untuk job evaluasi. Sebuah job diterima hanya jika:
+    - job klien yang masih queued/berjalan ditambah job baru tidak melewati
+      `per_client_max` (batch berbobot sebanyak kandidat yang berjalan
+      bersamaan, lihat batch_weight), dan
+    - antrian executor belum penuh, dan estimasi waktu tunggunya (antrian di
+      depannya x durasi job teramati / jumlah worker) tidak melewati
+      `max_queue_wait`, sehingga latensi job yang diterima tetap terbatas.
+    Penolakan membawa Retry-After yang dihitung dari estimasi yang sama.
+    """
+
+    def __init__(
+        self,
+        max_queue_wait: float,
+        default_service_seconds: float,
+        per_client_max: int,
+        is_finished: Optional[Callable[[str], bool]] = None,
+        smoothing: float = 0.2,
+    ):
+        self.max_queue_wait = max_queue_wait
+        self.default_service_seconds = default_service_seconds
+        self.per_client_max = per_client_max
+        self.is_finished = is_finished
+        self.smoothing = smoothing
+        self._service: Optional[float] = None
+        self._clients: Dict[str, Dict[str, int]] = {}
+        self._job_clients: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def service_seconds(self) -> float:
+        """Durasi job (EWMA) yang teramati, atau nilai awal sebelum ada observasi."""
+        return self._service if self._service is not None else self.default_service_seconds
+
+    def observe_service_time(self, seconds: float) -> None:
+        with self._lock:
+            if self._service is None:
+                self._service = seconds
+            else:
+                self._service += self.smoothing * (seconds - self._service)
+
+    def estimated_wait(self, stats: Dict[str, Any], cost: int = 1) -> float:
+        """Perkiraan detik sampai job baru mulai dijalankan, dari statistik executor."""
+        workers = max(stats["workers"], 1)
+        backlog = max(stats["queued"] + stats["running"] + cost - workers, 0)
+        return backlog * self.service_seconds / workers
+
+    def queue_full_retry_after(self, stats: Dict[str, Any], cost: int = 1) -> int:
+        """Detik sampai cukup slot antrian kosong untuk `cost` job."""
+        excess = max(stats["queued"] + cost - stats["queue_size"], 1)
+        return max(math.ceil(excess * self.service_seconds / max(stats["workers"], 1)), 1)
+
+    def batch_weight(self, candidates: int, max_parallel: int) -> int:
+        """
+        Jumlah kandidat batch yang dijalankan bersamaan, sekaligus bobot batch
+        di kuota klien: paling banyak `max_parallel` dan `per_client_max`.
+        """
+        weight = min(candidates, max_parallel)
+        if self.per_client_max:
+            weight = min(weight, self.per_client_max)
+        return max(weight, 1)
+
+    def _active_weight(self, client: str) -> int:
+        return sum(self._clients.get(client, {}).values())
+
+    def prune_finished(self, client: str, cost: int = 1) -> None:
+        """
+        Melepas job klien yang sudah selesai di proses lain (worker eksternal),
+        jika kuotanya tidak cukup untuk `cost`. Membaca job store, jadi dipanggil
+        di thread sebelum admit(), tanpa memegang lock admission.
+        """
+        if not self.per_client_max or self.is_finished is None:
+            return
+        with self._lock:
+            jobs = dict(self._clients.get(client, {}))
+        if sum(jobs.values()) + cost <= self.per_client_max:
+            return
+        finished = [job_id for job_id in jobs if self.is_finished(job_id)]
+        with self._lock:
+            for job_id in finished:
+                self._forget(job_id)
+
+    def _forget(self, job_id: str) -> None:
+        client = self._job_clients.pop(job_id, None)
+        if client is not None:
+            jobs = self._clients.get(client, {})
+            jobs.pop(job_id, None)
+            if not jobs:
+                self._clients.pop(client, None)
+
+    def admit(
+        self,
+        job_id: str,
+        client: str,
+        stats: Optional[Dict[str, Any]],
+        cost: int = 1,
+        queue_slots: int = 1,
+    ) -> None:
+        """
+        Menerima job berbobot `cost` di kuota klien yang memakai `queue_slots`
+        slot antrian executor (batch: satu), atau melempar AdmissionRejected.
+        `stats` = executor.stats(); None pada mode external (hanya kuota per
+        klien yang diterapkan).
+        """
+        with self._lock:
+            try:
+                if (self.per_client_max and cost > self.per_client_max) or (
+                    stats is not None and queue_slots > stats["queue_size"]
+                ):
+                    raise AdmissionRejected(
+                        "too_large", 0, "Request is larger than the admission limits allow.", retryable=False
+                    )
+                if self.per_client_max and self._active_weight(client) + cost > self.per_client_max:
+                    raise AdmissionRejected(
+                        "client_quota",
+                        max(math.ceil(self.service_seconds), 1),
+                        f"Too many evaluations in progress for this client (limit {self.per_client_max}).",
+                    )
+                if stats is not None:
+                    if stats["queued"] + queue_slots > stats["queue_size"]:
+                        raise AdmissionRejected(
+                            "queue_full", self.queue_full_retry_after(stats, queue_slots), "Evaluation queue is full."
+                        )
+                    wait = self.estimated_wait(stats, queue_slots)
+                    metrics.ADMISSION_ESTIMATED_WAIT.set(wait)
+                    if self.max_queue_wait and wait > self.max_queue_wait:
+                        raise AdmissionRejected(
+                            "overloaded",
+                            max(math.ceil(wait - self.max_queue_wait), 1),
+                            f"Server is overloaded (estimated queue wait {wait:.0f}s).",
+                        )
+            except AdmissionRejected as e:
+                metrics.ADMISSION_DECISIONS.labels("rejected", e.reason).inc()
+                raise
+            self._clients.setdefault(client, {})[job_id] = cost
+            self._job_clients[job_id] = client
+        metrics.ADMISSION_DECISIONS.labels("accepted", "ok").inc()
+
+    def release(self, job_id: str) -> None:
+        """Dipanggil saat job selesai (atau batal diantrikan) agar kuota klien kembali."""
+        with self._lock:
+            self._forget(job_id)
+
+
+def _job_finished(job_id: str) -> bool:
+    from .job_store import FINISHED_STATUSES, get_job_status
+
+    job = get_job_status(job_id)
+    return job is None or job["status"] in FINISHED_STATUSES
+
+
+def request_client(http_request: Request) -> str:
+    """Identitas klien (lihat client_id) dari header dan alamat request HTTP."""
+    return client_id(
+        http_request.headers.get("x-api-key"),
+        http_request.client.host if http_request.client else None,
+        http_request.headers.get("x-forwarded-for"),
+    )
+
+
+async def admit_request(job_id: str, http_request: Request, cost: int = 1) -> None:
+    """
+    Admission control untuk endpoint HTTP; melempar 429 + Retry-After jika job
+    tidak diterima, atau 413 jika job tidak akan pernah muat dalam batas admission.
+    """
+    from .executor import get_executor
+
+    admission, client = get_admission(), request_client(http_request)
+    await run_in_threadpool(admission.prune_finished, client, cost)
+    stats = None if settings.EXECUTOR_MODE == "external" else get_executor().stats()
+    try:
+        admission.admit(job_id, client, stats, cost=cost)
+    except AdmissionRejected as e:
+        if not e.retryable:
+            raise HTTPException(status_code=413, detail=str(e))
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def queue_full_error(e: Exception) -> HTTPException:
+    """429 untuk antrian yang terisi di antara admission dan enqueue (request bersamaan)."""
+    from .executor import get_executor
+
+    retry_after = get_admission().queue_full_retry_after(get_executor().stats())
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(retry_after)})
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """Admission controller per proses."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+                    settings.ADMISSION_DEFAULT_SERVICE_SECONDS,
+                    settings.ADMISSION_PER_CLIENT_MAX_JOBS,
+                    is_finished=_job_finished,
+                )
+    return _controller
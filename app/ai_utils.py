@@ -1,93 +1,192 @@
-import json
-import numpy as np
-import google.generativeai as genai
-from pypdf import PdfReader
-from tenacity import retry, stop_after_attempt, wait_exponential
+import asyncio
+import os
+import threading
 from .config import settings
+from .embeddings import embed_query, embed_texts, embedding_dim
+from . import llm_client, metrics, schemas
+from .pdf_parser import extract_text_cached, extract_text_cached_async
+from .prompt_budget import (
+    CONTEXT_SEPARATOR,
+    CV_SECTION_PRIORITY,
+    REPORT_SECTION_PRIORITY,
+    build_prompt,
+    count_tokens,
+)
+from .retriever import CV_CONTEXT_SOURCES, PROJECT_CONTEXT_SOURCES, build_retriever
+from .vector_store import load_or_convert, reembed
+from .warmup import register_component
 
-# Konfigurasi Gemini API
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+# Path vector.json (sumber) dan index biner hasil konversinya
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+VECTOR_PATH = os.path.join(APP_DIR, "vectors.json")
+VECTOR_INDEX_PATH = os.path.join(APP_DIR, "vector_index")
 
-# Path vector.json
-VECTOR_PATH = "app/vector.json"
+# Index (matriks float32 ter-normalisasi, di-memory-map dari .npy) dimuat saat
+# pertama dipakai, bukan saat import, supaya cold start tetap cepat.
+VECTOR_STORE = None
+_vector_lock = threading.Lock()
 
-# Load vectors dari file
-with open(VECTOR_PATH, "r", encoding="utf-8") as f:
-    VECTORS = json.load(f)
-
-for v in VECTORS:
-    v["embedding"] = np.array(v["embedding"], dtype=float)
+# Retriever (RETRIEVER_BACKEND) dibangun ulang bila VECTOR_STORE diganti.
+_retriever = None
 
 
 # ===========================
 # Fungsi Utility
 # ===========================
 def parse_pdf(file_path: str) -> str:
-    """Membaca PDF dan mengembalikan teks."""
-    text = ""
+    """Membaca PDF dan mengembalikan teks (di-cache berdasarkan hash isi file)."""
     try:
-        reader = PdfReader(file_path)
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        return extract_text_cached(file_path)
     except Exception as e:
         print(f"Error parsing PDF {file_path}: {e}")
-    return text.strip()
+        return ""
 
 
-def _find_similar_context(query: str, top_k: int = 5) -> str:
-    """
-    Cari konteks paling relevan dari vector.json menggunakan cosine similarity.
-    """
-    query_vec = np.random.normal(0, 1, len(VECTORS[0]["embedding"]))
-    query_vec = query_vec / np.linalg.norm(query_vec)
+async def parse_pdf_async(file_path: str) -> str:
+    """Seperti parse_pdf, tetapi parsing berjalan di process pool (PDF_PARSE_PROCESSES)."""
+    try:
+        return await extract_text_cached_async(file_path)
+    except Exception as e:
+        print(f"Error parsing PDF {file_path}: {e}")
+        return ""
+
+
+def get_vector_store():
+    """Memuat index sekali per proses (lazy, thread-safe)."""
+    global VECTOR_STORE
+    if VECTOR_STORE is None:
+        with _vector_lock:
+            if VECTOR_STORE is None:
+                VECTOR_STORE = load_or_convert(VECTOR_INDEX_PATH, VECTOR_PATH)
+    return VECTOR_STORE
 
-    sims = []
-    for v in VECTORS:
-        sim = np.dot(query_vec, v["embedding"]) / (
-            np.linalg.norm(query_vec) * np.linalg.norm(v["embedding"])
-        )
-        sims.append((v["text"], float(sim)))
 
-    sims.sort(key=lambda x: x[1], reverse=True)
-    top_contexts = [t for t, _ in sims[:top_k]]
-    return "\n---\n".join(top_contexts)
+def _get_vector_store(dim: int):
+    """Mengembalikan index; di-embed ulang sekali jika dimensinya beda dengan model query."""
+    global VECTOR_STORE
+    if get_vector_store().dim != dim:
+        with _vector_lock:
+            if VECTOR_STORE.dim != dim:
+                print(
+                    f"Vector index dim {VECTOR_STORE.dim} != embedding model dim {dim}, "
+                    "re-embedding knowledge base..."
+                )
+                VECTOR_STORE = reembed(VECTOR_STORE, embed_texts, out_path=VECTOR_INDEX_PATH)
+    return VECTOR_STORE
+
+
+def _get_retriever(dim: int):
+    """Retriever untuk index saat ini (backend sesuai RETRIEVER_BACKEND)."""
+    global _retriever
+    store = _get_vector_store(dim)
+    if _retriever is None or _retriever.store is not store:
+        with _vector_lock:
+            if _retriever is None or _retriever.store is not store:
+                _retriever = build_retriever(
+                    store,
+                    settings.RETRIEVER_BACKEND,
+                    settings.RETRIEVER_PARTITION_KEY,
+                    n_lists=settings.RETRIEVER_IVF_LISTS,
+                    n_probe=settings.RETRIEVER_IVF_PROBES,
+                )
+    return _retriever
+
+
+# Warmup juga menyamakan dimensi index dengan model embedding dan membangun retriever.
+register_component(
+    "vector_index",
+    lambda: _retriever is not None and _retriever.store is VECTOR_STORE,
+    lambda: _get_retriever(embedding_dim()),
+)
+
+
+def _find_similar_context(query: str, top_k: int = 5, sources=None) -> str:
+    """
+    Cari konteks paling relevan dari vector index menggunakan cosine similarity.
+    `sources` membatasi pencarian ke partisi `source_file` tertentu.
+    """
+    query_vec = embed_query(query)
+    hits = _get_retriever(query_vec.shape[0]).search(query_vec, top_k, sources)
+    return CONTEXT_SEPARATOR.join(hit.text for hit in hits)
 
 
 # ===========================
 # Fungsi LLM (Gemini)
 # ===========================
-@retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
-def llm_call(prompt: str) -> dict:
-    """Memanggil Gemini dan memastikan output JSON valid."""
-    try:
-        generation_config = genai.GenerationConfig(
-            response_mime_type="application/json",
-            temperature=0.3
-        )
-        response = gemini_model.generate_content(prompt, generation_config=generation_config)
-        cleaned = response.text.strip().replace("```json", "").replace("```", "")
-        return json.loads(cleaned)
-    except Exception as e:
-        print(f"Gemini error: {e}")
-        raise
+def llm_call(prompt: str, use_cache: bool = True, output_model=None) -> dict:
+    """Memanggil Gemini dan memastikan output JSON valid (versi blocking)."""
+    return llm_client.llm_call_sync(
+        prompt, model_name=settings.LLM_MODEL, temperature=0.3, use_cache=use_cache, output_model=output_model
+    )
+
+
+async def llm_call_async(
+    prompt: str, use_cache: bool = True, response_schema: dict | None = None, on_field=None, output_model=None
+) -> dict:
+    """
+    Memanggil Gemini tanpa memblok thread; retry, cache, dan batas concurrency di llm_client.
+    Dengan `on_field(key, value)` (dan LLM_STREAMING aktif), respons di-stream dan
+    setiap field diteruskan begitu final. `output_model` = model pydantic output stage.
+    """
+    return await llm_client.llm_call_async(
+        prompt, model_name=settings.LLM_MODEL, temperature=0.3, use_cache=use_cache,
+        response_schema=response_schema, on_field=on_field if settings.LLM_STREAMING else None,
+        output_model=output_model,
+    )
 
 
 # ===========================
 # Fungsi Pipeline
 # ===========================
-def run_cv_evaluation(cv_text: str, job_title: str) -> dict:
-    """Evaluasi CV berbasis vector.json."""
-    print("Running CV Evaluation...")
-    context = _find_similar_context(f"CV evaluation {job_title}")
-    prompt = f"""
+def get_cv_context(job_title: str) -> str:
+    """Konteks (job description + rubrik) untuk evaluasi CV sebuah posisi."""
+    with metrics.stage_timer("retrieve_cv_context"):
+        return _find_similar_context(f"CV evaluation {job_title}", sources=CV_CONTEXT_SOURCES)
+
+
+def get_project_context() -> str:
+    """Konteks (case study + rubrik) untuk evaluasi laporan proyek."""
+    with metrics.stage_timer("retrieve_project_context"):
+        return _find_similar_context("project evaluation criteria", sources=PROJECT_CONTEXT_SOURCES)
+
+
+def budgeted_prompt(
+    template: str,
+    context: str,
+    document: str,
+    priorities,
+    budget: int | None = None,
+    part: str | None = None,
+    **fields,
+) -> str:
+    """
+    Menerapkan PROMPT_TOKEN_BUDGET (atau `budget`) dan mencatat apa yang dipangkas.
+    `part` membedakan beberapa bagian prompt dalam satu stage (mode single).
+    """
+    budget = settings.PROMPT_TOKEN_BUDGET if budget is None else budget
+    if budget <= 0:
+        return template.format(context=context, document=document, **fields)
+    prompt, report = build_prompt(
+        template, context, document, budget, priorities,
+        context_share=settings.PROMPT_CONTEXT_SHARE, **fields,
+    )
+    if report.tokens_dropped:
+        print(
+            f"Prompt trimmed from ~{report.tokens_before} to ~{report.tokens_after} tokens "
+            f"(dropped sections: {report.sections_dropped or 'none'})"
+        )
+    metrics.observe_prompt_budget(report.as_dict(), part)
+    return prompt
+
+
+CV_PROMPT = """
     You are an expert recruiter. Evaluate this CV for a '{job_title}' position.
 
     === Context Knowledge ===
     {context}
 
     === Candidate CV ===
-    {cv_text}
+    {document}
 
     Return JSON:
     {{
@@ -95,21 +194,15 @@ def run_cv_evaluation(cv_text: str, job_title: str) -> dict:
         "cv_feedback": string
     }}
     """
-    return llm_call(prompt)
 
-
-def run_project_evaluation(report_text: str) -> dict:
-    """Evaluasi laporan proyek."""
-    print("Running Project Evaluation...")
-    context = _find_similar_context("project evaluation criteria")
-    prompt = f"""
+PROJECT_PROMPT = """
     You are a senior engineer evaluating a project report.
 
     === Context ===
     {context}
 
     === Report ===
-    {report_text}
+    {document}
 
     Return JSON:
     {{
@@ -117,10 +210,121 @@ def run_project_evaluation(report_text: str) -> dict:
         "project_feedback": string
     }}
     """
-    return llm_call(prompt)
 
 
-def run_final_summary(cv_feedback: str, project_feedback: str) -> dict:
+async def run_cv_evaluation(
+    cv_text: str, job_title: str, use_cache: bool = True, context: str | None = None, on_field=None
+) -> dict:
+    """Evaluasi CV berbasis vector index. `context` bisa diisi agar retrieval tidak diulang."""
+    print("Running CV Evaluation...")
+    if context is None:
+        context = await asyncio.to_thread(get_cv_context, job_title)
+    prompt = budgeted_prompt(CV_PROMPT, context, cv_text, CV_SECTION_PRIORITY, job_title=job_title)
+    return await llm_call_async(
+        prompt, use_cache=use_cache, on_field=on_field, output_model=schemas.CVEvaluationOutput
+    )
+
+
+async def run_project_evaluation(
+    report_text: str, use_cache: bool = True, context: str | None = None, on_field=None
+) -> dict:
+    """Evaluasi laporan proyek. `context` bisa diisi agar retrieval tidak diulang."""
+    print("Running Project Evaluation...")
+    if context is None:
+        context = await asyncio.to_thread(get_project_context)
+    prompt = budgeted_prompt(PROJECT_PROMPT, context, report_text, REPORT_SECTION_PRIORITY)
+    return await llm_call_async(
+        prompt, use_cache=use_cache, on_field=on_field, output_model=schemas.ProjectEvaluationOutput
+    )
+
+
+# Mode satu panggilan: CV, laporan proyek, dan ringkasan dievaluasi sekaligus
+# dengan structured output sesuai schemas.EvaluationResult.
+EVALUATION_RESULT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "cv_match_rate": {"type": "NUMBER"},
+        "cv_feedback": {"type": "STRING"},
+        "project_score": {"type": "NUMBER"},
+        "project_feedback": {"type": "STRING"},
+        "overall_summary": {"type": "STRING"},
+    },
+    "required": ["cv_match_rate", "cv_feedback", "project_score", "project_feedback", "overall_summary"],
+}
+
+FULL_EVALUATION_PROMPT = """
+    You are an expert technical recruiter and a senior engineer. Evaluate this candidate
+    for a '{job_title}' position, using each context section as ground truth.
+{cv_part}
+{project_part}
+    Score the CV against the job context and the project report against the case study
+    context, then write a short overall summary (3-5 sentences) covering strengths,
+    gaps, and a final recommendation.
+
+    Return JSON:
+    {{
+        "cv_match_rate": float (0.0–1.0),
+        "cv_feedback": string,
+        "project_score": float (1–5),
+        "project_feedback": string,
+        "overall_summary": string
+    }}
+    """
+
+FULL_EVALUATION_CV_PART = """
+    === CV Context Knowledge ===
+    {context}
+
+    === Candidate CV ===
+    {document}
+"""
+
+FULL_EVALUATION_PROJECT_PART = """
+    === Project Context ===
+    {context}
+
+    === Project Report ===
+    {document}
+"""
+
+
+async def run_full_evaluation(
+    cv_text: str,
+    report_text: str,
+    job_title: str,
+    use_cache: bool = True,
+    cv_context: str | None = None,
+    project_context: str | None = None,
+    on_field=None,
+) -> dict:
+    """Satu panggilan LLM yang menghasilkan seluruh EvaluationResult."""
+    print("Running Full Evaluation (single call)...")
+    if cv_context is None:
+        cv_context = await asyncio.to_thread(get_cv_context, job_title)
+    if project_context is None:
+        project_context = await asyncio.to_thread(get_project_context)
+
+    # Budget dibagi rata antara bagian CV dan bagian proyek.
+    budget = settings.PROMPT_TOKEN_BUDGET
+    frame_tokens = count_tokens(FULL_EVALUATION_PROMPT.format(job_title=job_title, cv_part="", project_part=""))
+    part_budget = max(budget - frame_tokens, 0) // 2 if budget > 0 else 0
+    cv_part = budgeted_prompt(
+        FULL_EVALUATION_CV_PART, cv_context, cv_text, CV_SECTION_PRIORITY, budget=part_budget, part="cv"
+    )
+    project_part = budgeted_prompt(
+        FULL_EVALUATION_PROJECT_PART, project_context, report_text, REPORT_SECTION_PRIORITY,
+        budget=part_budget, part="project",
+    )
+    prompt = FULL_EVALUATION_PROMPT.format(job_title=job_title, cv_part=cv_part, project_part=project_part)
+    return await llm_call_async(
+        prompt, use_cache=use_cache, response_schema=EVALUATION_RESULT_SCHEMA, on_field=on_field,
+        output_model=schemas.FullEvaluationOutput,
+    )
+
+
+async def run_final_summary(
+    cv_feedback: str, project_feedback: str, use_cache: bool = True, on_field=None
+) -> dict:
     """Membuat ringkasan akhir."""
     print("Running Final Summary...")
     prompt = f"""
@@ -134,5 +338,5 @@ def run_final_summary(cv_feedback: str, project_feedback: str) -> dict:
         "overall_summary": string
     }}
     """
-    return llm_call(prompt)
+    return await llm_call_async(prompt, use_cache=use_cache, on_field=on_field, output_model=schemas.SummaryOutput)
 
@@ -0,0 +1,33 @@
+# /app/chunking.py
+
+from typing import List
+
+
+def chunk_by_tokens(text: str, tokenizer, max_tokens: int = 200, overlap: int = 40) -> List[str]:
+    """
+    Memecah teks menjadi potongan berukuran maksimal `max_tokens` token
+    (tokenizer HuggingFace, mis. milik model embedding) dengan `overlap` token
+    yang tumpang tindih antar potongan. Potongan diambil dari teks asli
+    berdasarkan offset karakter, sehingga spasi dan tanda baca tetap utuh.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    text = text.strip()
+    if not text:
+        return []
+
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = encoding["offset_mapping"]
+    if len(offsets) <= max_tokens:
+        return [text]
+
+    chunks = []
+    step = max_tokens - overlap
+    for start in range(0, len(offsets), step):
+        window = offsets[start:start + max_tokens]
+        chunk = text[window[0][0]:window[-1][1]].strip()
+        if chunk:
+            chunks.append(chunk)
+        if start + max_tokens >= len(offsets):
+            break
+    return chunks
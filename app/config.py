@@ -4,6 +4,98 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     GOOGLE_API_KEY: str = "AIzaSyCLwcIQJ-xxxxxxxxxxxxxxxxxxxx"
 
+    # Konfigurasi LLM
+    LLM_MODEL: str = "gemini-2.0-flash"
+    LLM_MAX_CONCURRENCY: int = 8  # maksimal request LLM in-flight per proses
+    LLM_ADAPTIVE_CONCURRENCY: bool = True  # AIMD: naik saat sukses, turun setengah saat 429/timeout
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # 429/timeout berturut-turut sebelum breaker terbuka; 0 = nonaktif
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0  # lama breaker terbuka sebelum request percobaan
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_MIN_WAIT: float = 4.0
+    LLM_RETRY_MAX_WAIT: float = 10.0
+    LLM_TIMEOUT: float = 120.0
+    LLM_STREAMING: bool = True  # stream respons dan terbitkan field JSON begitu final
+    LLM_OUTPUT_CORRECTION: bool = True  # output tak bisa diperbaiki lokal: minta koreksi singkat sebelum retry penuh
+
+    # Hedging: request yang lebih lambat dari persentil latensi terbaru dikirim ulang,
+    # respons pertama dipakai dan yang lain dibatalkan
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # hedging aktif setelah sekian latensi teramati per model
+    LLM_HEDGE_BUDGET: float = 0.05  # panggilan tambahan maksimum, sebagai fraksi dari semua panggilan
+    LLM_HEDGE_MODEL: str = ""  # model untuk duplikat (mis. model yang lebih cepat); kosong = model yang sama
+
+    # Executor job: "inline" = worker berjalan di proses web,
+    # "external" = proses web hanya mengantrikan, dijalankan oleh `python -m app.worker`
+    EXECUTOR_MODE: str = "inline"
+    EXECUTOR_WORKERS: int = 4  # job yang berjalan bersamaan per proses
+    EXECUTOR_QUEUE_SIZE: int = 100  # batas antrian per proses
+    EXECUTOR_DRAIN_TIMEOUT: float = 30.0
+    EXECUTOR_POLL_SECONDS: float = 1.0  # interval worker eksternal mengambil job dari store
+    PDF_PARSE_PROCESSES: int = 2  # 0 = parsing di thread
+    WARMUP_ON_STARTUP: bool = False  # muat model & index di background saat server start
+
+    # Admission control /evaluate: job ditolak (429 + Retry-After) jika estimasi waktu
+    # tunggunya (antrian x durasi job teramati / worker) melewati batas ini
+    ADMISSION_MAX_QUEUE_WAIT_SECONDS: float = 120.0  # 0 = hanya batas EXECUTOR_QUEUE_SIZE
+    ADMISSION_DEFAULT_SERVICE_SECONDS: float = 30.0  # estimasi durasi job sebelum ada observasi
+    ADMISSION_PER_CLIENT_MAX_JOBS: int = 4  # job queued/berjalan per API key atau IP; 0 = tanpa batas
+    ADMISSION_TRUST_FORWARDED_FOR: bool = False  # pakai X-Forwarded-For (di belakang proxy tepercaya)
+
+    # Batas kandidat yang dievaluasi bersamaan dalam satu batch
+    BATCH_MAX_PARALLEL_CANDIDATES: int = 8
+
+    # Cache respons LLM (memori + SQLite)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MEMORY_ENTRIES: int = 512
+    LLM_CACHE_PATH: str = "cache/llm_cache.sqlite3"  # kosongkan untuk memori saja
+    LLM_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    LLM_CACHE_MAX_BYTES: int = 100 * 1024 * 1024
+
+    # Pipeline evaluasi: "three_call" = evaluasi CV, evaluasi proyek, lalu ringkasan
+    # (3 panggilan), "single" = satu panggilan LLM untuk seluruh hasil (opt-in,
+    # bandingkan dulu dengan scripts/compare_eval_modes.py)
+    EVALUATION_MODE: str = "three_call"
+
+    # Budget token per prompt evaluasi (estimasi); 0 = tanpa batas
+    PROMPT_TOKEN_BUDGET: int = 6000
+    PROMPT_CONTEXT_SHARE: float = 0.35  # porsi budget (di luar instruksi) untuk konteks retrieval
+
+    # Document store: PDF asli + teks hasil ekstraksi, dialamatkan dengan SHA-256 isinya
+    DOCUMENT_STORE_DIR: str = "data/documents"
+    DOCUMENT_TTL_SECONDS: float = 7 * 24 * 3600  # umur dokumen tanpa job aktif sejak terakhir dipakai
+    DOCUMENT_STORE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024  # 0 = tanpa batas
+    DOCUMENT_GC_INTERVAL_SECONDS: float = 600  # 0 = GC nonaktif
+
+    # Batas ukuran per file upload dalam byte (0 = tanpa batas)
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+
+    # Parsing PDF (0 = tanpa batas)
+    PDF_MAX_PAGES: int = 0
+    PDF_MAX_CHARS: int = 0
+    PDF_TEXT_CACHE_MAX_CHARS: int = 20_000_000
+
+    # Model embedding untuk query (harus sama dengan scripts/ingest_data.py)
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    QUERY_EMBEDDING_CACHE_SIZE: int = 256
+
+    # Retriever index NumPy (app/ai_utils): "exact" = scan eksak per partisi,
+    # "ivf" = approximate nearest neighbour (inverted file) untuk korpus besar
+    RETRIEVER_BACKEND: str = "exact"
+    RETRIEVER_PARTITION_KEY: str = "source_file"  # metadata yang dipakai untuk filter sumber/role
+    RETRIEVER_IVF_LISTS: int = 0  # jumlah kelompok IVF; 0 = otomatis (~sqrt(N))
+    RETRIEVER_IVF_PROBES: int = 8  # kelompok yang diperiksa per query (recall vs latensi)
+
+    # Cache hasil query Chroma (api/ai_utils), dikosongkan otomatis setelah ingesti
+    RETRIEVAL_CACHE_SIZE: int = 256  # 0 = nonaktif
+    RETRIEVAL_PREWARM_JOB_TITLES: list[str] = []  # mis. '["Backend Engineer"]', diisi saat warmup
+
+    # Penyimpanan job & dokumen: memory://, sqlite:///path/ke/db, atau redis://host:port/db
+    JOB_STORE_URL: str = "sqlite:///data/job_store.sqlite3"
+    JOB_TTL_SECONDS: float = 24 * 3600  # umur job yang sudah selesai
+    JOB_STORE_MAX_FINISHED: int = 10_000  # batas jumlah job selesai yang disimpan
+
     # Konfigurasi untuk koneksi Redis
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
@@ -0,0 +1,320 @@
+# /app/document_store.py
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable, Iterator, Optional, Tuple
+
+from . import metrics
+from .config import settings
+
+# Tata letak: <root>/<hash[:2]>/<hash>/ berisi PDF asli, meta.json, teks hasil
+# ekstraksi per batas parsing (text-<pages>-<chars>.txt), dan refs/<job_id>
+# untuk setiap job yang masih memakai dokumen tersebut.
+ORIGINAL_NAME = "original.pdf"
+META_NAME = "meta.json"
+REFS_DIR = "refs"
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Umur minimum file di .tmp/.trash sebelum dianggap sisa dan dihapus GC.
+LEFTOVER_SECONDS = 3600
+
+
+def hash_from_path(path: str) -> Optional[str]:
+    """SHA-256 dokumen jika `path` adalah file asli di dalam document store, selain itu None."""
+    doc_dir, name = os.path.split(os.path.abspath(path))
+    content_hash = os.path.basename(doc_dir)
+    if name != ORIGINAL_NAME or not _HASH_RE.match(content_hash):
+        return None
+    if os.path.basename(os.path.dirname(doc_dir)) != content_hash[:2]:
+        return None
+    return content_hash
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _text_path(path: str, budget: Tuple[int, int]) -> str:
+    return os.path.join(os.path.dirname(path), f"text-{budget[0]}-{budget[1]}.txt")
+
+
+def read_text(path: str, budget: Tuple[int, int]) -> Optional[str]:
+    """Teks hasil ekstraksi yang disimpan di samping PDF asli (None jika belum ada)."""
+    try:
+        with open(_text_path(path, budget), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_text(path: str, budget: Tuple[int, int], text: str) -> None:
+    try:
+        _write_atomic(_text_path(path, budget), text.encode("utf-8"))
+    except FileNotFoundError:
+        pass  # dokumen baru saja dihapus GC; teks cukup disimpan di cache memori
+
+
+def _touch(doc_dir: str) -> None:
+    # mtime meta.json = terakhir dipakai (dasar TTL dan urutan eviksi GC).
+    try:
+        os.utime(os.path.join(doc_dir, META_NAME))
+    except FileNotFoundError:
+        pass
+
+
+def acquire(job_id: str, *paths: str) -> bool:
+    """
+    Mencatat bahwa `job_id` memakai dokumen-dokumen ini, supaya GC tidak
+    menghapusnya. False jika salah satu dokumen sudah tidak ada.
+    """
+    acquired = []
+    for path in paths:
+        doc_dir = os.path.dirname(path)
+        if hash_from_path(path) is None:
+            # File di luar document store tidak dikelola GC; cukup cek keberadaannya.
+            if not os.path.exists(path):
+                release(job_id, *acquired)
+                return False
+            continue
+        try:
+            with open(os.path.join(doc_dir, REFS_DIR, job_id), "w"):
+                pass
+        except FileNotFoundError:
+            pass  # dokumen sudah dihapus GC
+        if not os.path.exists(path):
+            release(job_id, *acquired, path)
+            return False
+        acquired.append(path)
+        _touch(doc_dir)
+    return True
+
+
+def release(job_id: str, *paths: str) -> None:
+    """Melepas referensi job; dokumennya tetap disimpan sampai dibersihkan GC."""
+    for path in paths:
+        if not path or hash_from_path(path) is None:
+            continue
+        doc_dir = os.path.dirname(path)
+        try:
+            os.remove(os.path.join(doc_dir, REFS_DIR, job_id))
+        except FileNotFoundError:
+            pass
+        _touch(doc_dir)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class DocumentStore:
+    """
+    Penyimpanan dokumen berbasis hash isi: PDF asli dan teks hasil ekstraksinya
+    disimpan bersama, sehingga satu CV bisa dievaluasi untuk banyak posisi
+    tanpa upload dan parsing ulang. Dokumen tanpa job aktif dihapus oleh
+    `collect()` setelah `ttl_seconds` sejak terakhir dipakai, atau lebih awal
+    (yang paling lama tidak dipakai dulu) jika total ukuran melewati `max_bytes`.
+    """
+
+    def __init__(self, root: str, ttl_seconds: float, max_bytes: int):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._gc_lock = threading.Lock()
+        # Dipegang sebentar oleh put() dan _remove(), supaya dokumen yang baru saja
+        # di-upload ulang (dedup) tidak dihapus GC di antara pengecekan dan respons.
+        self._remove_lock = threading.Lock()
+
+    def document_dir(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def original_path(self, content_hash: str) -> str:
+        return os.path.join(self.document_dir(content_hash), ORIGINAL_NAME)
+
+    def new_tmp_path(self) -> str:
+        """Path sementara untuk upload yang sedang ditulis (di filesystem yang sama)."""
+        tmp_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, f"{uuid.uuid4()}.part")
+
+    def put(self, tmp_path: str, content_hash: str, filename: str) -> str:
+        """
+        Memindahkan file sementara ke lokasi berdasarkan hash-nya. Jika dokumen
+        yang sama sudah ada, file sementara dibuang. Mengembalikan path PDF asli.
+        """
+        doc_dir = self.document_dir(content_hash)
+        path = os.path.join(doc_dir, ORIGINAL_NAME)
+        with self._remove_lock:
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.join(doc_dir, REFS_DIR), exist_ok=True)
+                meta = {"filename": filename, "size": os.path.getsize(tmp_path), "created_at": time.time()}
+                _write_atomic(os.path.join(doc_dir, META_NAME), json.dumps(meta).encode("utf-8"))
+                os.replace(tmp_path, path)
+            _touch(doc_dir)
+        return path
+
+    def _iter_documents(self) -> Iterator[Tuple[str, str]]:
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if prefix.startswith(".") or not os.path.isdir(prefix_dir):
+                continue
+            for content_hash in os.listdir(prefix_dir):
+                if _HASH_RE.match(content_hash):
+                    yield content_hash, os.path.join(prefix_dir, content_hash)
+
+    def _has_active_refs(self, doc_dir: str, is_job_active: Callable[[str], bool], now: float) -> bool:
+        refs_dir = os.path.join(doc_dir, REFS_DIR)
+        active = False
+        for job_id in os.listdir(refs_dir) if os.path.isdir(refs_dir) else ():
+            ref_path = os.path.join(refs_dir, job_id)
+            try:
+                # Referensi baru dianggap aktif walau record job-nya belum dibuat.
+                recent = now - os.path.getmtime(ref_path) < LEFTOVER_SECONDS
+            except FileNotFoundError:
+                continue
+            if recent or is_job_active(job_id):
+                active = True
+            else:
+                # Job sudah selesai/hilang tanpa melepas referensi (mis. proses mati).
+                try:
+                    os.remove(ref_path)
+                except FileNotFoundError:
+                    pass
+        return active
+
+    def _remove(self, content_hash: str, doc_dir: str, last_used: float) -> bool:
+        # Direktori dipindah dulu (atomik), lalu referensi dicek ulang: acquire()
+        # yang berjalan bersamaan akan gagal atau meninggalkan ref yang terlihat di sini.
+        trash_dir = os.path.join(self.root, ".trash")
+        os.makedirs(trash_dir, exist_ok=True)
+        trashed = os.path.join(trash_dir, f"{content_hash}-{uuid.uuid4().hex}")
+        with self._remove_lock:
+            try:
+                if os.path.getmtime(os.path.join(doc_dir, META_NAME)) > last_used:
+                    return False  # dipakai lagi (mis. di-upload ulang) sejak dipindai
+            except FileNotFoundError:
+                pass
+            try:
+                os.rename(doc_dir, trashed)
+            except FileNotFoundError:
+                return False
+            refs_dir = os.path.join(trashed, REFS_DIR)
+            if os.path.isdir(refs_dir) and os.listdir(refs_dir) and not os.path.exists(doc_dir):
+                os.rename(trashed, doc_dir)
+                return False
+        shutil.rmtree(trashed, ignore_errors=True)
+        return True
+
+    def _clean_leftovers(self, now: float) -> None:
+        # Sisa upload yang terputus dan penghapusan yang tidak selesai (proses mati).
+        for name in (".tmp", ".trash"):
+            directory = os.path.join(self.root, name)
+            for entry in os.listdir(directory) if os.path.isdir(directory) else ():
+                path = os.path.join(directory, entry)
+                try:
+                    if now - os.path.getmtime(path) < LEFTOVER_SECONDS:
+                        continue
+                except FileNotFoundError:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def collect(self, is_job_active: Callable[[str], bool]) -> dict:
+        """Satu putaran GC. Mengembalikan ringkasan (jumlah, ukuran, dokumen yang dihapus)."""
+        with self._gc_lock:
+            now = time.time()
+            self._clean_leftovers(now)
+            entries = []
+            for content_hash, doc_dir in self._iter_documents():
+                try:
+                    last_used = os.path.getmtime(os.path.join(doc_dir, META_NAME))
+                except FileNotFoundError:
+                    last_used = os.path.getmtime(doc_dir)
+                active = self._has_active_refs(doc_dir, is_job_active, now)
+                entries.append((last_used, content_hash, doc_dir, _dir_size(doc_dir), active))
+
+            total = sum(entry[3] for entry in entries)
+            removed = {"expired": 0, "over_limit": 0}
+            for last_used, content_hash, doc_dir, size, active in sorted(entries):
+                if active:
+                    continue
+                if now - last_used > self.ttl_seconds:
+                    reason = "expired"
+                elif self.max_bytes and total > self.max_bytes:
+                    reason = "over_limit"
+                else:
+                    continue
+                if self._remove(content_hash, doc_dir, last_used):
+                    total -= size
+                    removed[reason] += 1
+                    metrics.DOCUMENTS_COLLECTED.labels(reason).inc()
+
+            metrics.DOCUMENT_STORE_BYTES.set(total)
+            return {"documents": len(entries) - sum(removed.values()), "bytes": total, "removed": removed}
+
+
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_document_store() -> DocumentStore:
+    """Document store proses ini (DOCUMENT_STORE_DIR)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DocumentStore(
+                    settings.DOCUMENT_STORE_DIR, settings.DOCUMENT_TTL_SECONDS, settings.DOCUMENT_STORE_MAX_BYTES
+                )
+    return _store
+
+
+def _is_job_active(job_id: str) -> bool:
+    from .job_store import FINISHED_STATUSES, get_job_status
+
+    job = get_job_status(job_id)
+    return job is not None and job["status"] not in FINISHED_STATUSES
+
+
+async def _gc_loop(store: DocumentStore, interval: float) -> None:
+    while True:
+        try:
+            summary = await asyncio.to_thread(store.collect, _is_job_active)
+            if any(summary["removed"].values()):
+                print(f"Document GC removed {summary['removed']}, {summary['bytes']} bytes remain")
+        except Exception as e:
+            print(f"Document GC failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_document_gc(store: Optional[DocumentStore] = None) -> Optional[asyncio.Task]:
+    """Menjalankan GC dokumen di background setiap DOCUMENT_GC_INTERVAL_SECONDS (0 = nonaktif)."""
+    if settings.DOCUMENT_GC_INTERVAL_SECONDS <= 0:
+        return None
+    return asyncio.get_running_loop().create_task(
+        _gc_loop(store or get_document_store(), settings.DOCUMENT_GC_INTERVAL_SECONDS), name="document-gc"
+    )
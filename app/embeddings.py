@@ -0,0 +1,66 @@
+# /app/embeddings.py
+
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from .config import settings
+from .warmup import register_component
+
+# Model embedding yang sama dengan scripts/ingest_data.py, dimuat sekali per proses.
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedder():
+    """Mengembalikan instance SentenceTransformer (lazy, thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+
+                print(f"Loading embedding model {settings.EMBEDDING_MODEL}...")
+                _model = SentenceTransformer(settings.EMBEDDING_MODEL)
+    return _model
+
+
+register_component("embedder", lambda: _model is not None, get_embedder)
+
+
+def embedding_dim() -> int:
+    return get_embedder().get_sentence_embedding_dimension()
+
+
+def normalize_query(text: str) -> str:
+    """Normalisasi teks query untuk kunci cache (model-nya uncased)."""
+    return " ".join(text.split()).lower()
+
+
+def embed_texts(texts: list[str], batch_size: int = 32) -> np.ndarray:
+    """Meng-embed banyak teks sekaligus; hasil float32 ter-normalisasi."""
+    vectors = get_embedder().encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+@lru_cache(maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE)
+def _embed_normalized_query(normalized: str) -> np.ndarray:
+    vec = embed_texts([normalized])[0]
+    vec.setflags(write=False)
+    return vec
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Embedding untuk satu query, di-cache (LRU) berdasarkan teks yang dinormalisasi."""
+    return _embed_normalized_query(normalize_query(text))
+
+
+def query_cache_info():
+    return _embed_normalized_query.cache_info()
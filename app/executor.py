@@ -0,0 +1,206 @@
+# /app/executor.py
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from . import metrics
+from .admission import get_admission
+from .config import settings
+from .job_store import claim_job, create_job, list_queued_tasks, update_job_status
+from .llm_limiter import ProviderUnavailable, get_breaker
+from .pdf_parser import shutdown_parse_pool
+
+# Lane prioritas: angka kecil diproses lebih dulu.
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFullError(Exception):
+    """Antrian executor penuh; request sebaiknya dicoba lagi nanti."""
+
+
+@dataclass(order=True)
+class _QueueItem:
+    priority: int
+    seq: int
+    job_id: str = field(compare=False)
+    task: Dict[str, Any] = field(compare=False)
+
+
+class JobExecutor:
+    """
+    Executor job di dalam event loop: antrian prioritas yang dibatasi ukurannya,
+    sejumlah worker coroutine, dan drain saat shutdown. Panggilan LLM berjalan
+    sebagai asyncio, parsing PDF di process pool (lihat pdf_parser).
+
+    Payload setiap job ikut disimpan di job store, sehingga job yang masih
+    'queued' saat proses berhenti akan diambil lagi oleh recover() berikutnya
+    (atau oleh proses lain, lewat claim_job yang atomik).
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[..., Awaitable[Any]]], workers: int, queue_size: int):
+        self.handlers = handlers
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: list[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._queued_ids: set[str] = set()
+        self._deferred: Dict[str, asyncio.TimerHandle] = {}
+        self._running = 0
+        self._accepting = False
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self._accepting = True
+        self._workers = [
+            asyncio.create_task(self._worker_loop(), name=f"job-worker-{i}") for i in range(self.workers)
+        ]
+        print(f"Job executor started: {self.workers} workers, queue size {self.queue_size}")
+
+    def is_full(self) -> bool:
+        return self._queue is None or self._queue.full()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "accepting": self._accepting,
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "deferred": len(self._deferred),
+            "queue_size": self.queue_size,
+        }
+
+    def submit(self, job_id: str, task: Dict[str, Any], priority: int = PRIORITIES["normal"]) -> None:
+        """Memasukkan job ke antrian lokal. Harus dipanggil dari event loop executor."""
+        if not self._accepting or self._queue is None:
+            raise QueueFullError("Executor is not accepting jobs.")
+        if job_id in self._queued_ids:
+            return
+        try:
+            self._queue.put_nowait(_QueueItem(priority, next(self._seq), job_id, task))
+        except asyncio.QueueFull:
+            raise QueueFullError("Evaluation queue is full.")
+        self._queued_ids.add(job_id)
+
+    async def enqueue(
+        self, job_id: str, task: Dict[str, Any], priority: int = PRIORITIES["normal"], **fields: Any
+    ) -> None:
+        """Membuat record job (beserta payload-nya) di store lalu mengantrikannya."""
+        if settings.EXECUTOR_MODE != "external" and self.is_full():
+            raise QueueFullError("Evaluation queue is full.")
+        await asyncio.to_thread(create_job, job_id, task=task, priority=priority, **fields)
+        if settings.EXECUTOR_MODE == "external":
+            # Dijalankan oleh proses worker terpisah (python -m app.worker).
+            return
+        try:
+            self.submit(job_id, task, priority)
+        except QueueFullError:
+            await asyncio.to_thread(update_job_status, job_id, "failed", {"error": "Evaluation queue is full."})
+            raise
+
+    def _defer(self, item: _QueueItem, delay: float) -> None:
+        """Mengantrikan ulang job setelah `delay` detik (provider LLM sedang tidak sehat)."""
+        metrics.JOBS_DEFERRED.inc()
+        self._deferred[item.job_id] = asyncio.get_running_loop().call_later(
+            max(delay, 1.0), self._resubmit, item
+        )
+
+    def _resubmit(self, item: _QueueItem) -> None:
+        self._deferred.pop(item.job_id, None)
+        if not self._accepting:
+            return  # tetap 'queued' di store, diambil recover() berikutnya
+        try:
+            self.submit(item.job_id, item.task, item.priority)
+        except QueueFullError:
+            self._defer(item, settings.EXECUTOR_POLL_SECONDS)
+
+    async def recover(self, limit: Optional[int] = None) -> int:
+        """Mengantrikan job 'queued' dari store (mis. sisa dari proses sebelumnya)."""
+        if get_breaker().is_open():
+            return 0  # job tetap di store sampai provider LLM pulih
+        free = self.queue_size - (self._queue.qsize() if self._queue else 0)
+        limit = min(limit or free, free)
+        if limit <= 0:
+            return 0
+        recovered = 0
+        for job_id, record in await asyncio.to_thread(list_queued_tasks, limit):
+            if job_id in self._queued_ids or job_id in self._deferred:
+                continue
+            try:
+                self.submit(job_id, record["task"], record.get("priority", PRIORITIES["normal"]))
+                recovered += 1
+            except QueueFullError:
+                break
+        return recovered
+
+    async def _worker_loop(self) -> None:
+        while True:
+            item: _QueueItem = await self._queue.get()
+            try:
+                self._queued_ids.discard(item.job_id)
+                # Hanya satu proses yang boleh menjalankan sebuah job.
+                record = await asyncio.to_thread(claim_job, item.job_id)
+                if record is None:
+                    continue
+                waited = time.time() - record.get("created_at", time.time())
+                metrics.set_queue_wait(item.task["type"], max(waited, 0.0))
+                handler = self.handlers[item.task["type"]]
+                self._running += 1
+                started = time.perf_counter()
+                try:
+                    await handler(job_id=item.job_id, **item.task.get("args", {}))
+                finally:
+                    self._running -= 1
+                if item.task["type"] == "evaluation":
+                    # Durasi job teramati menjadi dasar estimasi waktu tunggu admission control.
+                    get_admission().observe_service_time(time.perf_counter() - started)
+            except asyncio.CancelledError:
+                raise
+            except ProviderUnavailable as e:
+                self._defer(item, e.retry_after)
+            except Exception as e:
+                print(f"Executor error for job {item.job_id}: {e}")
+                await asyncio.to_thread(update_job_status, item.job_id, "failed", {"error": str(e)})
+            finally:
+                get_admission().release(item.job_id)
+                self._queue.task_done()
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Berhenti menerima job baru, tunggu antrian dan job berjalan selesai
+        (maksimal `timeout` detik), lalu hentikan worker. Job yang belum sempat
+        diambil tetap 'queued' di store dan akan di-recover saat start berikutnya.
+        """
+        self._accepting = False
+        for handle in self._deferred.values():
+            handle.cancel()  # job yang ditunda tetap 'queued' di store
+        self._deferred.clear()
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"Executor drain timed out with {self._queue.qsize()} queued, {self._running} running")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        shutdown_parse_pool(wait=False)
+        print("Job executor stopped")
+
+
+_executor: Optional[JobExecutor] = None
+
+
+def get_executor() -> JobExecutor:
+    """Executor per proses (dibuat sekali, handler dari app.tasks)."""
+    global _executor
+    if _executor is None:
+        from .tasks import TASK_HANDLERS
+
+        _executor = JobExecutor(
+            TASK_HANDLERS, workers=settings.EXECUTOR_WORKERS, queue_size=settings.EXECUTOR_QUEUE_SIZE
+        )
+    return _executor
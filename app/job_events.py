@@ -0,0 +1,192 @@
+# /app/job_events.py
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Optional, Set
+
+# Notifikasi perubahan job. update_job_status mempublikasikan record terbaru ke
+# semua subscriber di proses ini; backend Redis juga meneruskannya lewat pub/sub
+# ke proses lain. Record membawa `version` yang naik di setiap update, sehingga
+# event ganda (lokal + gema dari Redis) atau yang datang terlambat bisa diabaikan.
+
+
+class Subscription:
+    """Antrian event untuk satu job, terikat ke event loop pemanggil subscribe()."""
+
+    def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop):
+        self.job_id = job_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.last_version = -1
+
+    def _deliver(self, record: Dict[str, Any]) -> None:
+        # Dipanggil di event loop subscriber.
+        if record.get("version", 0) > self.last_version:
+            self.last_version = record.get("version", 0)
+            self.queue.put_nowait(record)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Menunggu event berikutnya; None jika timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        unsubscribe(self)
+
+
+_subscribers: Dict[str, Set[Subscription]] = {}
+_lock = threading.Lock()
+
+
+def subscribe(job_id: str) -> Subscription:
+    """Mendaftarkan subscriber untuk job_id di event loop yang sedang berjalan."""
+    sub = Subscription(job_id, asyncio.get_running_loop())
+    with _lock:
+        _subscribers.setdefault(job_id, set()).add(sub)
+    _ensure_remote_listener()
+    return sub
+
+
+def unsubscribe(sub: Subscription) -> None:
+    with _lock:
+        subs = _subscribers.get(sub.job_id)
+        if subs:
+            subs.discard(sub)
+            if not subs:
+                del _subscribers[sub.job_id]
+
+
+def notify_local(job_id: str, record: Dict[str, Any]) -> None:
+    """Meneruskan record ke subscriber di proses ini (aman dari thread mana pun)."""
+    with _lock:
+        subs = list(_subscribers.get(job_id, ()))
+    for sub in subs:
+        try:
+            sub.loop.call_soon_threadsafe(sub._deliver, dict(record))
+        except RuntimeError:
+            # Event loop subscriber sudah ditutup.
+            unsubscribe(sub)
+
+
+def publish(job_id: str, record: Optional[Dict[str, Any]]) -> None:
+    """Dipanggil oleh job_store setelah setiap update."""
+    if record is None:
+        return
+    notify_local(job_id, record)
+    from .job_store import get_backend
+
+    publish_remote = getattr(get_backend(), "publish_event", None)
+    if publish_remote is not None:
+        try:
+            publish_remote(job_id, json.dumps(record))
+        except Exception as e:
+            print(f"Failed to publish job event for {job_id}: {e}")
+
+
+_remote_started = False
+
+
+def _ensure_remote_listener() -> None:
+    """Untuk backend yang mendukung pub/sub, jalankan satu thread listener per proses."""
+    global _remote_started
+    if _remote_started:
+        return
+    from .job_store import get_backend
+
+    listen = getattr(get_backend(), "listen_events", None)
+    with _lock:
+        if _remote_started:
+            return
+        _remote_started = True
+    if listen is None:
+        return
+
+    def run():
+        for job_id, payload in listen():
+            notify_local(job_id, json.loads(payload))
+
+    threading.Thread(target=run, name="job-events-listener", daemon=True).start()
+
+
+def backend_pushes_across_processes() -> bool:
+    """True jika notifikasi dari worker proses lain akan sampai ke proses ini."""
+    from .job_store import get_backend
+
+    backend = get_backend()
+    return hasattr(backend, "listen_events") or getattr(backend, "single_process", False)
+
+
+# Interval cek ulang ke store untuk backend yang tidak bisa mengirim notifikasi
+# antar-proses (SQLite). Backend memory dan Redis murni berbasis notifikasi.
+FALLBACK_RECHECK_SECONDS = 1.0
+
+
+async def wait_for_job(job_id: str, predicate, timeout: float) -> Optional[Dict[str, Any]]:
+    """
+    Menunggu sampai `predicate(record)` bernilai True atau timeout habis, lalu
+    mengembalikan record terbaru (None jika job tidak ada).
+    """
+    from .job_store import get_job_status
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    recheck = None if backend_pushes_across_processes() else FALLBACK_RECHECK_SECONDS
+
+    # Subscribe dulu sebelum membaca, supaya tidak ada transisi yang terlewat.
+    sub = subscribe(job_id)
+    try:
+        record = await asyncio.to_thread(get_job_status, job_id)
+        while record is not None and not predicate(record):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            event = await sub.get(min(remaining, recheck) if recheck else remaining)
+            if event is not None:
+                if event.get("version", 0) > record.get("version", 0):
+                    record = event
+            elif recheck:
+                record = await asyncio.to_thread(get_job_status, job_id) or record
+        return record
+    finally:
+        sub.close()
+
+
+async def stream_job(job_id: str, heartbeat: float = 15.0):
+    """
+    Async generator berisi record job: state saat ini, lalu setiap transisi,
+    sampai status akhir. Menghasilkan None sebagai heartbeat jika tidak ada event.
+    Berhenti juga jika record job sudah dihapus dari store (TTL/eviksi).
+    """
+    from .job_store import FINISHED_STATUSES, get_job_status
+
+    recheck = None if backend_pushes_across_processes() else FALLBACK_RECHECK_SECONDS
+    sub = subscribe(job_id)
+    try:
+        record = await asyncio.to_thread(get_job_status, job_id)
+        if record is None:
+            return
+        yield record
+        last_version = record.get("version", 0)
+        idle = 0.0
+        while record.get("status") not in FINISHED_STATUSES:
+            wait = min(heartbeat - idle, recheck) if recheck else heartbeat
+            event = await sub.get(wait)
+            if event is None and recheck:
+                event = await asyncio.to_thread(get_job_status, job_id)
+                if event is None:
+                    return
+            if event is not None and event.get("version", 0) > last_version:
+                record, last_version, idle = event, event.get("version", 0), 0.0
+                yield record
+                continue
+            idle += wait
+            if idle >= heartbeat:
+                idle = 0.0
+                if not recheck and await asyncio.to_thread(get_job_status, job_id) is None:
+                    return
+                yield None
+    finally:
+        sub.close()
@@ -1,22 +1,491 @@
 # /app/job_store.py
 
-from typing import Dict, Any
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse
 
-# Ini akan bertindak sebagai database in-memory.
-jobs: Dict[str, Dict[str, Any]] = {}
-document_paths: dict[str, str] = {} 
+from . import job_events
+from .config import settings
 
-def create_job(job_id: str):
-    """Membuat entri job baru dengan status 'queued'."""
-    jobs[job_id] = {"status": "queued", "result": None}
+# Status akhir: job dengan status ini boleh dihapus setelah TTL / saat melebihi batas.
+FINISHED_STATUSES = ("completed", "failed")
+
+
+# ===========================
+# Backend
+# ===========================
+class MemoryBackend:
+    """Backend in-memory (satu proses saja). Cocok untuk development dan test."""
+
+    single_process = True
+
+    def __init__(self, ttl_seconds: float, max_finished: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._documents: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, job_id: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id] = dict(record)
+            self._evict(time.time())
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def update_job(
+        self, job_id: str, fields: Dict[str, Any], expect_status: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return None
+            if expect_status is not None and record.get("status") != expect_status:
+                return None
+            record.update(fields)
+            record["version"] = record.get("version", 0) + 1
+            if record.get("status") in FINISHED_STATUSES:
+                self._finished_at.setdefault(job_id, time.time())
+                self._evict(time.time())
+            return dict(record)
+
+    def count_jobs(self) -> int:
+        return len(self._jobs)
+
+    def list_queued_tasks(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            queued = [
+                (r.get("priority", 1), r.get("created_at", 0), j, dict(r))
+                for j, r in self._jobs.items()
+                if r.get("status") == "queued" and r.get("task")
+            ]
+        queued.sort(key=lambda item: item[:2])
+        return [(j, r) for _, _, j, r in queued[:limit]]
+
+    def _evict(self, now: float) -> None:
+        expired = [j for j, t in self._finished_at.items() if self.ttl_seconds and now - t > self.ttl_seconds]
+        overflow = len(self._finished_at) - len(expired) - self.max_finished
+        if overflow > 0:
+            remaining = sorted((t, j) for j, t in self._finished_at.items() if j not in expired)
+            expired.extend(j for _, j in remaining[:overflow])
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._finished_at.pop(job_id, None)
+
+    def register_document(self, document_id: str, path: str, content_hash: Optional[str]) -> None:
+        with self._lock:
+            self._documents[document_id] = (path, content_hash)
+            if content_hash:
+                self._hashes[content_hash] = document_id
+
+    def get_document_path(self, document_id: str) -> Optional[str]:
+        entry = self._documents.get(document_id)
+        return entry[0] if entry else None
+
+    def find_document_by_hash(self, content_hash: str) -> Optional[str]:
+        return self._hashes.get(content_hash)
+
+
+class SQLiteBackend:
+    """
+    Backend SQLite dalam mode WAL. Aman dipakai bersama oleh beberapa proses
+    worker (mis. gunicorn -w 4) selama berada di satu host / volume.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_finished: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                priority INTEGER NOT NULL DEFAULT 1,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                document_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                content_hash TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);
+            """
+        )
+        # Database lama belum punya kolom status/priority.
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "status" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN status TEXT NOT NULL DEFAULT 'queued'")
+            conn.execute("UPDATE jobs SET status = json_extract(data, '$.status')")
+        if "priority" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 1")
+        conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, priority, created_at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Satu koneksi per thread; autocommit, transaksi eksplisit bila perlu.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_job(self, job_id: str, record: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, status, priority, created_at, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, NULL)",
+            (
+                job_id,
+                json.dumps(record),
+                record.get("status", "queued"),
+                record.get("priority", 1),
+                record.get("created_at", time.time()),
+            ),
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_job(
+        self, job_id: str, fields: Dict[str, Any], expect_status: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            record = json.loads(row[0]) if row else None
+            if record is None or (expect_status is not None and record.get("status") != expect_status):
+                conn.execute("COMMIT")
+                return None
+            record.update(fields)
+            record["version"] = record.get("version", 0) + 1
+            finished = record.get("status") in FINISHED_STATUSES
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET data = ?, status = ?, finished_at = COALESCE(finished_at, ?) WHERE job_id = ?",
+                (json.dumps(record), record.get("status"), now if finished else None, job_id),
+            )
+            if finished:
+                self._evict(conn, now)
+            conn.execute("COMMIT")
+            return record
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def count_jobs(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def list_queued_tasks(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        rows = self._conn().execute(
+            """
+            SELECT job_id, data FROM jobs
+            WHERE status = 'queued' AND json_extract(data, '$.task') IS NOT NULL
+            ORDER BY priority, created_at LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        return [(job_id, json.loads(data)) for job_id, data in rows]
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            """
+            DELETE FROM jobs WHERE job_id IN (
+                SELECT job_id FROM jobs WHERE finished_at IS NOT NULL
+                ORDER BY finished_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_finished,),
+        )
+
+    def register_document(self, document_id: str, path: str, content_hash: Optional[str]) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO documents (document_id, path, content_hash, created_at) VALUES (?, ?, ?, ?)",
+            (document_id, path, content_hash, time.time()),
+        )
+
+    def get_document_path(self, document_id: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT path FROM documents WHERE document_id = ?", (document_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def find_document_by_hash(self, content_hash: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT document_id FROM documents WHERE content_hash = ? ORDER BY created_at DESC LIMIT 1",
+            (content_hash,),
+        ).fetchone()
+        return row[0] if row else None
+
+
+class RedisBackend:
+    """
+    Backend Redis (atau server yang kompatibel). Setiap job disimpan sebagai hash
+    `job:<id>` dengan nilai field ber-encode JSON; job yang selesai diberi EXPIRE
+    dan dicatat di sorted set untuk membatasi jumlahnya. Job yang belum selesai
+    dicatat di set `jobs:active`, supaya count_jobs() tidak perlu SCAN.
+    """
+
+    # Update atomik: hanya men-set field jika job masih ada (dan, jika ARGV[1]
+    # tidak kosong, jika status saat ini sama dengan ARGV[1]).
+    _UPDATE_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+    if ARGV[1] ~= '' and redis.call('HGET', KEYS[1], 'status') ~= ARGV[1] then return 0 end
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('HINCRBY', KEYS[1], 'version', 1)
+    return 1
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, max_finished: int, prefix: str = "cv_eval"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "JOB_STORE_URL uses Redis but the 'redis' package is not installed (pip install redis)."
+            ) from e
+
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._update = self._redis.register_script(self._UPDATE_SCRIPT)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+        return {k: json.dumps(v) for k, v in fields.items()}
+
+    @staticmethod
+    def _decode(raw: Dict[bytes, bytes]) -> Dict[str, Any]:
+        return {k.decode(): json.loads(v) for k, v in raw.items()}
+
+    def create_job(self, job_id: str, record: Dict[str, Any]) -> None:
+        key = self._key("job", job_id)
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=self._encode(record))
+        if record.get("status") not in FINISHED_STATUSES:
+            pipe.sadd(self._key("jobs", "active"), job_id)
+        if record.get("task") and record.get("status") == "queued":
+            score = record.get("priority", 1) * 1e10 + record.get("created_at", time.time())
+            pipe.zadd(self._key("jobs", "queued"), {job_id: score})
+        pipe.execute()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.hgetall(self._key("job", job_id))
+        return self._decode(raw) if raw else None
+
+    def update_job(
+        self, job_id: str, fields: Dict[str, Any], expect_status: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        key = self._key("job", job_id)
+        expected = json.dumps(expect_status) if expect_status is not None else ""
+        args = [expected] + [item for pair in self._encode(fields).items() for item in pair]
+        if not self._update(keys=[key], args=args):
+            return None
+        record = self.get_job(job_id)
+        status = fields.get("status")
+        if status == "queued" and record and record.get("task"):
+            score = record.get("priority", 1) * 1e10 + record.get("created_at", time.time())
+            self._redis.zadd(self._key("jobs", "queued"), {job_id: score})
+        elif status is not None:
+            self._redis.zrem(self._key("jobs", "queued"), job_id)
+        if status in FINISHED_STATUSES:
+            self._mark_finished(job_id)
+        return record
+
+    def count_jobs(self) -> int:
+        # Job aktif + job selesai yang belum kedaluwarsa (skor = waktu selesai).
+        finished_key = self._key("jobs", "finished")
+        pipe = self._redis.pipeline()
+        pipe.scard(self._key("jobs", "active"))
+        if self.ttl_seconds:
+            pipe.zcount(finished_key, time.time() - self.ttl_seconds, "+inf")
+        else:
+            pipe.zcard(finished_key)
+        active, finished = pipe.execute()
+        return active + finished
+
+    def list_queued_tasks(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        tasks = []
+        for raw_id in self._redis.zrange(self._key("jobs", "queued"), 0, limit - 1):
+            job_id = raw_id.decode()
+            record = self.get_job(job_id)
+            if record is None:
+                self._redis.zrem(self._key("jobs", "queued"), job_id)
+            elif record.get("status") == "queued":
+                tasks.append((job_id, record))
+        return tasks
+
+    def _mark_finished(self, job_id: str) -> None:
+        finished_key = self._key("jobs", "finished")
+        now = time.time()
+        pipe = self._redis.pipeline()
+        pipe.srem(self._key("jobs", "active"), job_id)
+        if self.ttl_seconds:
+            pipe.expire(self._key("job", job_id), int(self.ttl_seconds))
+            # Entri yang record-nya sudah kedaluwarsa (EXPIRE) ikut dibuang.
+            pipe.zremrangebyscore(finished_key, "-inf", now - self.ttl_seconds)
+        pipe.zadd(finished_key, {job_id: now}, nx=True)
+        pipe.execute()
+
+        overflow = self._redis.zcard(finished_key) - self.max_finished
+        if overflow > 0:
+            oldest = self._redis.zrange(finished_key, 0, overflow - 1)
+            pipe = self._redis.pipeline()
+            for old_id in oldest:
+                pipe.delete(self._key("job", old_id.decode()))
+            pipe.zrem(finished_key, *oldest)
+            pipe.execute()
+
+    def publish_event(self, job_id: str, payload: str) -> None:
+        self._redis.publish(self._key("job_events", job_id), payload)
+
+    def listen_events(self):
+        """Generator (blocking) berisi (job_id, payload) dari semua proses."""
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pattern = self._key("job_events", "*")
+        pubsub.psubscribe(pattern)
+        prefix_len = len(pattern) - 1
+        for message in pubsub.listen():
+            if message.get("type") == "pmessage":
+                yield message["channel"].decode()[prefix_len:], message["data"].decode()
+
+    def register_document(self, document_id: str, path: str, content_hash: Optional[str]) -> None:
+        pipe = self._redis.pipeline()
+        pipe.set(self._key("doc", document_id), path)
+        if content_hash:
+            pipe.set(self._key("dochash", content_hash), document_id)
+        pipe.execute()
+
+    def get_document_path(self, document_id: str) -> Optional[str]:
+        value = self._redis.get(self._key("doc", document_id))
+        return value.decode() if value else None
+
+    def find_document_by_hash(self, content_hash: str) -> Optional[str]:
+        value = self._redis.get(self._key("dochash", content_hash))
+        return value.decode() if value else None
+
+
+def create_backend(url: str):
+    """Memilih backend dari URL: memory://, sqlite:///path/to/db, atau redis://..."""
+    parsed = urlparse(url)
+    ttl, cap = settings.JOB_TTL_SECONDS, settings.JOB_STORE_MAX_FINISHED
+    if parsed.scheme == "memory":
+        return MemoryBackend(ttl, cap)
+    if parsed.scheme == "sqlite":
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else parsed.path
+        return SQLiteBackend(path, ttl, cap)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url, ttl, cap)
+    raise ValueError(f"Unsupported JOB_STORE_URL scheme: {parsed.scheme!r}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(settings.JOB_STORE_URL)
+    return _backend
+
+
+def set_backend(backend) -> None:
+    """Mengganti backend (mis. MemoryBackend di test)."""
+    global _backend
+    _backend = backend
+
+
+# ===========================
+# API job
+# ===========================
+def create_job(job_id: str, **fields: Any):
+    """Membuat entri job baru dengan status 'queued' (field tambahan opsional)."""
+    record = {"status": "queued", "result": None, "version": 0, "created_at": time.time(), **fields}
+    get_backend().create_job(job_id, record)
 
 def get_job_status(job_id: str) -> Dict[str, Any] | None:
     """Mengambil status dan hasil dari sebuah job."""
-    return jobs.get(job_id)
-
-def update_job_status(job_id: str, status: str, result: Dict[str, Any] = None):
-    """Memperbarui status dan hasil dari sebuah job."""
-    if job_id in jobs:
-        jobs[job_id]["status"] = status
-        if result:
-            jobs[job_id]["result"] = result
+    return get_backend().get_job(job_id)
+
+def update_job_status(
+    job_id: str,
+    status: str,
+    result: Dict[str, Any] = None,
+    progress: Dict[str, Any] = None,
+    timings: Dict[str, Any] = None,
+):
+    """Memperbarui status dan hasil dari sebuah job, lalu memberi tahu subscriber."""
+    fields: Dict[str, Any] = {"status": status}
+    if result:
+        fields["result"] = result
+    if progress is not None:
+        fields["progress"] = progress
+    if timings is not None:
+        fields["timings"] = timings
+    record = get_backend().update_job(job_id, fields)
+    job_events.publish(job_id, record)
+
+
+def claim_job(job_id: str) -> Dict[str, Any] | None:
+    """
+    Mengambil alih job: ubah status 'queued' -> 'processing' secara atomik.
+    Mengembalikan record jika berhasil, None jika job sudah diambil worker lain.
+    """
+    record = get_backend().update_job(job_id, {"status": "processing"}, expect_status="queued")
+    job_events.publish(job_id, record)
+    return record
+
+def count_jobs() -> int:
+    """Jumlah record job di store (untuk metrik)."""
+    return get_backend().count_jobs()
+
+def list_queued_tasks(limit: int = 100) -> list[tuple[str, Dict[str, Any]]]:
+    """Job berstatus 'queued' yang membawa payload `task`, urut prioritas lalu umur."""
+    return get_backend().list_queued_tasks(limit)
+
+
+# ===========================
+# API dokumen
+# ===========================
+def register_document(document_id: str, path: str, content_hash: str | None = None):
+    """Mencatat path file untuk sebuah document_id (dan hash isinya, untuk dedup)."""
+    get_backend().register_document(document_id, path, content_hash)
+
+def get_document_path(document_id: str) -> str | None:
+    """Mengambil path file dari sebuah document_id."""
+    return get_backend().get_document_path(document_id)
+
+def find_document_by_hash(content_hash: str) -> str | None:
+    """Mencari document_id yang isinya identik (berdasarkan SHA-256)."""
+    return get_backend().find_document_by_hash(content_hash)
@@ -0,0 +1,103 @@
+# /app/json_stream.py
+
+import json
+from typing import Any, Dict, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Parser inkremental untuk satu objek JSON dari output LLM yang di-stream.
+    `feed(chunk)` mengembalikan field top-level yang nilainya sudah lengkap
+    sejak panggilan sebelumnya, jadi `cv_match_rate` sudah bisa dipakai
+    sebelum `cv_feedback` selesai ditulis. Teks sebelum '{' (mis. code fence)
+    diabaikan; hasil akhir tetap diparse ulang dari teks lengkap.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        self._buf += chunk
+        completed: Dict[str, Any] = {}
+        while self._pos < len(self._buf) and not self.done:
+            ch = self._buf[self._pos]
+            state = self._state
+            if state == "start":
+                if ch == "{":
+                    self._state = "key"
+            elif state == "key":
+                if ch == '"':
+                    self._start, self._state = self._pos, "key_string"
+                elif ch == "}":
+                    self.done = True
+            elif state == "key_string":
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._key = json.loads(self._buf[self._start:self._pos + 1])
+                    self._state = "colon"
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value_start"
+            elif state == "value_start":
+                if not ch.isspace():
+                    self._start, self._depth, self._in_string = self._pos, 0, False
+                    self._state = "value"
+                    continue  # karakter ini diproses ulang sebagai awal nilai
+            elif state == "value":
+                self._scan_value(ch, completed)
+            elif state == "after_value":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self.done = True
+            self._pos += 1
+        return completed
+
+    def _scan_value(self, ch: str, completed: Dict[str, Any]) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._finish(self._pos + 1, completed, "after_value")
+        elif ch == '"':
+            self._in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            if self._depth == 0:
+                # Penutup objek top-level mengakhiri nilai skalar sebelumnya.
+                self._finish(self._pos, completed, "after_value")
+                self.done = ch == "}"
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish(self._pos + 1, completed, "after_value")
+        elif self._depth == 0 and ch == ",":
+            self._finish(self._pos, completed, "key")
+        elif self._depth == 0 and ch.isspace():
+            self._finish(self._pos, completed, "after_value")
+
+    def _finish(self, end: int, completed: Dict[str, Any], next_state: str) -> None:
+        self._state = next_state
+        try:
+            value = json.loads(self._buf[self._start:end])
+        except ValueError:
+            return  # nilai tidak valid; biarkan parse akhir yang melaporkan error
+        self.fields[self._key] = value
+        completed[self._key] = value
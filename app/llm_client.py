@@ -0,0 +1,616 @@
+# /app/llm_client.py
+
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set, Type
+
+from pydantic import BaseModel
+from tenacity import AsyncRetrying, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+
+from . import llm_output, metrics
+from .config import settings
+from .json_stream import IncrementalJSONParser
+from .llm_cache import get_llm_cache, make_cache_key
+from .llm_limiter import ProviderUnavailable, provider_slot
+from .warmup import register_component
+
+
+# ===========================
+# Klien LLM
+# ===========================
+class LLMClient:
+    """Antarmuka minimal klien LLM: menghasilkan teks dari prompt secara async."""
+
+    model_name: str = ""
+
+    async def generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, generation_config: Dict[str, Any]) -> AsyncIterator[str]:
+        """Menghasilkan teks respons per potongan; default: satu potongan dari generate()."""
+        yield await self.generate(prompt, generation_config)
+
+
+class GeminiClient(LLMClient):
+    """
+    Klien Gemini berbasis `generate_content_async`. Klien gRPC async milik
+    google-generativeai dibuat sekali dan terikat ke event loop LLM, sehingga
+    koneksinya dipakai ulang oleh semua panggilan di proses ini.
+    """
+
+    def __init__(self, model_name: str, api_key: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        response = await self._model.generate_content_async(
+            prompt, generation_config=self._genai.GenerationConfig(**generation_config)
+        )
+        return response.text
+
+    async def stream(self, prompt: str, generation_config: Dict[str, Any]) -> AsyncIterator[str]:
+        response = await self._model.generate_content_async(
+            prompt, generation_config=self._genai.GenerationConfig(**generation_config), stream=True
+        )
+        async for chunk in response:
+            # Potongan terakhir bisa hanya berisi finish_reason tanpa teks.
+            if chunk.parts:
+                yield chunk.text
+
+
+class RateLimitError(RuntimeError):
+    """Error 429 tiruan dari FakeLLMClient (kapasitas provider terlampaui)."""
+
+    code = 429
+
+
+class FakeLLMClient(LLMClient):
+    """Pengganti lokal untuk test/benchmark: tanpa jaringan, latensi bisa diatur."""
+
+    DEFAULT_RESPONSE = {
+        "cv_match_rate": 0.75,
+        "cv_feedback": "Solid backend experience.",
+        "project_score": 4.0,
+        "project_feedback": "Meets most of the requirements.",
+        "overall_summary": "Promising candidate.",
+    }
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[str], Any]] = None,
+        latency: float | Callable[[], float] = 0.0,
+        model_name: str = "fake-llm",
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        stream_chunk_chars: int = 16,
+        capacity: int = 0,
+    ):
+        """
+        `latency` boleh berupa detik tetap atau fungsi yang mengembalikan detik
+        (distribusi latensi). Dengan peluang `failure_rate`, panggilan gagal
+        seperti error API sementara (setelah latensinya berlalu). Pada mode
+        stream, respons dikirim per `stream_chunk_chars` karakter dan latensinya
+        dibagi rata antar potongan. Dengan `capacity` > 0, request yang melebihi
+        sekian request bersamaan langsung ditolak dengan RateLimitError (429).
+        """
+        self.responder = responder
+        self.latency = latency
+        self.model_name = model_name
+        self.failure_rate = failure_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self.capacity = capacity
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+
+    def _next_latency(self) -> float:
+        self.calls += 1
+        return self.latency() if callable(self.latency) else self.latency
+
+    @contextmanager
+    def _occupy(self):
+        if self.capacity and self.in_flight >= self.capacity:
+            self.rate_limited += 1
+            raise RateLimitError("429 Resource has been exhausted (simulated)")
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def _maybe_fail(self) -> None:
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise RuntimeError("Simulated LLM failure")
+
+    def _respond(self, prompt: str) -> str:
+        response = self.responder(prompt) if self.responder else self.DEFAULT_RESPONSE
+        return response if isinstance(response, str) else json.dumps(response)
+
+    async def generate(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        latency = self._next_latency()
+        with self._occupy():
+            if latency:
+                await asyncio.sleep(latency)
+            self._maybe_fail()
+            return self._respond(prompt)
+
+    async def stream(self, prompt: str, generation_config: Dict[str, Any]) -> AsyncIterator[str]:
+        latency = self._next_latency()
+        text = self._respond(prompt)
+        size = max(self.stream_chunk_chars, 1)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        with self._occupy():
+            for index, chunk in enumerate(chunks):
+                if latency:
+                    await asyncio.sleep(latency / len(chunks))
+                if index == 0:
+                    self._maybe_fail()
+                yield chunk
+
+
+def long_tail_latency(
+    median: float, sigma: float = 0.5, tail_rate: float = 0.0, tail_factor: float = 10.0, seed: Optional[int] = None
+) -> Callable[[], float]:
+    """
+    Distribusi latensi untuk FakeLLMClient: lognormal di sekitar `median`, dan
+    dengan peluang `tail_rate` request "macet" `tail_factor` kali lebih lama
+    (ekor panjang seperti latensi Gemini di jam sibuk).
+    """
+    rng = random.Random(seed)
+    mu = math.log(median) if median > 0 else 0.0
+
+    def latency() -> float:
+        if median <= 0:
+            return 0.0
+        value = rng.lognormvariate(mu, sigma)
+        if tail_rate and rng.random() < tail_rate:
+            value *= tail_factor
+        return value
+
+    return latency
+
+
+_clients: Dict[str, LLMClient] = {}
+_override: Optional[LLMClient] = None
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(model_name: Optional[str] = None) -> LLMClient:
+    """Mengembalikan klien (satu instance per nama model, atau override jika diset)."""
+    if _override is not None:
+        return _override
+    model_name = model_name or settings.LLM_MODEL
+    with _clients_lock:
+        client = _clients.get(model_name)
+        if client is None:
+            client = GeminiClient(model_name, settings.GOOGLE_API_KEY)
+            _clients[model_name] = client
+    return client
+
+
+def register_llm_client(client: LLMClient) -> None:
+    """Memakai `client` untuk model_name-nya saja (mis. model fallback palsu di benchmark hedging)."""
+    with _clients_lock:
+        _clients[client.model_name] = client
+
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    """Mengganti klien untuk semua model (mis. FakeLLMClient di test). None = kembali ke Gemini."""
+    global _override
+    _override = client
+
+
+register_component(
+    "llm_client", lambda: _override is not None or settings.LLM_MODEL in _clients, get_llm_client
+)
+
+
+# ===========================
+# Event loop LLM bersama
+# ===========================
+# Semua panggilan LLM di satu proses berjalan di satu event loop khusus, supaya
+# koneksi, batas concurrency (app/llm_limiter), circuit breaker, dan backoff
+# retry dipakai bersama oleh semua job tanpa memakan thread dari threadpool FastAPI.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+# ===========================
+# Hedging
+# ===========================
+# Request yang belum selesai setelah persentil LLM_HEDGE_PERCENTILE dari latensi
+# terbarunya dikirim sekali lagi (opsional ke LLM_HEDGE_MODEL); respons pertama
+# yang berhasil dipakai dan yang lain dibatalkan. State di bawah hanya disentuh
+# dari event loop LLM, jadi tidak perlu lock.
+HEDGE_WINDOW = 200  # jumlah latensi terbaru per model untuk menghitung persentil
+
+
+class LatencyTracker:
+    """Latensi request sukses terbaru per model (jendela bergeser)."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, model: str, seconds: float) -> None:
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Persentil ke-`q` (nearest-rank), atau None jika sampel belum cukup."""
+        samples = self._samples.get(model)
+        if not samples or len(samples) < max(min_samples, 1):
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class HedgeBudget:
+    """
+    Membatasi panggilan tambahan: setiap request primer menambah `ratio` token
+    (maksimal `burst`), setiap hedge memakai satu token. Dengan ratio 0.05,
+    hedging menambah paling banyak ~5% panggilan dalam jangka panjang.
+    """
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+
+    def on_request(self) -> None:
+        self.tokens = min(self.tokens + self.ratio, self.burst)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+_latencies = LatencyTracker()
+_hedge_budget: Optional[HedgeBudget] = None
+
+
+def _get_hedge_budget() -> HedgeBudget:
+    # Hanya dipanggil dari dalam event loop LLM.
+    global _hedge_budget
+    if _hedge_budget is None:
+        _hedge_budget = HedgeBudget(settings.LLM_HEDGE_BUDGET)
+    return _hedge_budget
+
+
+async def _hedged(
+    client: LLMClient,
+    request: Callable[[LLMClient, Optional[Callable[[str, Any], None]]], Awaitable[str]],
+    stats: Dict[str, Any],
+    on_field: Optional[Callable[[str, Any], None]] = None,
+) -> str:
+    """
+    Menjalankan `request(client, emit)`. Jika hedging aktif dan request melewati
+    persentil latensi terbaru modelnya, duplikat dikirim (selama budget masih
+    ada) dan hasil yang pertama berhasil dipakai. Pada request yang di-stream,
+    request yang pertama meneruskan field menjadi pemenang dan yang lain
+    dibatalkan, supaya field dari dua generasi berbeda tidak tercampur.
+    """
+    owner: list = []  # request yang field-nya diteruskan ke `on_field`
+    running: Dict[int, asyncio.Future] = {}
+
+    def sink(index: int) -> Optional[Callable[[str, Any], None]]:
+        if on_field is None:
+            return None
+
+        def emit(key: str, value: Any) -> None:
+            if not owner:
+                owner.append(index)
+                for other, task in running.items():
+                    if other != index:
+                        task.cancel()
+            if owner[0] == index:
+                on_field(key, value)
+
+        return emit
+
+    async def timed(target: LLMClient, index: int) -> str:
+        started = time.perf_counter()
+        text = await request(target, sink(index))
+        _latencies.observe(target.model_name, time.perf_counter() - started)
+        return text
+
+    async def duplicate(target: LLMClient, index: int) -> str:
+        # Duplikat memakai slot concurrency sendiri, jadi tetap dibatasi limiter.
+        async with provider_slot():
+            return await timed(target, index)
+
+    if not settings.LLM_HEDGE_ENABLED:
+        return await timed(client, 0)
+
+    budget = _get_hedge_budget()
+    budget.on_request()
+    delay = _latencies.percentile(client.model_name, settings.LLM_HEDGE_PERCENTILE, settings.LLM_HEDGE_MIN_SAMPLES)
+    primary = running[0] = asyncio.ensure_future(timed(client, 0))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        # Primer yang sudah meneruskan field tidak di-hedge: hasilnya sudah terlihat.
+        if not done and not owner:
+            if budget.try_spend():
+                hedge_client = get_llm_client(settings.LLM_HEDGE_MODEL or client.model_name)
+                running[1] = asyncio.ensure_future(duplicate(hedge_client, 1))
+                tasks.add(running[1])
+                stats["hedges"] = stats.get("hedges", 0) + 1
+            else:
+                stats["hedges_skipped"] = stats.get("hedges_skipped", 0) + 1
+        errors = []
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue  # kalah dari request yang lebih dulu meneruskan field
+                if task.exception() is None:
+                    if task is not primary:
+                        stats["hedge_wins"] = stats.get("hedge_wins", 0) + 1
+                    return task.result()
+                errors.append(task.exception())
+        raise errors[0]
+    finally:
+        # Request yang kalah (atau semuanya, jika pemanggil dibatalkan/timeout) dihentikan.
+        for task in tasks:
+            task.cancel()
+
+
+def parse_json_response(text: str) -> dict:
+    """Membersihkan code fence dan mem-parsing output JSON dari model (dengan perbaikan lokal)."""
+    return llm_output.repair_json(text, set())
+
+
+async def _generate_text(
+    client: LLMClient,
+    prompt: str,
+    generation_config: Dict[str, Any],
+    on_field: Optional[Callable[[str, Any], None]],
+    final: Dict[str, Any],
+    stats: Dict[str, Any],
+    output_model: Optional[Type[BaseModel]] = None,
+    repairs: Optional[Set[str]] = None,
+) -> str:
+    """
+    Satu request ke model. Dengan `on_field`, respons di-stream dan setiap field
+    top-level yang sudah lengkap langsung diteruskan (sekali per field, meskipun
+    request diulang oleh retry); `final` berisi nilai yang sudah diteruskan dan
+    diisi oleh `on_field`. Field dinormalkan dulu sesuai `output_model`; yang
+    tidak valid baru diteruskan dari hasil akhir setelah diperbaiki.
+    """
+    if on_field is None:
+        return await client.generate(prompt, generation_config)
+
+    started = time.perf_counter()
+    parser = IncrementalJSONParser()
+    parts = []
+    async for chunk in client.stream(prompt, generation_config):
+        parts.append(chunk)
+        for key, value in parser.feed(chunk).items():
+            if key in final:
+                continue
+            value, valid = llm_output.coerce_field(output_model, key, value, repairs if repairs is not None else set())
+            if not valid:
+                continue
+            stats.setdefault("first_field_seconds", round(time.perf_counter() - started, 4))
+            on_field(key, value)
+    return "".join(parts)
+
+
+async def _call_on_loop(
+    prompt: str,
+    model_name: Optional[str],
+    temperature: float,
+    use_cache: bool,
+    stats: Dict[str, Any],
+    response_schema: Optional[Dict[str, Any]] = None,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+    output_model: Optional[Type[BaseModel]] = None,
+) -> dict:
+    client = get_llm_client(model_name)
+    generation_config = {"response_mime_type": "application/json", "temperature": temperature}
+    if response_schema is not None:
+        # Structured output: model dipaksa mengikuti skema (ikut menjadi bagian kunci cache).
+        generation_config["response_schema"] = response_schema
+    stats.update(model=client.model_name, prompt_chars=len(prompt), attempts=0, cached=False)
+
+    # use_cache=False hanya melewati pembacaan; hasil baru tetap disimpan ke cache.
+    cache = get_llm_cache()
+    cache_key = make_cache_key(client.model_name, generation_config, prompt) if cache else None
+    if cache and use_cache:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None and output_model is not None:
+            try:
+                cached = llm_output.validate_output(cached, output_model, set())
+            except llm_output.LLMOutputError:
+                cached = None  # entri lama yang tidak lolos validasi: panggil ulang model
+        if cached is not None:
+            stats["cached"] = True
+            if on_field is not None:
+                for key, value in cached.items():
+                    on_field(key, value)
+            return cached
+
+    final: Dict[str, Any] = {}
+    repairs: Set[str] = set()
+    forward = None
+    if on_field is not None:
+
+        def forward(key: str, value: Any) -> None:
+            final[key] = value
+            on_field(key, value)
+
+    async for attempt in AsyncRetrying(
+        wait=wait_exponential(multiplier=1, min=settings.LLM_RETRY_MIN_WAIT, max=settings.LLM_RETRY_MAX_WAIT),
+        stop=stop_after_attempt(settings.LLM_MAX_ATTEMPTS),
+        # Circuit breaker terbuka: gagal cepat, pemanggil (executor) mengantrikan ulang job.
+        retry=retry_if_not_exception_type(ProviderUnavailable),
+        reraise=True,
+    ):
+        with attempt:
+            stats["attempts"] = attempt.retry_state.attempt_number
+            earlier = dict(final)  # field yang diteruskan oleh percobaan sebelumnya
+            try:
+                # Slot concurrency hanya dipegang selama request, tidak selama backoff.
+                async with provider_slot():
+                    text = await asyncio.wait_for(
+                        _hedged(
+                            client,
+                            lambda target, emit: _generate_text(
+                                target, prompt, generation_config, emit, final, stats, output_model, repairs
+                            ),
+                            stats,
+                            forward,
+                        ),
+                        timeout=settings.LLM_TIMEOUT,
+                    )
+                stats["response_chars"] = len(text)
+                parsed = await _parse_or_correct(client, text, generation_config, output_model, repairs, stats)
+                # Field yang sudah diteruskan dari percobaan sebelumnya tetap dipakai,
+                # supaya hasil akhir sama dengan yang sudah dilihat stage berikutnya.
+                # Jika retry menghasilkan nilai lain, hasilnya ditandai sebagai gabungan.
+                merged = sorted(key for key, value in earlier.items() if key in parsed and parsed[key] != value)
+                if merged:
+                    stats["merged_fields"] = merged
+                    print(f"LLM retry output differs in already published fields {merged}; keeping published values")
+                result = {**parsed, **final}
+                if on_field is not None:
+                    for key, value in result.items():
+                        if key not in final:
+                            final[key] = value
+                            on_field(key, value)
+            except Exception as e:
+                if isinstance(e, llm_output.LLMOutputError):
+                    stats["invalid_outputs"] = stats.get("invalid_outputs", 0) + 1
+                print(f"LLM error ({client.model_name}, attempt {attempt.retry_state.attempt_number}): {e}")
+                raise
+            finally:
+                stats["repairs"] = sorted(repairs)
+
+    if cache:
+        await asyncio.to_thread(cache.put, cache_key, result)
+    return result
+
+
+async def _parse_or_correct(
+    client: LLMClient,
+    text: str,
+    generation_config: Dict[str, Any],
+    output_model: Optional[Type[BaseModel]],
+    repairs: Set[str],
+    stats: Dict[str, Any],
+) -> dict:
+    """
+    Mem-parsing dan memvalidasi respons, memperbaiki cacat umum secara lokal.
+    Jika tetap tidak valid, model diminta memperbaikinya dengan prompt koreksi
+    pendek (sekali) sebelum error dilempar ke retry penuh.
+    """
+    try:
+        parsed = llm_output.parse_output(text, output_model, repairs)
+        stats["output"] = "repaired" if repairs else "valid"
+        return parsed
+    except llm_output.LLMOutputError as e:
+        if not settings.LLM_OUTPUT_CORRECTION:
+            raise
+        print(f"LLM output invalid ({e}); asking the model to correct it")
+        stats["corrections"] = stats.get("corrections", 0) + 1
+        prompt = llm_output.correction_prompt(text, e, output_model)
+        async with provider_slot():
+            corrected = await asyncio.wait_for(
+                client.generate(prompt, generation_config), timeout=settings.LLM_TIMEOUT
+            )
+    parsed = llm_output.parse_output(corrected, output_model, repairs)
+    stats["output"] = "corrected"
+    return parsed
+
+
+@contextmanager
+def _record_call(model_name: Optional[str], stats: Dict[str, Any]):
+    # Dicatat di thread/event loop pemanggil, supaya waktu dan jumlah retry masuk
+    # ke rincian job (ContextVar) milik pemanggil, bukan milik event loop LLM.
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        model = stats.get("model", model_name or settings.LLM_MODEL)
+        metrics.observe_llm_call(model, time.perf_counter() - started, stats, ok)
+
+
+async def llm_call_async(
+    prompt: str,
+    model_name: Optional[str] = None,
+    temperature: float = 0.3,
+    use_cache: bool = True,
+    response_schema: Optional[Dict[str, Any]] = None,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+    output_model: Optional[Type[BaseModel]] = None,
+) -> dict:
+    """
+    Memanggil LLM dan mengembalikan JSON; aman dipanggil dari event loop mana pun.
+    Dengan `on_field(key, value)`, respons di-stream dan callback dipanggil di
+    event loop pemanggil begitu setiap field top-level selesai. Dengan
+    `output_model`, hasil divalidasi (dan diperbaiki) sesuai model pydantic stage.
+    """
+    stats: Dict[str, Any] = {}
+    emit = None
+    if on_field is not None:
+        caller = asyncio.get_running_loop()
+
+        def emit(key: str, value: Any) -> None:
+            # Dijadwalkan sebelum hasil future, jadi semua field sampai lebih dulu.
+            caller.call_soon_threadsafe(on_field, key, value)
+
+    with _record_call(model_name, stats):
+        future = asyncio.run_coroutine_threadsafe(
+            _call_on_loop(prompt, model_name, temperature, use_cache, stats, response_schema, emit, output_model),
+            _get_loop(),
+        )
+        return await asyncio.wrap_future(future)
+
+
+def llm_call_sync(
+    prompt: str,
+    model_name: Optional[str] = None,
+    temperature: float = 0.3,
+    use_cache: bool = True,
+    response_schema: Optional[Dict[str, Any]] = None,
+    output_model: Optional[Type[BaseModel]] = None,
+) -> dict:
+    """Versi blocking dari llm_call_async untuk kode sinkron (script, CLI)."""
+    stats: Dict[str, Any] = {}
+    with _record_call(model_name, stats):
+        future = asyncio.run_coroutine_threadsafe(
+            _call_on_loop(
+                prompt, model_name, temperature, use_cache, stats, response_schema, output_model=output_model
+            ),
+            _get_loop(),
+        )
+        return future.result()
@@ -0,0 +1,279 @@
+# /app/llm_limiter.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from . import metrics
+from .config import settings
+
+# Nama kelas error provider yang berarti "terlalu banyak request" atau "sedang
+# kewalahan" (google.api_core.exceptions), dicek lewat nama supaya modul ini
+# tidak bergantung pada SDK Gemini.
+_OVERLOAD_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded"}
+_OVERLOAD_STATUS = {429, 503, 504}
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class ProviderUnavailable(Exception):
+    """Circuit breaker terbuka: provider LLM dianggap tidak sehat selama `retry_after` detik."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM provider is unavailable; retry in {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+def is_client_error(error: BaseException) -> bool:
+    """
+    True jika provider benar-benar menjawab dengan error 4xx (mis. 400 request
+    tidak valid): provider sehat, request-nya yang salah. 408/429 tidak termasuk.
+    """
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and 400 <= code < 500 and code not in (408, 429)
+
+
+def is_overload(error: BaseException) -> bool:
+    """True untuk 429/kuota habis, 503/504, dan timeout: sinyal untuk menurunkan concurrency."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    if type(error).__name__ in _OVERLOAD_ERRORS:
+        return True
+    return getattr(error, "code", None) in _OVERLOAD_STATUS
+
+
+class AdaptiveLimiter:
+    """
+    Batas request LLM bersamaan dengan AIMD: naik 1/limit untuk setiap request
+    sukses (kira-kira +1 per putaran penuh), turun setengah pada 429 atau
+    timeout. Request yang dimulai sebelum penurunan terakhir tidak menurunkan
+    batas lagi, jadi satu lonjakan error hanya memotong sekali. Hanya dipakai
+    dari event loop LLM.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[float] = None, adaptive: bool = True):
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.limit = float(initial if initial is not None else self.max_limit)
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self._generation = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.LLM_CONCURRENCY_LIMIT.set(int(self.limit))
+        metrics.LLM_IN_FLIGHT.set(self.in_flight)
+
+    def at_minimum(self) -> bool:
+        """True jika batas tidak bisa turun lagi (atau tidak adaptif)."""
+        return not self.adaptive or int(self.limit) <= self.min_limit
+
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _wake(self) -> None:
+        # Slot diserahkan langsung ke waiter berikutnya (FIFO).
+        while self._waiters and self._has_room():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._publish()
+
+    async def acquire(self) -> int:
+        """Menunggu slot; mengembalikan generasi batas saat request dimulai."""
+        if self._has_room() and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return self._generation
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(self._generation)  # slot sudah diberikan sebelum dibatalkan
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return self._generation
+
+    def release(self, generation: int, outcome: str = "other") -> None:
+        """Mengembalikan slot. `outcome`: "ok", "overload", atau lainnya (tidak mengubah batas)."""
+        self.in_flight -= 1
+        if self.adaptive:
+            if outcome == "ok":
+                self.limit = min(self.limit + 1 / max(self.limit, 1), self.max_limit)
+            elif outcome == "overload" and generation == self._generation:
+                self.limit = max(self.limit / 2, self.min_limit)
+                self._generation += 1
+                metrics.LLM_CONCURRENCY_DECREASES.inc()
+        self._wake()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "adaptive": self.adaptive,
+        }
+
+
+class CircuitBreaker:
+    """
+    closed -> open setelah `failure_threshold` kegagalan overload berturut-turut
+    yang tidak lagi bisa diredam limiter (batas concurrency sudah minimum).
+    Selama open, panggilan langsung gagal dengan ProviderUnavailable (job
+    dikembalikan ke antrian). Setelah `reset_timeout` detik menjadi half_open:
+    satu request percobaan dilepas; sukses -> closed, gagal -> open lagi.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        metrics.LLM_CIRCUIT_STATE.set(CIRCUIT_STATES["closed"])
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            print(f"LLM circuit breaker: {self.state} -> {state}")
+            self.state = state
+            metrics.LLM_CIRCUIT_STATE.set(CIRCUIT_STATES[state])
+            metrics.LLM_CIRCUIT_TRANSITIONS.labels(state).inc()
+
+    def retry_after(self) -> float:
+        """Detik sampai breaker boleh dicoba lagi (0 jika tidak open)."""
+        if self.state != "open" or self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def is_open(self) -> bool:
+        return self.state == "open" and self.retry_after() > 0
+
+    def check(self) -> None:
+        """Dipanggil sebelum setiap request; melempar ProviderUnavailable jika tidak boleh lewat."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == "open":
+                remaining = self.retry_after()
+                if remaining > 0:
+                    raise ProviderUnavailable(remaining)
+                self._transition("half_open")
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    raise ProviderUnavailable(min(self.reset_timeout, 1.0))
+                self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition("open")
+
+    def release_probe(self) -> None:
+        """Request percobaan dibatalkan tanpa hasil; percobaan berikutnya boleh lewat."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after_seconds": round(self.retry_after(), 1),
+        }
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimiter:
+    # Hanya dipanggil dari dalam event loop LLM.
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter(
+            settings.LLM_MAX_CONCURRENCY, settings.LLM_MIN_CONCURRENCY, adaptive=settings.LLM_ADAPTIVE_CONCURRENCY
+        )
+    return _limiter
+
+
+def get_breaker() -> CircuitBreaker:
+    """Circuit breaker provider LLM, satu per proses (dibaca juga oleh executor dan /readyz)."""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS)
+    return _breaker
+
+
+@asynccontextmanager
+async def provider_slot():
+    """
+    Satu request ke provider: menunggu slot limiter, mengecek circuit breaker,
+    lalu mencatat hasilnya (sukses, overload, atau error lain) ke keduanya.
+    """
+    limiter = get_limiter()
+    breaker = get_breaker()
+    generation = await limiter.acquire()
+    try:
+        breaker.check()
+    except ProviderUnavailable:
+        limiter.release(generation)
+        raise
+    try:
+        yield
+    except asyncio.CancelledError:
+        limiter.release(generation)
+        breaker.release_probe()
+        raise
+    except Exception as e:
+        if is_overload(e):
+            metrics.LLM_OVERLOADS_TOTAL.labels(type(e).__name__).inc()
+            limiter.release(generation, "overload")
+            # Kewalahan sesaat ditangani limiter; breaker baru menghitung jika
+            # batasnya sudah minimum dan provider tetap menolak.
+            if breaker.state == "half_open" or limiter.at_minimum():
+                breaker.record_failure()
+        elif is_client_error(e):
+            # Provider tetap menjawab (mis. request tidak valid): bukan tanda kewalahan.
+            limiter.release(generation)
+            breaker.record_success()
+        else:
+            # Tidak ada jawaban dari provider (koneksi putus, error 5xx, dsb.): concurrency
+            # tidak diturunkan, tetapi dihitung breaker supaya provider yang mati tanpa
+            # 429/503 tetap membuka circuit.
+            limiter.release(generation)
+            breaker.record_failure()
+        raise
+    else:
+        limiter.release(generation, "ok")
+        breaker.record_success()
+
+
+def snapshot() -> Dict[str, Any]:
+    """State limiter dan circuit breaker untuk monitoring (/readyz)."""
+    return {
+        "concurrency": _limiter.snapshot() if _limiter is not None else None,
+        "circuit": get_breaker().snapshot(),
+    }
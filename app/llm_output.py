@@ -0,0 +1,215 @@
+# /app/llm_output.py
+
+import json
+import math
+from typing import Any, Dict, Optional, Set, Tuple, Type
+
+from annotated_types import Ge, Le
+from pydantic import BaseModel, ValidationError
+
+# Perbaikan lokal atas output LLM, supaya cacat kecil tidak memicu retry penuh
+# (backoff + generasi ulang). Setiap perbaikan dicatat dengan salah satu jenis ini:
+#   trailing_text       teks di luar objek JSON (penjelasan, salam, code fence yang tidak lengkap)
+#   single_quotes       string/key memakai kutip tunggal
+#   trailing_comma      koma sebelum } atau ]
+#   python_literal      True/False/None gaya Python
+#   stringified_number  angka dikirim sebagai string ("0.8", "80%")
+#   rescaled            skor 0-1 dijawab dalam skala 0-100
+#   clamped             skor di luar rentang dipotong ke batasnya
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+# Panjang maksimum respons sebelumnya yang disertakan di prompt koreksi.
+CORRECTION_MAX_CHARS = 4000
+
+CORRECTION_PROMPT = """
+    Your previous answer could not be parsed as the requested JSON object.
+
+    Problems: {errors}
+
+    Previous answer:
+    {previous}
+
+    Return only the corrected JSON object with these fields: {fields}.
+    Keep the original wording and scores; fix only the format.
+    """
+
+
+class LLMOutputError(ValueError):
+    """Output model tidak bisa diperbaiki secara lokal."""
+
+
+def _strip_fence(text: str) -> str:
+    return text.strip().replace("```json", "").replace("```", "")
+
+
+def _normalize_object(text: str, repairs: Set[str]) -> str:
+    """
+    Menulis ulang satu objek (mulai dari '{') menjadi JSON standar: kutip
+    tunggal, koma berlebih, dan literal Python diperbaiki. Berhenti di kurung
+    penutup objek, jadi teks sesudahnya tidak ikut dibaca.
+    """
+    out = []
+    depth = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            j = i + 1
+            parts = []
+            while j < n and text[j] != ch:
+                if text[j] == "\\" and j + 1 < n:
+                    parts.append(text[j:j + 2])
+                    j += 2
+                    continue
+                parts.append(text[j])
+                j += 1
+            body = "".join(parts)
+            if ch == "'":
+                repairs.add("single_quotes")
+                body = body.replace("\\'", "'").replace('"', '\\"')
+            out.append(f'"{body}"')
+            i = j + 1
+            continue
+        if ch == ",":
+            k = i + 1
+            while k < n and text[k].isspace():
+                k += 1
+            if k < n and text[k] in "}]":
+                repairs.add("trailing_comma")
+                i += 1
+                continue
+        elif ch.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if word in _PYTHON_LITERALS:
+                repairs.add("python_literal")
+                word = _PYTHON_LITERALS[word]
+            out.append(word)
+            i = j
+            continue
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                out.append(ch)
+                if text[i + 1:].strip():
+                    repairs.add("trailing_text")
+                return "".join(out)
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def repair_json(text: str, repairs: Set[str]) -> Dict[str, Any]:
+    """Mem-parsing objek JSON dari respons model, memperbaiki cacat umum (lihat atas)."""
+    cleaned = _strip_fence(text)
+    start = cleaned.find("{")
+    if start < 0:
+        raise LLMOutputError("response does not contain a JSON object")
+    if cleaned[:start].strip():
+        repairs.add("trailing_text")
+    try:
+        data, end = json.JSONDecoder().raw_decode(cleaned, start)
+        if cleaned[end:].strip():
+            repairs.add("trailing_text")
+    except ValueError:
+        try:
+            data = json.loads(_normalize_object(cleaned[start:], repairs))
+        except ValueError as e:
+            raise LLMOutputError(f"invalid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise LLMOutputError("response is not a JSON object")
+    return data
+
+
+def _bounds(field) -> Tuple[Optional[float], Optional[float]]:
+    lower = upper = None
+    for constraint in field.metadata:
+        if isinstance(constraint, Ge):
+            lower = constraint.ge
+        elif isinstance(constraint, Le):
+            upper = constraint.le
+    return lower, upper
+
+
+def coerce_field(
+    output_model: Optional[Type[BaseModel]], key: str, value: Any, repairs: Set[str]
+) -> Tuple[Any, bool]:
+    """
+    Menormalkan satu field sesuai model stage. Mengembalikan (nilai, valid);
+    valid=False jika field tidak dikenal model atau nilainya tidak bisa dipakai.
+    """
+    if output_model is None:
+        return value, True
+    field = output_model.model_fields.get(key)
+    if field is None:
+        return value, False
+    if field.annotation is str:
+        return value, isinstance(value, str)
+    if field.annotation not in (float, int):
+        return value, True
+
+    if isinstance(value, str):
+        raw = value.strip()
+        percent = raw.endswith("%")
+        try:
+            number = float(raw.rstrip("%").strip())
+        except ValueError:
+            return value, False
+        repairs.add("stringified_number")
+        value = number / 100 if percent else number
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return value, False
+
+    lower, upper = _bounds(field)
+    if upper is not None and value > upper:
+        if upper == 1 and 10 <= value <= 100:
+            # Skor 0-1 yang dijawab sebagai persen (mis. 80 untuk 0.8); nilai
+            # sedikit di atas 1 (mis. 1.2) dianggap kelebihan dan dipotong.
+            repairs.add("rescaled")
+            value = value / 100
+        else:
+            repairs.add("clamped")
+            value = upper
+    if lower is not None and value < lower:
+        repairs.add("clamped")
+        value = lower
+    return value, True
+
+
+def validate_output(data: Dict[str, Any], output_model: Type[BaseModel], repairs: Set[str]) -> Dict[str, Any]:
+    """Normalisasi per field lalu validasi dengan model pydantic stage-nya."""
+    data = {key: coerce_field(output_model, key, value, repairs)[0] for key, value in data.items()}
+    try:
+        return output_model.model_validate(data).model_dump()
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'response'}: {error['msg']}" for error in e.errors()
+        )
+        raise LLMOutputError(problems) from None
+
+
+def parse_output(text: str, output_model: Optional[Type[BaseModel]], repairs: Set[str]) -> Dict[str, Any]:
+    """Repair + (jika ada model) validasi. Melempar LLMOutputError jika tidak bisa diperbaiki."""
+    data = repair_json(text, repairs)
+    if output_model is None:
+        return data
+    return validate_output(data, output_model, repairs)
+
+
+def correction_prompt(previous: str, error: Exception, output_model: Optional[Type[BaseModel]]) -> str:
+    """Prompt pendek (tanpa dokumen kandidat) untuk meminta model memperbaiki formatnya sendiri."""
+    if output_model is not None:
+        described = []
+        for name, field in output_model.model_fields.items():
+            lower, upper = _bounds(field)
+            bounds = f", {lower}-{upper}" if lower is not None and upper is not None else ""
+            described.append(f'"{name}" ({field.annotation.__name__}{bounds})')
+        fields = ", ".join(described)
+    else:
+        fields = "the same fields as before"
+    return CORRECTION_PROMPT.format(errors=error, previous=previous[:CORRECTION_MAX_CHARS], fields=fields)
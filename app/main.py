@@ -1,21 +1,39 @@
-import os
-import app.install_extra
 import uuid
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
-from typing import List
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Request
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from . import schemas, tasks
-from .job_store import create_job, get_job_status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from . import document_store, job_events, llm_limiter, metrics, schemas, warmup
+from .admission import admit_request, get_admission, queue_full_error
+from .config import settings
+from .executor import PRIORITIES, QueueFullError, get_executor
+from .job_store import FINISHED_STATUSES, count_jobs, create_job, get_job_status, get_document_path
+from .uploads import UploadSizeLimit, save_upload
 
-# Buat folder uploads jika belum ada
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Batas waktu long-poll untuk GET /result/{job_id}?wait=...
+MAX_LONG_POLL_SECONDS = 60
 
-# Simpan path file yang diunggah berdasarkan ID-nya
-# Dalam aplikasi nyata, ini akan ada di database.
-document_paths: dict[str, str] = {}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Menjalankan executor job bersama server dan men-drain-nya saat shutdown."""
+    executor = get_executor()
+    if settings.EXECUTOR_MODE != "external":
+        await executor.start()
+        recovered = await executor.recover()
+        if recovered:
+            print(f"Recovered {recovered} queued jobs from the job store")
+    # Referensi task disimpan: event loop hanya memegang weak reference ke task.
+    app.state.warmup_task = warmup.start_background_warmup() if settings.WARMUP_ON_STARTUP else None
+    gc_task = document_store.start_document_gc()
+    yield
+    if gc_task is not None:
+        gc_task.cancel()
+    if settings.EXECUTOR_MODE != "external":
+        await executor.drain(settings.EXECUTOR_DRAIN_TIMEOUT)
 
-app = FastAPI(title="AI CV Evaluator API")
+app = FastAPI(title="AI CV Evaluator API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +42,32 @@ app.add_middleware(
     allow_methods=["*"], # Izinkan semua metode (GET, POST, dll)
     allow_headers=["*"], # Izinkan semua header
 )
+app.add_middleware(UploadSizeLimit)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: proses hidup dan event loop merespons (tidak memuat resource apa pun)."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 jika server siap menerima job, 503 selama warmup masih berjalan.
+    Body berisi status setiap resource lazy, waktu import-to-ready, serta batas
+    concurrency dan circuit breaker LLM (job tetap diterima saat breaker terbuka).
+    """
+    serving = settings.EXECUTOR_MODE == "external" or get_executor().stats()["accepting"]
+    status = warmup.readiness(serving)
+    status["llm"] = llm_limiter.snapshot()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Metrik Prometheus: durasi per stage, panggilan LLM, waktu antri, ukuran job store."""
+    store_size = await run_in_threadpool(count_jobs)
+    executor_stats = None if settings.EXECUTOR_MODE == "external" else get_executor().stats()
+    body, content_type = metrics.render(store_size, executor_stats)
+    return Response(body, media_type=content_type)
 
 @app.post("/upload", response_model=schemas.UploadResponse)
 async def upload_files(
@@ -41,13 +85,7 @@ async def upload_files(
     }
 
     for doc_type, file in files_to_process.items():
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
-
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
-
-        document_paths[file_id] = file_path
+        file_id = await save_upload(file)
         uploaded_files.append(schemas.UploadResponseItem(
             file_name=file.filename,
             document_id=file_id,
@@ -57,50 +95,192 @@ async def upload_files(
     return schemas.UploadResponse(message="Files uploaded successfully", files=uploaded_files)
 
 @app.post("/evaluate", response_model=schemas.EvaluateResponse, status_code=202)
-def evaluate_candidate(
-    request: schemas.EvaluateRequest,
-    background_tasks: BackgroundTasks
-    ):
+async def evaluate_candidate(request: schemas.EvaluateRequest, http_request: Request):
     """
-    Memicu pipeline evaluasi AI secara asinkron.
+    Memicu pipeline evaluasi AI secara asinkron. Mengembalikan 429 (dengan
+    Retry-After) jika antrian penuh, estimasi waktu tunggu terlalu lama, atau
+    klien sudah mencapai batas job yang berjalan bersamaan.
     """
-    cv_path = document_paths.get(request.cv_document_id)
-    report_path = document_paths.get(request.project_report_id)
+    cv_path = await run_in_threadpool(get_document_path, request.cv_document_id)
+    report_path = await run_in_threadpool(get_document_path, request.project_report_id)
 
     if not cv_path or not report_path:
         raise HTTPException(status_code=404, detail="One or both document IDs not found.")
 
     job_id = str(uuid.uuid4())
-    create_job(job_id)
-
-    # Kirim tugas ke Celery untuk diproses di background
-    background_tasks.add_task(
-        tasks.process_evaluation_sync,
-        job_id=job_id,
-        cv_path=cv_path,
-        report_path=report_path,
-        job_title=request.job_title
-    )
+    await admit_request(job_id, http_request)
+    # Job memegang referensi ke dokumennya sampai selesai, supaya tidak dihapus GC.
+    if not await run_in_threadpool(document_store.acquire, job_id, cv_path, report_path):
+        get_admission().release(job_id)
+        raise HTTPException(status_code=404, detail="One or both documents have expired; please upload them again.")
+    task = {
+        "type": "evaluation",
+        "args": {
+            "cv_path": cv_path,
+            "report_path": report_path,
+            "job_title": request.job_title,
+            "use_cache": request.use_cache,
+        },
+    }
+
+    documents = [document_store.hash_from_path(cv_path), document_store.hash_from_path(report_path)]
+
+    # Masukkan ke antrian executor (dibatasi); tolak jika penuh
+    try:
+        await get_executor().enqueue(job_id, task, priority=PRIORITIES[request.priority], documents=documents)
+    except QueueFullError as e:
+        get_admission().release(job_id)
+        await run_in_threadpool(document_store.release, job_id, cv_path, report_path)
+        raise queue_full_error(e)
 
     return schemas.EvaluateResponse(id=job_id, status="queued")
 
-@app.get("/result/{job_id}", response_model=schemas.GetResultResponse)
-def get_evaluation_result(job_id: str):
+@app.post("/evaluate/batch", response_model=schemas.BatchEvaluateResponse, status_code=202)
+async def evaluate_batch(request: schemas.BatchEvaluateRequest, http_request: Request):
     """
-    Mengambil status dan hasil dari sebuah job evaluasi.
+    Memicu evaluasi banyak kandidat untuk satu job_title. Setiap kandidat tetap
+    mendapat job_id sendiri (bisa dicek lewat /result/{job_id}). Batch memakai
+    satu slot antrian; di kuota klien batch dihitung sebanyak kandidat yang
+    dijalankan bersamaan.
     """
-    job = get_job_status(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job ID not found.")
+    batch_id = str(uuid.uuid4())
+    max_parallel = get_admission().batch_weight(len(request.candidates), settings.BATCH_MAX_PARALLEL_CANDIDATES)
+    await admit_request(batch_id, http_request, cost=max_parallel)
+    candidates = []
+    missing = []
+    for candidate in request.candidates:
+        cv_path = await run_in_threadpool(get_document_path, candidate.cv_document_id)
+        report_path = await run_in_threadpool(get_document_path, candidate.project_report_id)
+        job_id = str(uuid.uuid4())
+        if (
+            not cv_path or not report_path
+            or not await run_in_threadpool(document_store.acquire, job_id, cv_path, report_path)
+        ):
+            missing.append(candidate.model_dump())
+            continue
+        candidates.append((job_id, cv_path, report_path))
+
+    async def release_all():
+        get_admission().release(batch_id)
+        for job_id, cv_path, report_path in candidates:
+            await run_in_threadpool(document_store.release, job_id, cv_path, report_path)
+
+    if missing:
+        await release_all()
+        raise HTTPException(status_code=404, detail={"message": "Document IDs not found.", "candidates": missing})
+
+    executor = get_executor()
+    job_ids = [job_id for job_id, _, _ in candidates]
+    for job_id, cv_path, report_path in candidates:
+        documents = [document_store.hash_from_path(cv_path), document_store.hash_from_path(report_path)]
+        await run_in_threadpool(create_job, job_id, batch_id=batch_id, documents=documents)
+
+    task = {
+        "type": "batch",
+        "args": {
+            "job_title": request.job_title,
+            "candidates": candidates,
+            "use_cache": request.use_cache,
+            "max_parallel": max_parallel,
+        },
+    }
+    try:
+        await executor.enqueue(
+            batch_id, task, priority=PRIORITIES[request.priority],
+            kind="batch", job_title=request.job_title, job_ids=job_ids,
+        )
+    except QueueFullError as e:
+        await release_all()
+        raise queue_full_error(e)
+
+    return schemas.BatchEvaluateResponse(id=batch_id, status="queued", job_ids=job_ids)
+
+@app.get("/batch/{batch_id}", response_model=schemas.GetBatchResponse)
+async def get_batch_status(
+    batch_id: str,
+    wait: float = Query(0, ge=0, le=MAX_LONG_POLL_SECONDS, description="Long-poll: detik maksimum untuk menunggu"),
+):
+    """
+    Mengambil progres agregat sebuah batch (jumlah queued/processing/completed/failed).
+    """
+    if wait > 0:
+        batch = await job_events.wait_for_job(
+            batch_id, lambda job: job["status"] in FINISHED_STATUSES, timeout=wait
+        )
+    else:
+        batch = await run_in_threadpool(get_job_status, batch_id)
+    if not batch or batch.get("kind") != "batch":
+        raise HTTPException(status_code=404, detail="Batch ID not found.")
+
+    return {
+        "id": batch_id,
+        "status": batch["status"],
+        "job_title": batch["job_title"],
+        "job_ids": batch["job_ids"],
+        "progress": batch.get("progress"),
+    }
+
+def _build_result_response(job_id: str, job: dict) -> dict:
+    response_data = {
+        "id": job_id,
+        "status": job["status"],
+        "progress": job.get("progress"),
+        "version": job.get("version"),
+        "timings": job.get("timings"),
+    }
 
-    response_data = {"id": job_id, "status": job["status"]}
-    
     if job["status"] == "completed":
         response_data["result"] = job.get("result")
     elif job["status"] == "failed":
         # Ambil detail error dari hasil jika ada
-        error_detail = job.get("result", {}).get("error", "An unknown error occurred.")
+        error_detail = (job.get("result") or {}).get("error", "An unknown error occurred.")
         response_data["error"] = error_detail
 
-
     return response_data
+
+@app.get("/result/{job_id}", response_model=schemas.GetResultResponse)
+async def get_evaluation_result(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=MAX_LONG_POLL_SECONDS, description="Long-poll: detik maksimum untuk menunggu"),
+    since: Optional[int] = Query(None, description="Kembalikan segera setelah version job melewati nilai ini"),
+):
+    """
+    Mengambil status dan hasil dari sebuah job evaluasi.
+    Dengan `wait`, request ditahan sampai job selesai (atau, jika `since` diisi,
+    sampai ada perubahan setelah version tersebut) atau waktu habis.
+    """
+    if wait > 0:
+        if since is not None:
+            predicate = lambda job: job.get("version", 0) > since
+        else:
+            predicate = lambda job: job["status"] in FINISHED_STATUSES
+        job = await job_events.wait_for_job(job_id, predicate, timeout=wait)
+    else:
+        job = await run_in_threadpool(get_job_status, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job ID not found.")
+
+    return _build_result_response(job_id, job)
+
+@app.get("/result/{job_id}/stream")
+async def stream_evaluation_result(job_id: str):
+    """
+    Server-Sent Events: mengirim state job saat ini lalu setiap transisi
+    (queued -> processing -> progress per stage -> completed/failed).
+    """
+    if not await run_in_threadpool(get_job_status, job_id):
+        raise HTTPException(status_code=404, detail="Job ID not found.")
+
+    async def event_source():
+        async for job in job_events.stream_job(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            payload = schemas.GetResultResponse(**_build_result_response(job_id, job))
+            yield f"id: {job.get('version', 0)}\nevent: {job['status']}\ndata: {payload.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,210 @@
+# /app/metrics.py
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Metrik Prometheus (registry default, per proses). Ukuran prompt/respons dalam
+# karakter, karena token baru diketahui setelah dihitung oleh model.
+_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_SIZE_BUCKETS = (256, 1024, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+
+STAGE_SECONDS = Histogram(
+    "cv_eval_stage_seconds", "Durasi setiap stage pipeline evaluasi.", ["stage"], buckets=_LATENCY_BUCKETS
+)
+JOB_SECONDS = Histogram(
+    "cv_eval_job_seconds", "Durasi total job evaluasi (tanpa waktu antri).", ["status"], buckets=_LATENCY_BUCKETS
+)
+JOBS_TOTAL = Counter("cv_eval_jobs_total", "Job evaluasi yang selesai, per status.", ["status"])
+QUEUE_WAIT_SECONDS = Histogram(
+    "cv_eval_queue_wait_seconds", "Waktu job menunggu di antrian sampai diambil worker.", ["task"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "cv_eval_llm_call_seconds", "Durasi panggilan LLM termasuk retry dan backoff.", ["stage", "model"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_CALLS_TOTAL = Counter(
+    "cv_eval_llm_calls_total", "Panggilan LLM, per hasil (ok, error, cached).", ["model", "outcome"]
+)
+LLM_FIRST_FIELD_SECONDS = Histogram(
+    "cv_eval_llm_first_field_seconds", "Waktu sampai field JSON pertama lengkap (mode stream).", ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_RETRIES_TOTAL = Counter("cv_eval_llm_retries_total", "Percobaan ulang panggilan LLM.", ["model"])
+LLM_CONCURRENCY_LIMIT = Gauge("cv_eval_llm_concurrency_limit", "Batas request LLM bersamaan saat ini (AIMD).")
+LLM_IN_FLIGHT = Gauge("cv_eval_llm_in_flight", "Request LLM yang sedang berjalan.")
+LLM_CONCURRENCY_DECREASES = Counter(
+    "cv_eval_llm_concurrency_decreases_total", "Penurunan batas concurrency LLM karena 429/timeout."
+)
+LLM_OVERLOADS_TOTAL = Counter(
+    "cv_eval_llm_overloads_total", "Request LLM yang gagal karena 429, 503 atau timeout, per jenis error.", ["error"]
+)
+LLM_CIRCUIT_STATE = Gauge("cv_eval_llm_circuit_state", "State circuit breaker LLM (0 closed, 1 half_open, 2 open).")
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "cv_eval_llm_circuit_transitions_total", "Perpindahan state circuit breaker LLM, per state tujuan.", ["state"]
+)
+JOBS_DEFERRED = Counter(
+    "cv_eval_jobs_deferred_total", "Job yang dikembalikan ke antrian karena provider LLM tidak sehat."
+)
+LLM_HEDGES_TOTAL = Counter(
+    "cv_eval_llm_hedges_total", "Request hedging, per hasil (won, lost, skipped = budget habis).", ["model", "result"]
+)
+LLM_OUTPUTS_TOTAL = Counter(
+    "cv_eval_llm_outputs_total",
+    "Validasi output LLM, per hasil (valid, repaired, corrected, invalid = retry penuh, "
+    "merged = retry berbeda dari field yang sudah diterbitkan).", ["stage", "outcome"],
+)
+LLM_OUTPUT_REPAIRS = Counter(
+    "cv_eval_llm_output_repairs_total", "Perbaikan lokal output LLM, per jenis.", ["stage", "kind"]
+)
+LLM_PROMPT_CHARS = Histogram(
+    "cv_eval_llm_prompt_chars", "Ukuran prompt (karakter).", ["stage"], buckets=_SIZE_BUCKETS
+)
+LLM_RESPONSE_CHARS = Histogram(
+    "cv_eval_llm_response_chars", "Ukuran respons LLM (karakter).", ["stage"], buckets=_SIZE_BUCKETS
+)
+PROMPT_TOKENS = Histogram(
+    "cv_eval_prompt_tokens", "Estimasi token prompt setelah budget diterapkan.", ["stage"],
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+PROMPT_TOKENS_DROPPED = Counter(
+    "cv_eval_prompt_tokens_dropped_total", "Token yang dibuang oleh prompt budget.", ["stage"]
+)
+RETRIEVAL_CACHE_LOOKUPS = Counter(
+    "cv_eval_retrieval_cache_lookups_total", "Lookup cache retrieval Chroma, per hasil (hit, miss).", ["result"]
+)
+DOCUMENTS_COLLECTED = Counter(
+    "cv_eval_documents_collected_total", "Dokumen yang dihapus GC document store, per alasan.", ["reason"]
+)
+DOCUMENT_STORE_BYTES = Gauge("cv_eval_document_store_bytes", "Total ukuran document store (putaran GC terakhir).")
+ADMISSION_DECISIONS = Counter(
+    "cv_eval_admission_total", "Keputusan admission control /evaluate, per hasil dan alasan.", ["decision", "reason"]
+)
+ADMISSION_ESTIMATED_WAIT = Gauge(
+    "cv_eval_admission_estimated_wait_seconds", "Estimasi waktu tunggu antrian pada keputusan admission terakhir."
+)
+JOB_STORE_JOBS = Gauge("cv_eval_job_store_jobs", "Jumlah record job di job store.")
+EXECUTOR_QUEUED = Gauge("cv_eval_executor_queued", "Job di antrian executor proses ini.")
+EXECUTOR_RUNNING = Gauge("cv_eval_executor_running", "Job yang sedang berjalan di proses ini.")
+
+
+# Rincian waktu per job. process_evaluation membuat dict-nya, stage dan
+# panggilan LLM di dalam job mengisinya lewat ContextVar (ikut tersalin ke
+# task dan asyncio.to_thread).
+_job_timings: ContextVar[Optional[Dict[str, Any]]] = ContextVar("job_timings", default=None)
+_current_stage: ContextVar[str] = ContextVar("current_stage", default="none")
+_queue_wait: ContextVar[Optional[float]] = ContextVar("queue_wait", default=None)
+
+
+def set_queue_wait(task_type: str, seconds: float) -> None:
+    """Dipanggil executor saat job diambil dari antrian."""
+    QUEUE_WAIT_SECONDS.labels(task_type).observe(seconds)
+    _queue_wait.set(round(seconds, 4))
+
+
+def begin_job_timings() -> Dict[str, Any]:
+    """Memulai rincian waktu untuk job di context saat ini dan mengembalikannya."""
+    timings = {"queue_wait": _queue_wait.get(), "stages": {}, "llm_calls": [], "total": None}
+    timings["_started"] = time.perf_counter()
+    _job_timings.set(timings)
+    return timings
+
+
+def finish_job_timings(timings: Dict[str, Any], status: str) -> Dict[str, Any]:
+    """Menutup rincian waktu job; hasilnya siap disimpan di record job."""
+    total = time.perf_counter() - timings.pop("_started")
+    timings["total"] = round(total, 4)
+    JOB_SECONDS.labels(status).observe(total)
+    JOBS_TOTAL.labels(status).inc()
+    return timings
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Mengukur satu stage (histogram + rincian job jika ada) dan menandai stage aktif."""
+    token = _current_stage.set(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_stage.reset(token)
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _job_timings.get()
+        if timings is not None:
+            timings["stages"][stage] = round(elapsed, 4)
+
+
+def observe_llm_call(model: str, seconds: float, stats: Dict[str, Any], ok: bool) -> None:
+    """Mencatat satu panggilan LLM; `stats` diisi llm_client (attempts, cached, ukuran)."""
+    stage = _current_stage.get()
+    attempts = stats.get("attempts", 0)
+    outcome = "cached" if stats.get("cached") else ("ok" if ok else "error")
+    LLM_CALL_SECONDS.labels(stage, model).observe(seconds)
+    LLM_CALLS_TOTAL.labels(model, outcome).inc()
+    if attempts > 1:
+        LLM_RETRIES_TOTAL.labels(model).inc(attempts - 1)
+    LLM_PROMPT_CHARS.labels(stage).observe(stats.get("prompt_chars", 0))
+    if "response_chars" in stats:
+        LLM_RESPONSE_CHARS.labels(stage).observe(stats["response_chars"])
+    if "first_field_seconds" in stats:
+        LLM_FIRST_FIELD_SECONDS.labels(stage).observe(stats["first_field_seconds"])
+    hedges, hedge_wins = stats.get("hedges", 0), stats.get("hedge_wins", 0)
+    if hedges:
+        LLM_HEDGES_TOTAL.labels(model, "won").inc(hedge_wins)
+        LLM_HEDGES_TOTAL.labels(model, "lost").inc(hedges - hedge_wins)
+    if stats.get("hedges_skipped"):
+        LLM_HEDGES_TOTAL.labels(model, "skipped").inc(stats["hedges_skipped"])
+    if "output" in stats:
+        LLM_OUTPUTS_TOTAL.labels(stage, stats["output"]).inc()
+    if stats.get("invalid_outputs"):
+        LLM_OUTPUTS_TOTAL.labels(stage, "invalid").inc(stats["invalid_outputs"])
+    if stats.get("merged_fields"):
+        LLM_OUTPUTS_TOTAL.labels(stage, "merged").inc()
+    for kind in stats.get("repairs", ()):
+        LLM_OUTPUT_REPAIRS.labels(stage, kind).inc()
+
+    timings = _job_timings.get()
+    if timings is not None:
+        timings["llm_calls"].append({
+            "stage": stage,
+            "model": model,
+            "seconds": round(seconds, 4),
+            "attempts": attempts,
+            "retries": max(attempts - 1, 0),
+            "cached": bool(stats.get("cached")),
+            "prompt_chars": stats.get("prompt_chars", 0),
+            "response_chars": stats.get("response_chars"),
+            "first_field_seconds": stats.get("first_field_seconds"),
+            "output": stats.get("output"),
+            "repairs": stats.get("repairs") or [],
+            "corrections": stats.get("corrections", 0),
+            "merged_fields": stats.get("merged_fields") or [],
+            "hedges": hedges,
+            "hedge_wins": hedge_wins,
+            "outcome": outcome,
+        })
+
+
+def observe_prompt_budget(report: Dict[str, Any], part: Optional[str] = None) -> None:
+    """Mencatat hasil prompt budget (BudgetReport.as_dict()) untuk stage aktif."""
+    stage = _current_stage.get()
+    PROMPT_TOKENS.labels(stage).observe(report["tokens_after"])
+    PROMPT_TOKENS_DROPPED.labels(stage).inc(report["tokens_dropped"])
+    timings = _job_timings.get()
+    if timings is not None:
+        timings.setdefault("prompt_budget", {})[f"{stage}:{part}" if part else stage] = report
+
+
+def render(job_store_size: Optional[int] = None, executor_stats: Optional[Dict[str, Any]] = None) -> tuple[bytes, str]:
+    """Output /metrics dalam format teks Prometheus (gauge diperbarui saat scrape)."""
+    if job_store_size is not None:
+        JOB_STORE_JOBS.set(job_store_size)
+    if executor_stats:
+        EXECUTOR_QUEUED.set(executor_stats.get("queued", 0))
+        EXECUTOR_RUNNING.set(executor_stats.get("running", 0))
+    return generate_latest(), CONTENT_TYPE_LATEST
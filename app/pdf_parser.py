@@ -0,0 +1,191 @@
+# /app/pdf_parser.py
+
+import asyncio
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Tuple
+
+from pypdf import PdfReader
+
+from .config import settings
+from .document_store import hash_from_path, read_text, write_text
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_page_texts(source, max_pages: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Stream teks per halaman sebagai (nomor halaman mulai 1, teks)."""
+    reader = PdfReader(source)
+    for page_num, page in enumerate(reader.pages, start=1):
+        if max_pages and page_num > max_pages:
+            break
+        yield page_num, page.extract_text() or ""
+
+
+def extract_text(source, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Mengekstrak teks halaman demi halaman dan menggabungkannya sekali di akhir.
+    Berhenti setelah `max_pages` halaman atau `max_chars` karakter (jika diset).
+    """
+    parts = []
+    total = 0
+    for _, text in iter_page_texts(source, max_pages=max_pages):
+        if max_chars and total + len(text) >= max_chars:
+            parts.append(text[: max_chars - total])
+            break
+        parts.append(text)
+        total += len(text)
+    return "\n".join(parts).strip()
+
+
+def sha256_file(path: str) -> Tuple[str, bytes]:
+    """Membaca file sekali dan mengembalikan (hex SHA-256, isi file)."""
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            buffer.write(chunk)
+    return digest.hexdigest(), buffer.getvalue()
+
+
+class TextCache:
+    """LRU untuk teks hasil ekstraksi, dibatasi total jumlah karakter."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._data: "OrderedDict[tuple, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            text = self._data.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: tuple, text: str) -> None:
+        if len(text) > self.max_chars:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._data[key] = text
+            self._size += len(text)
+            while self._size > self.max_chars:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+
+text_cache = TextCache(settings.PDF_TEXT_CACHE_MAX_CHARS)
+
+
+def _stored_text(path: str, budget: Tuple[int, int]) -> Optional[str]:
+    """
+    Untuk file di document store, hash-nya sudah diketahui dari path: teks
+    diambil dari cache memori atau dari file teks di samping PDF, tanpa
+    membaca PDF-nya sama sekali.
+    """
+    content_hash = hash_from_path(path)
+    if content_hash is None:
+        return None
+    key = (content_hash,) + budget
+    text = text_cache.get(key)
+    if text is None:
+        text = read_text(path, budget)
+        if text is not None:
+            text_cache.put(key, text)
+    return text
+
+
+def _store_text(path: str, key: tuple, text: str) -> None:
+    text_cache.put(key, text)
+    if hash_from_path(path) is not None:
+        write_text(path, key[1:], text)
+
+
+def extract_text_cached(path: str, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """extract_text dengan cache berbasis SHA-256 isi file (file identik tidak di-parse ulang)."""
+    budget = _budget(max_pages, max_chars)
+    text = _stored_text(path, budget)
+    if text is not None:
+        return text
+    file_hash, data = sha256_file(path)
+    key = (file_hash,) + budget
+
+    text = text_cache.get(key)
+    if text is None:
+        text = extract_text_from_bytes(data, *budget)
+        _store_text(path, key, text)
+    return text
+
+
+def _budget(max_pages: Optional[int], max_chars: Optional[int]) -> Tuple[int, int]:
+    max_pages = max_pages if max_pages is not None else settings.PDF_MAX_PAGES
+    max_chars = max_chars if max_chars is not None else settings.PDF_MAX_CHARS
+    return max_pages or 0, max_chars or 0
+
+
+def extract_text_from_bytes(data: bytes, max_pages: int = 0, max_chars: int = 0) -> str:
+    """Versi top-level (bisa di-pickle) untuk dijalankan di process pool."""
+    return extract_text(io.BytesIO(data), max_pages=max_pages or None, max_chars=max_chars or None)
+
+
+# Parsing PDF adalah kerja CPU; jalankan di process pool agar tidak berebut GIL
+# dengan event loop dan thread I/O. PDF_PARSE_PROCESSES=0 -> pakai thread saja.
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    global _parse_pool
+    if settings.PDF_PARSE_PROCESSES <= 0:
+        return None
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ProcessPoolExecutor(max_workers=settings.PDF_PARSE_PROCESSES)
+    return _parse_pool
+
+
+def shutdown_parse_pool(wait: bool = True) -> None:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=wait, cancel_futures=not wait)
+            _parse_pool = None
+
+
+async def extract_text_cached_async(
+    path: str, max_pages: Optional[int] = None, max_chars: Optional[int] = None
+) -> str:
+    """
+    extract_text_cached untuk event loop: hashing dan cache di proses ini,
+    parsing (jika cache miss) di process pool.
+    """
+    budget = _budget(max_pages, max_chars)
+    text = await asyncio.to_thread(_stored_text, path, budget)
+    if text is not None:
+        return text
+    file_hash, data = await asyncio.to_thread(sha256_file, path)
+    key = (file_hash,) + budget
+
+    text = text_cache.get(key)
+    if text is None:
+        pool = _get_parse_pool()
+        if pool is None:
+            text = await asyncio.to_thread(extract_text_from_bytes, data, *budget)
+        else:
+            text = await asyncio.get_running_loop().run_in_executor(pool, extract_text_from_bytes, data, *budget)
+        await asyncio.to_thread(_store_text, path, key, text)
+    return text
@@ -0,0 +1,131 @@
+# /app/pipeline.py
+
+import asyncio
+import functools
+import inspect
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import stage_timer
+
+
+@dataclass
+class Stage:
+    """
+    Satu langkah pipeline. `fn` dipanggil dengan hasil dari `deps` (urut sesuai deps).
+    Dependensi "stage.field" hanya menunggu satu field dari hasil (dict) stage
+    tersebut. Stage dengan `streams=True` menerima `on_field(key, value)` untuk
+    menerbitkan field yang sudah final sebelum stage-nya selesai.
+    """
+    name: str
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+    streams: bool = False
+
+
+def _dep_stage(dep: str) -> str:
+    return dep.split(".", 1)[0]
+
+
+def _topological_order(stages: List[Stage]) -> List[Stage]:
+    by_name = {s.name: s for s in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("Stage names must be unique.")
+    for s in stages:
+        for dep in s.deps:
+            if _dep_stage(dep) not in by_name:
+                raise ValueError(f"Stage '{s.name}' depends on unknown stage '{dep}'.")
+
+    ordered: List[Stage] = []
+    state: Dict[str, int] = {}  # 1 = sedang dikunjungi, 2 = selesai
+
+    def visit(stage: Stage):
+        mark = state.get(stage.name)
+        if mark == 2:
+            return
+        if mark == 1:
+            raise ValueError(f"Cycle detected at stage '{stage.name}'.")
+        state[stage.name] = 1
+        for dep in stage.deps:
+            visit(by_name[_dep_stage(dep)])
+        state[stage.name] = 2
+        ordered.append(stage)
+
+    for s in stages:
+        visit(s)
+    return ordered
+
+
+async def run_graph(
+    stages: List[Stage],
+    on_stage_done: Optional[Callable[[str], None]] = None,
+    on_field: Optional[Callable[[str, str, Any], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Menjalankan stage-stage sebagai graf dependensi. Setiap stage mulai segera
+    setelah semua dependensinya selesai (atau, untuk dependensi "stage.field",
+    begitu field itu final); stage yang saling independen berjalan bersamaan.
+    Fungsi sinkron dijalankan di thread terpisah.
+    Jika satu stage gagal, stage lain dibatalkan dan error-nya diteruskan.
+    `on_stage_done(name)` dipanggil di event loop setiap kali satu stage selesai,
+    `on_field(stage, key, value)` setiap kali stage streaming menerbitkan field.
+    """
+    tasks: Dict[str, asyncio.Task] = {}
+    fields: Dict[str, asyncio.Future] = {}
+    loop = asyncio.get_running_loop()
+
+    def field_future(key: str) -> asyncio.Future:
+        if key not in fields:
+            fields[key] = loop.create_future()
+        return fields[key]
+
+    def publish(stage_name: str, key: str, value: Any) -> None:
+        future = field_future(f"{stage_name}.{key}")
+        if not future.done():
+            future.set_result(value)
+        if on_field is not None:
+            on_field(stage_name, key, value)
+
+    async def resolve(dep: str):
+        if dep in tasks:
+            return await tasks[dep]
+        stage_name, key = dep.split(".", 1)
+        future, task = field_future(dep), tasks[stage_name]
+        await asyncio.wait({future, task}, return_when=asyncio.FIRST_COMPLETED)
+        if future.done():
+            return future.result()
+        # Stage selesai tanpa menerbitkan field ini (atau gagal): ambil dari hasilnya.
+        return task.result().get(key)
+
+    async def run(stage: Stage):
+        inputs = [await resolve(dep) for dep in stage.deps]
+        is_async = inspect.iscoroutinefunction(stage.fn)
+        kwargs = {}
+        if stage.streams:
+            callback = functools.partial(publish, stage.name)
+            if not is_async:
+                # Fungsi sinkron berjalan di thread: field diteruskan lewat event loop.
+                callback = functools.partial(loop.call_soon_threadsafe, publish, stage.name)
+            kwargs["on_field"] = callback
+        # Waktu diukur setelah dependensi siap, jadi hanya mencakup kerja stage itu sendiri.
+        with stage_timer(stage.name):
+            if is_async:
+                result = await stage.fn(*inputs, **kwargs)
+            else:
+                result = await asyncio.to_thread(stage.fn, *inputs, **kwargs)
+        if on_stage_done is not None:
+            on_stage_done(stage.name)
+        return result
+
+    for stage in _topological_order(stages):
+        tasks[stage.name] = asyncio.create_task(run(stage), name=stage.name)
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for t in tasks.values():
+            t.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return {name: t.result() for name, t in tasks.items()}
@@ -0,0 +1,210 @@
+# /app/prompt_budget.py
+
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+# Estimasi token tanpa memanggil API: Gemini rata-rata ~4 karakter per token
+# untuk teks Inggris/Indonesia. Cukup akurat untuk menegakkan budget; bukan
+# untuk menghitung biaya.
+CHARS_PER_TOKEN = 4
+
+# Pemisah antar potongan konteks (sama dengan yang dipakai retrieval).
+CONTEXT_SEPARATOR = "\n---\n"
+
+# Dua potongan konteks dianggap duplikat jika kemiripan Jaccard shingle
+# 3-kata-nya setidaknya sebesar ini.
+DUPLICATE_THRESHOLD = 0.8
+
+# Urutan prioritas bagian dokumen kandidat saat harus dipangkas (indeks kecil
+# dipertahankan lebih dulu). Bagian yang tidak dikenali mendapat prioritas terakhir.
+CV_SECTION_PRIORITY = (
+    ("skill", "keahlian", "kemampuan", "tech stack", "technolog"),
+    ("experience", "pengalaman", "employment", "work history", "career"),
+    ("project", "proyek", "portfolio"),
+    ("summary", "profile", "profil", "about", "ringkasan", "objective"),
+    ("certific", "sertifikat", "award", "achievement", "prestasi"),
+    ("education", "pendidikan"),
+)
+REPORT_SECTION_PRIORITY = (
+    ("approach", "design", "architecture", "arsitektur", "pendekatan", "implementation", "implementasi"),
+    ("result", "hasil", "evaluation", "evaluasi", "testing", "pengujian"),
+    ("resilien", "error", "retry", "failure", "edge case"),
+    ("summary", "ringkasan", "overview", "introduction", "pendahuluan"),
+    ("conclusion", "kesimpulan", "reflection", "refleksi", "future", "improvement"),
+)
+
+# Sisa budget minimum agar bagian yang tidak muat masih dipotong (bukan dibuang).
+MIN_PARTIAL_SECTION_TOKENS = 40
+
+_HEADING_RE = re.compile(r"^[\W\d_]*([A-Za-z][A-Za-z &/\-]{1,48}?)\s*:?\s*$")
+
+
+def count_tokens(text: str) -> int:
+    """Estimasi jumlah token sebuah teks."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Memotong teks ke `max_tokens`, di batas baris atau kata terakhir yang muat."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary < limit // 2:
+        boundary = cut.rfind(" ")
+    return cut[:boundary if boundary > 0 else limit].rstrip()
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def dedupe_chunks(chunks: Sequence[str], threshold: float = DUPLICATE_THRESHOLD) -> Tuple[List[str], int]:
+    """Membuang potongan yang (hampir) sama dengan potongan sebelumnya. Urutan dipertahankan."""
+    kept: List[str] = []
+    kept_shingles: List[set] = []
+    dropped = 0
+    for chunk in chunks:
+        if not chunk.strip():
+            dropped += 1
+            continue
+        shingles = _shingles(chunk)
+        duplicate = any(
+            len(shingles & other) / (len(shingles | other) or 1) >= threshold for other in kept_shingles
+        )
+        if duplicate:
+            dropped += 1
+            continue
+        kept.append(chunk)
+        kept_shingles.append(shingles)
+    return kept, dropped
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Memecah dokumen menjadi (judul, isi) berdasarkan baris judul pendek
+    (mis. "EXPERIENCE", "Technical Skills:"). Teks sebelum judul pertama
+    menjadi bagian dengan judul kosong.
+    """
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    for line in text.splitlines():
+        stripped = line.strip()
+        match = _HEADING_RE.match(stripped) if stripped and len(stripped) <= 50 else None
+        is_heading = match is not None and (
+            stripped.isupper() or stripped.endswith(":") or stripped.istitle()
+        ) and len(stripped.split()) <= 5
+        if is_heading:
+            sections.append((match.group(1).strip(), [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(title, "\n".join(lines)) for title, lines in sections if title or "".join(lines).strip()]
+
+
+def _section_priority(title: str, priorities: Sequence[Sequence[str]]) -> int:
+    lowered = title.lower()
+    for rank, keywords in enumerate(priorities):
+        if any(keyword in lowered for keyword in keywords):
+            return rank
+    return len(priorities)
+
+
+@dataclass
+class BudgetReport:
+    """Apa yang dipangkas untuk satu prompt (disimpan di rincian job)."""
+    budget: int
+    tokens_before: int = 0
+    tokens_after: int = 0
+    context_chunks: int = 0
+    context_duplicates_dropped: int = 0
+    context_chunks_dropped: int = 0
+    document_tokens_dropped: int = 0
+    sections_truncated: List[str] = field(default_factory=list)
+    sections_dropped: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_dropped(self) -> int:
+        return max(self.tokens_before - self.tokens_after, 0)
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "tokens_dropped": self.tokens_dropped}
+
+
+def fit_document(
+    text: str, max_tokens: int, priorities: Sequence[Sequence[str]], report: BudgetReport
+) -> str:
+    """
+    Memangkas dokumen kandidat per bagian: bagian berprioritas tinggi (mis.
+    skills dan experience di CV) diambil utuh lebih dulu, bagian yang tidak
+    muat dipotong atau dibuang. Bagian yang tersisa ditulis dalam urutan asli.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    sections = split_sections(text)
+    order = sorted(range(len(sections)), key=lambda i: _section_priority(sections[i][0], priorities))
+    kept: Dict[int, str] = {}
+    remaining = max_tokens
+    for i in order:
+        title, body = sections[i]
+        tokens = count_tokens(body)
+        label = title or "(untitled)"
+        if tokens <= remaining:
+            kept[i] = body
+            remaining -= tokens
+        elif remaining >= MIN_PARTIAL_SECTION_TOKENS:
+            kept[i] = _truncate_to_tokens(body, remaining - 10) + "\n[... section truncated]"
+            report.sections_truncated.append(label)
+            remaining = 0
+        else:
+            report.sections_dropped.append(label)
+
+    fitted = "\n".join(kept[i] for i in sorted(kept))
+    report.document_tokens_dropped = max(count_tokens(text) - count_tokens(fitted), 0)
+    return fitted
+
+
+def build_prompt(
+    template: str,
+    context: str | Sequence[str],
+    document: str,
+    budget: int,
+    priorities: Sequence[Sequence[str]] = CV_SECTION_PRIORITY,
+    context_share: float = 0.35,
+    **fields: str,
+) -> Tuple[str, BudgetReport]:
+    """
+    Mengisi `template` ({context}, {document}, dan `fields` lain) tanpa melewati
+    `budget` token. Konteks dideduplikasi lalu dibatasi `context_share` dari
+    sisa budget; sisa budget (termasuk jatah konteks yang tidak terpakai)
+    untuk dokumen kandidat.
+    """
+    chunks = context.split(CONTEXT_SEPARATOR) if isinstance(context, str) else list(context)
+    report = BudgetReport(budget=budget, context_chunks=len(chunks))
+    report.tokens_before = count_tokens(
+        template.format(context=CONTEXT_SEPARATOR.join(chunks), document=document, **fields)
+    )
+
+    fixed = count_tokens(template.format(context="", document="", **fields))
+    available = max(budget - fixed, 0)
+
+    chunks, report.context_duplicates_dropped = dedupe_chunks(chunks)
+    context_budget = int(available * context_share)
+    kept_chunks: List[str] = []
+    used = 0
+    for chunk in chunks:
+        tokens = count_tokens(chunk) + count_tokens(CONTEXT_SEPARATOR)
+        if used + tokens > context_budget:
+            report.context_chunks_dropped += 1
+            continue
+        kept_chunks.append(chunk)
+        used += tokens
+
+    document = fit_document(document, available - used, priorities, report)
+    prompt = template.format(context=CONTEXT_SEPARATOR.join(kept_chunks), document=document, **fields)
+    report.tokens_after = count_tokens(prompt)
+    return prompt, report
@@ -0,0 +1,101 @@
+# /app/retrieval_cache.py
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from .metrics import RETRIEVAL_CACHE_LOOKUPS
+
+# Manifest yang ditulis scripts/ingest_data.py di dalam direktori Chroma.
+# `version` naik setiap kali isi collection berubah.
+MANIFEST_NAME = "ingest_manifest.json"
+
+
+class CollectionVersion:
+    """
+    Membaca `version` dari manifest ingesti. File hanya dibaca ulang jika
+    mtime-nya berubah, jadi cukup satu stat() per query.
+    """
+
+    def __init__(self, chroma_path: str):
+        self.path = os.path.join(chroma_path, MANIFEST_NAME)
+        self._mtime: Optional[int] = None
+        self._version: Any = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Any:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            self._version = json.load(f).get("version", 0)
+                    except (OSError, ValueError):
+                        # Manifest sedang ditulis; pakai versi mtime sampai terbaca.
+                        return f"mtime:{mtime}"
+                    self._mtime = mtime
+        return self._version
+
+
+class RetrievalCache:
+    """
+    LRU hasil retrieval. Versi collection ikut menjadi bagian kunci, dan cache
+    dikosongkan saat versinya berubah, sehingga hasil lama tidak pernah dipakai
+    setelah ingesti.
+    """
+
+    def __init__(self, max_entries: int, version_fn: Callable[[], Any]):
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self._data: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._version: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if self.max_entries <= 0:
+            return compute()
+        version = self.version_fn()
+        full_key = (version, key)
+        with self._lock:
+            if version != self._version:
+                self._data.clear()
+                self._version = version
+            if full_key in self._data:
+                self._data.move_to_end(full_key)
+                self.hits += 1
+                RETRIEVAL_CACHE_LOOKUPS.labels("hit").inc()
+                return self._data[full_key]
+            self.misses += 1
+        RETRIEVAL_CACHE_LOOKUPS.labels("miss").inc()
+
+        # Query dijalankan di luar lock; dua miss bersamaan untuk kunci yang sama
+        # hanya menghasilkan kerja ganda, bukan hasil yang salah.
+        value = compute()
+        with self._lock:
+            if version == self._version:
+                self._data[full_key] = value
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,231 @@
+# /app/retriever.py
+
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .vector_store import VectorStore
+
+# Sumber konteks untuk setiap jenis evaluasi (metadata `source_file`), dipakai
+# oleh app/ai_utils.py dan api/ai_utils.py.
+CV_CONTEXT_SOURCES = ("backend_job_description.pdf", "cv_scoring_rubric.pdf")
+PROJECT_CONTEXT_SOURCES = ("case_study_brief.pdf", "project_scoring_rubric.pdf")
+
+
+class Hit(NamedTuple):
+    text: str
+    score: float
+    metadata: Dict[str, Any]
+
+
+class Retriever:
+    """
+    Antarmuka retrieval bersama: `retrieve(query, top_k, sources)` mengembalikan
+    potongan teks terurut menurun berdasarkan skor. `sources` membatasi hasil ke
+    nilai metadata partisi tertentu (default `source_file`); None = semua.
+    """
+
+    def retrieve(self, query: str, top_k: int = 5, sources: Optional[Sequence[str]] = None) -> List[Hit]:
+        raise NotImplementedError
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indeks (ke dalam `scores`) dari k skor tertinggi, terurut menurun."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(scores, -k)[-k:] if k < scores.shape[0] else np.arange(scores.shape[0])
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
+class VectorRetriever(Retriever):
+    """Dasar backend berbasis VectorStore; query di-embed dengan app.embeddings."""
+
+    def __init__(self, store: VectorStore, partition_key: str = "source_file"):
+        self.store = store
+        self.partition_key = partition_key
+        values = [m.get(partition_key) for m in store.metadatas]
+        self.partition_names = sorted({v for v in values if v is not None})
+        codes = {name: i for i, name in enumerate(self.partition_names)}
+        # Kode partisi per baris; -1 untuk baris tanpa metadata partisi.
+        self.partition_codes = np.array([codes.get(v, -1) for v in values], dtype=np.int32)
+
+    def _codes_for(self, sources: Sequence[str]) -> np.ndarray:
+        return np.array([self.partition_names.index(s) for s in sources if s in self.partition_names], dtype=np.int32)
+
+    def _hits(self, rows: np.ndarray, scores: np.ndarray) -> List[Hit]:
+        return [
+            Hit(self.store.texts[int(r)], float(s), self.store.metadatas[int(r)]) for r, s in zip(rows, scores)
+        ]
+
+    def search(self, query_vec, top_k: int = 5, sources: Optional[Sequence[str]] = None) -> List[Hit]:
+        raise NotImplementedError
+
+    def retrieve(self, query: str, top_k: int = 5, sources: Optional[Sequence[str]] = None) -> List[Hit]:
+        from .embeddings import embed_query
+
+        return self.search(embed_query(query), top_k, sources)
+
+
+def _normalized_query(query_vec) -> Optional[np.ndarray]:
+    q = np.asarray(query_vec, dtype=np.float32).ravel()
+    norm = np.linalg.norm(q)
+    return q / norm if norm else None
+
+
+class ExactRetriever(VectorRetriever):
+    """
+    Pencarian eksak (cosine via matmul). Baris diurutkan per partisi saat
+    dibangun, sehingga query yang difilter hanya mengalikan slice partisinya
+    sendiri (view, tanpa salinan) alih-alih seluruh matriks.
+    """
+
+    def __init__(self, store: VectorStore, partition_key: str = "source_file"):
+        super().__init__(store, partition_key)
+        order = np.argsort(self.partition_codes, kind="stable")
+        if np.any(order != np.arange(len(order))):
+            self.matrix = np.ascontiguousarray(store.matrix[order])
+        else:
+            self.matrix = store.matrix  # sudah terurut: tetap memakai matriks (memory-map) asli
+        self.rows = order
+        sorted_codes = self.partition_codes[order]
+        self._slices = {}
+        for code in range(len(self.partition_names)):
+            start, end = np.searchsorted(sorted_codes, [code, code + 1])
+            self._slices[code] = (int(start), int(end))
+
+    def search(self, query_vec, top_k: int = 5, sources: Optional[Sequence[str]] = None) -> List[Hit]:
+        q = _normalized_query(query_vec)
+        if q is None or len(self.store) == 0:
+            return []
+        if sources is None:
+            scores = self.matrix @ q
+            best = _top_k(scores, top_k)
+            return self._hits(self.rows[best], scores[best])
+
+        candidates_rows, candidates_scores = [], []
+        for code in self._codes_for(sources):
+            start, end = self._slices[int(code)]
+            scores = self.matrix[start:end] @ q
+            best = _top_k(scores, top_k)
+            candidates_rows.append(self.rows[start + best])
+            candidates_scores.append(scores[best])
+        if not candidates_rows:
+            return []
+        rows = np.concatenate(candidates_rows)
+        scores = np.concatenate(candidates_scores)
+        best = _top_k(scores, top_k)
+        return self._hits(rows[best], scores[best])
+
+
+class IVFRetriever(VectorRetriever):
+    """
+    Approximate nearest neighbour dengan inverted file (IVF-Flat): baris
+    dikelompokkan ke `n_lists` centroid (k-means sferis), dan query hanya
+    memeriksa `n_probe` kelompok terdekat. Filter partisi diterapkan pada
+    kandidat; jika kandidat yang lolos filter kurang dari top_k, pencarian
+    jatuh ke scan eksak partisi tersebut.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        partition_key: str = "source_file",
+        n_lists: int = 0,
+        n_probe: int = 8,
+        iterations: int = 10,
+        seed: int = 0,
+    ):
+        super().__init__(store, partition_key)
+        n = len(store)
+        self.n_lists = max(1, min(n_lists or int(math.sqrt(n)), n)) if n else 0
+        self.n_probe = max(1, n_probe)
+        self._exact: Optional[ExactRetriever] = None
+        if n == 0:
+            return
+
+        rng = np.random.default_rng(seed)
+        matrix = store.matrix
+        # Centroid dilatih pada sampel (maks. 256 baris per kelompok).
+        sample_size = min(n, self.n_lists * 256)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            present, starts = np.unique(assign[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            nonempty = norms[:, 0] > 0
+            centroids[nonempty] = sums[nonempty] / norms[nonempty]
+        self.centroids = centroids
+
+        # Tetapkan semua baris per blok supaya memori tetap terbatas pada index besar.
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 65536):
+            block = np.asarray(matrix[start:start + 65536], dtype=np.float32)
+            assign[start:start + 65536] = np.argmax(block @ centroids.T, axis=1)
+        self.list_rows = np.argsort(assign, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.n_lists))])
+        # Matriks diurutkan per kelompok supaya kandidat satu kelompok berupa slice.
+        self.matrix = np.ascontiguousarray(matrix[self.list_rows])
+
+    def _exact_fallback(self) -> ExactRetriever:
+        if self._exact is None:
+            self._exact = ExactRetriever(self.store, self.partition_key)
+        return self._exact
+
+    def search(self, query_vec, top_k: int = 5, sources: Optional[Sequence[str]] = None) -> List[Hit]:
+        q = _normalized_query(query_vec)
+        if q is None or len(self.store) == 0:
+            return []
+        probes = _top_k(self.centroids @ q, self.n_probe)
+        positions = np.concatenate([
+            np.arange(self.list_offsets[p], self.list_offsets[p + 1]) for p in probes
+        ])
+        if sources is not None:
+            allowed = self._codes_for(sources)
+            positions = positions[np.isin(self.partition_codes[self.list_rows[positions]], allowed)]
+            if positions.shape[0] < top_k:
+                return self._exact_fallback().search(q, top_k, sources)
+        scores = self.matrix[positions] @ q
+        best = _top_k(scores, top_k)
+        return self._hits(self.list_rows[positions[best]], scores[best])
+
+
+class ChromaRetriever(Retriever):
+    """Backend Chroma (dipakai api/ai_utils.py); filter partisi lewat `where`."""
+
+    def __init__(self, collection_fn: Callable[[], Any], partition_key: str = "source_file"):
+        self.collection_fn = collection_fn
+        self.partition_key = partition_key
+
+    def retrieve(self, query: str, top_k: int = 5, sources: Optional[Sequence[str]] = None) -> List[Hit]:
+        kwargs = {"query_texts": [query], "n_results": top_k}
+        if sources is not None:
+            kwargs["where"] = {self.partition_key: {"$in": list(sources)}}
+        results = self.collection_fn().query(**kwargs)
+        documents = results["documents"][0]
+        distances = (results.get("distances") or [[None] * len(documents)])[0]
+        metadatas = (results.get("metadatas") or [[{}] * len(documents)])[0]
+        # Collection memakai jarak cosine: skor = 1 - jarak.
+        return [
+            Hit(doc, 1.0 - dist if dist is not None else 0.0, meta or {})
+            for doc, dist, meta in zip(documents, distances, metadatas)
+        ]
+
+
+VECTOR_BACKENDS = {"exact": ExactRetriever, "ivf": IVFRetriever}
+
+
+def build_retriever(store: VectorStore, backend: str, partition_key: str = "source_file", **options) -> VectorRetriever:
+    """Membangun backend berbasis VectorStore sesuai nama ("exact" atau "ivf")."""
+    try:
+        cls = VECTOR_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown retriever backend '{backend}'.")
+    if cls is ExactRetriever:
+        return cls(store, partition_key)
+    return cls(store, partition_key, **options)
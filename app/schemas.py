@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 
 # --- Skema untuk /upload ---
 class UploadResponseItem(BaseModel):
@@ -16,11 +16,36 @@ class EvaluateRequest(BaseModel):
     job_title: str
     cv_document_id: str
     project_report_id: str
+    use_cache: bool = True  # False = paksa panggilan LLM baru (hasil tetap disimpan ke cache)
+    priority: Literal["high", "normal", "low"] = "normal"
 
 class EvaluateResponse(BaseModel):
     id: str
     status: str
 
+# --- Skema untuk /evaluate/batch ---
+class BatchCandidate(BaseModel):
+    cv_document_id: str
+    project_report_id: str
+
+class BatchEvaluateRequest(BaseModel):
+    job_title: str
+    candidates: List[BatchCandidate] = Field(..., min_length=1)
+    use_cache: bool = True
+    priority: Literal["high", "normal", "low"] = "low"
+
+class BatchEvaluateResponse(BaseModel):
+    id: str
+    status: str
+    job_ids: List[str]
+
+class GetBatchResponse(BaseModel):
+    id: str
+    status: str
+    job_title: str
+    job_ids: List[str]
+    progress: Optional[Dict[str, int]] = None
+
 # --- Skema untuk /result/{id} ---
 class EvaluationResult(BaseModel):
     cv_match_rate: float
@@ -29,8 +54,26 @@ class EvaluationResult(BaseModel):
     project_feedback: str
     overall_summary: str
 
+# --- Skema output LLM per stage (divalidasi app/llm_output sebelum dipakai) ---
+class CVEvaluationOutput(BaseModel):
+    cv_match_rate: float = Field(..., ge=0.0, le=1.0)
+    cv_feedback: str
+
+class ProjectEvaluationOutput(BaseModel):
+    project_score: float = Field(..., ge=1.0, le=5.0)
+    project_feedback: str
+
+class SummaryOutput(BaseModel):
+    overall_summary: str
+
+class FullEvaluationOutput(SummaryOutput, ProjectEvaluationOutput, CVEvaluationOutput):
+    """Output mode single; field-nya sama dengan EvaluationResult."""
+
 class GetResultResponse(BaseModel):
     id: str
     status: str
     result: Optional[EvaluationResult] = None
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
+    timings: Optional[Dict[str, Any]] = None
\ No newline at end of file
@@ -1,44 +1,327 @@
-import os
+import asyncio
+import functools
+from typing import Callable
+from . import document_store
 from .ai_utils import (
-    parse_pdf,
-    run_cv_evaluation_vector,
-    run_project_evaluation_vector,
-    run_final_summary_vector,
+    get_cv_context,
+    get_project_context,
+    parse_pdf_async,
+    run_cv_evaluation,
+    run_final_summary,
+    run_full_evaluation,
+    run_project_evaluation,
 )
-from .job_store import update_job_status
+from . import metrics
+from .schemas import EvaluationResult
+from .config import settings
+from .job_store import FINISHED_STATUSES, get_job_status, update_job_status
+from .llm_limiter import ProviderUnavailable
+from .pipeline import Stage, run_graph
 
-def process_evaluation_sync(job_id: str, cv_path: str, report_path: str, job_title: str):
+
+async def _parse_required(path: str) -> str:
+    text = await parse_pdf_async(path)
+    if not text:
+        raise ValueError("Failed to parse one or both PDF documents.")
+    return text
+
+
+async def _summarize(cv_feedback: str, project_feedback: str, use_cache: bool = True, on_field=None) -> dict:
+    return await run_final_summary(
+        cv_feedback=cv_feedback or "",
+        project_feedback=project_feedback or "",
+        use_cache=use_cache,
+        on_field=on_field,
+    )
+
+
+async def _evaluate_single(
+    cv_text: str,
+    report_text: str,
+    job_title: str,
+    use_cache: bool = True,
+    cv_context: str | None = None,
+    project_context: str | None = None,
+    on_field=None,
+) -> dict:
+    result = await run_full_evaluation(
+        cv_text, report_text, job_title, use_cache, cv_context, project_context, on_field
+    )
+    # Structured output seharusnya sudah lengkap; validasi tetap dilakukan agar
+    # hasil yang tidak lengkap gagal di sini, bukan di /result.
+    return EvaluationResult.model_validate(result).model_dump()
+
+
+# Stage yang hasilnya digabung menjadi hasil akhir job (sesuai urutan).
+RESULT_STAGES = ("cv_result", "project_result", "summary_result", "evaluation_result")
+
+
+def build_evaluation_graph(
+    cv_path: str,
+    report_path: str,
+    job_title: str,
+    use_cache: bool = True,
+    cv_context: str | None = None,
+    project_context: str | None = None,
+    mode: str | None = None,
+) -> list[Stage]:
+    """
+    Graf dependensi pipeline evaluasi. Pada mode "three_call", cabang CV dan
+    cabang proyek independen sampai tahap ringkasan, jadi parsing dan evaluasi
+    keduanya berjalan paralel. Pada mode "single", kedua dokumen di-parse paralel
+    lalu dievaluasi dalam satu panggilan LLM. Stage LLM menerbitkan field hasil
+    begitu final; ringkasan hanya menunggu field feedback, bukan seluruh respons.
+    """
+    mode = mode or settings.EVALUATION_MODE
+    if mode == "single":
+        return [
+            Stage("cv_text", functools.partial(_parse_required, cv_path)),
+            Stage("report_text", functools.partial(_parse_required, report_path)),
+            Stage(
+                "evaluation_result",
+                functools.partial(
+                    _evaluate_single, job_title=job_title, use_cache=use_cache,
+                    cv_context=cv_context, project_context=project_context,
+                ),
+                deps=("cv_text", "report_text"),
+                streams=True,
+            ),
+        ]
+    if mode != "three_call":
+        raise ValueError(f"Unknown EVALUATION_MODE '{mode}'.")
+    return [
+        Stage("cv_text", functools.partial(_parse_required, cv_path)),
+        Stage("report_text", functools.partial(_parse_required, report_path)),
+        Stage(
+            "cv_result",
+            functools.partial(run_cv_evaluation, job_title=job_title, use_cache=use_cache, context=cv_context),
+            deps=("cv_text",),
+            streams=True,
+        ),
+        Stage(
+            "project_result",
+            functools.partial(run_project_evaluation, use_cache=use_cache, context=project_context),
+            deps=("report_text",),
+            streams=True,
+        ),
+        Stage(
+            "summary_result",
+            functools.partial(_summarize, use_cache=use_cache),
+            deps=("cv_result.cv_feedback", "project_result.project_feedback"),
+            streams=True,
+        ),
+    ]
+
+
+class _ProgressWriter:
     """
-    Fungsi yang menjalankan seluruh pipeline evaluasi AI (versi vector.json).
+    Menulis progress job ('processing') ke job store di thread, satu penulisan
+    pada satu waktu. Update yang datang selama penulisan berlangsung digabung:
+    penulisan berikutnya memakai `snapshot()` terbaru.
+    """
+
+    def __init__(self, job_id: str, snapshot: Callable[[], dict]):
+        self.job_id = job_id
+        self.snapshot = snapshot
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+
+    def report(self) -> None:
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            await asyncio.to_thread(update_job_status, self.job_id, "processing", progress=self.snapshot())
+
+    async def flush(self) -> None:
+        """Menunggu penulisan yang tersisa, supaya status akhir tidak tertimpa progress."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def process_evaluation(
+    job_id: str,
+    cv_path: str,
+    report_path: str,
+    job_title: str,
+    use_cache: bool = True,
+    cv_context: str | None = None,
+    project_context: str | None = None,
+    mode: str | None = None,
+):
+    """
+    Fungsi yang menjalankan seluruh pipeline evaluasi AI (versi vector index).
+    Berjalan di event loop: parsing PDF dan akses job/document store di thread,
+    panggilan LLM async.
     """
     print(f"Starting evaluation for job_id: {job_id}")
+    timings = metrics.begin_job_timings()
+    completed: list[str] = []
+    partial_result: dict = {}
+    stages: list[Stage] = []
+    writer = _ProgressWriter(job_id, lambda: {
+        "completed_stages": list(completed),
+        "total_stages": len(stages),
+        "partial_result": dict(partial_result),
+    })
     try:
-        update_job_status(job_id, "processing")
+        stages = build_evaluation_graph(
+            cv_path, report_path, job_title, use_cache, cv_context, project_context, mode
+        )
 
-        cv_text = parse_pdf(cv_path)
-        report_text = parse_pdf(report_path)
+        def report_progress(stage_name: str | None = None):
+            if stage_name:
+                completed.append(stage_name)
+            writer.report()
 
-        if not cv_text or not report_text:
-            raise ValueError("Failed to parse one or both PDF documents.")
+        def report_field(stage_name: str, key: str, value):
+            # Field hasil yang sudah final langsung terlihat di /result dan SSE.
+            if stage_name in RESULT_STAGES and partial_result.get(key) != value:
+                partial_result[key] = value
+                writer.report()
 
-        # Gunakan versi berbasis vector.json
-        cv_result = run_cv_evaluation_vector(cv_text, job_title)
-        project_result = run_project_evaluation_vector(report_text)
-        summary_result = run_final_summary_vector(
-            cv_feedback=cv_result.get("cv_feedback", ""),
-            project_feedback=project_result.get("project_feedback", "")
-        )
+        report_progress()
+        results = await run_graph(stages, on_stage_done=report_progress, on_field=report_field)
 
-        final_result = {**cv_result, **project_result, **summary_result}
-        update_job_status(job_id, "completed", final_result)
-        print(f"Evaluation completed successfully for job_id: {job_id}")
+        final_result = {}
+        for name in RESULT_STAGES:
+            final_result.update(results.get(name, {}))
+        await writer.flush()
+        timings = metrics.finish_job_timings(timings, "completed")
+        await asyncio.to_thread(update_job_status, job_id, "completed", final_result, timings=timings)
+        print(f"Evaluation completed successfully for job_id: {job_id} in {timings['total']:.2f}s")
 
+    except asyncio.CancelledError:
+        # Dihentikan saat shutdown: pertahankan referensi dokumennya. Job dengan
+        # payload `task` sendiri dikembalikan ke antrian untuk recover(); kandidat
+        # batch diantrikan ulang oleh process_batch, yang memegang payload-nya.
+        await writer.flush()
+        if (await asyncio.to_thread(get_job_status, job_id) or {}).get("task"):
+            await asyncio.to_thread(update_job_status, job_id, "queued")
+        cv_path = report_path = None
+        raise
+    except ProviderUnavailable as e:
+        # Circuit breaker LLM terbuka: job tidak digagalkan, tetapi dikembalikan
+        # ke antrian (beserta referensi dokumennya) dan dijadwalkan ulang executor.
+        print(f"LLM provider unavailable, deferring job_id {job_id} for {e.retry_after:.0f}s")
+        await writer.flush()
+        await asyncio.to_thread(
+            update_job_status, job_id, "queued", progress={"retry_after": round(e.retry_after, 1)}
+        )
+        cv_path = report_path = None
+        raise
     except Exception as e:
         print(f"Error during evaluation for job_id {job_id}: {e}")
-        update_job_status(job_id, "failed", {"error": str(e)})
+        await writer.flush()
+        timings = metrics.finish_job_timings(timings, "failed")
+        await asyncio.to_thread(update_job_status, job_id, "failed", {"error": str(e)}, timings=timings)
     finally:
-        # Hapus file sementara
-        if os.path.exists(cv_path):
-            os.remove(cv_path)
-        if os.path.exists(report_path):
-            os.remove(report_path)
+        # Dokumen tetap di document store untuk evaluasi berikutnya (posisi lain,
+        # tanpa upload dan parsing ulang); job hanya melepas referensinya.
+        await asyncio.to_thread(document_store.release, job_id, cv_path, report_path)
+
+
+def process_evaluation_sync(
+    job_id: str, cv_path: str, report_path: str, job_title: str, use_cache: bool = True
+):
+    """Versi blocking dari process_evaluation (untuk pemanggil sinkron)."""
+    asyncio.run(process_evaluation(job_id, cv_path, report_path, job_title, use_cache))
+
+
+def _count_candidates(candidates: list[tuple[str, str, str]]) -> tuple[dict, list]:
+    """Hitungan status kandidat batch menurut job store, beserta kandidat yang belum selesai."""
+    counts = {"total": len(candidates), "queued": 0, "processing": 0, "completed": 0, "failed": 0}
+    pending = []
+    for candidate in candidates:
+        status = (get_job_status(candidate[0]) or {}).get("status")
+        if status in FINISHED_STATUSES:
+            counts[status] += 1
+        else:
+            pending.append(candidate)
+    counts["queued"] = len(pending)
+    return counts, pending
+
+
+async def process_batch(
+    batch_id: str,
+    job_title: str,
+    candidates: list[tuple[str, str, str]],
+    use_cache: bool = True,
+    max_parallel: int | None = None,
+):
+    """
+    Mengevaluasi banyak kandidat untuk satu job_title. Konteks retrieval diambil
+    sekali untuk seluruh batch; kandidat dijalankan paralel dengan batas
+    `max_parallel` (bobot batch di admission control; default
+    BATCH_MAX_PARALLEL_CANDIDATES). `candidates` berisi (job_id, cv_path, report_path).
+    Jika dihentikan saat shutdown, batch kembali 'queued' dan kandidat yang sudah
+    selesai dilewati saat dijalankan ulang oleh recover().
+    """
+    print(f"Starting batch {batch_id} with {len(candidates)} candidates")
+    counts, pending = await asyncio.to_thread(_count_candidates, candidates)
+    writer = _ProgressWriter(batch_id, lambda: dict(counts))
+    writer.report()
+
+    try:
+        cv_context, project_context = await asyncio.gather(
+            asyncio.to_thread(get_cv_context, job_title),
+            asyncio.to_thread(get_project_context),
+        )
+    except Exception as e:
+        print(f"Error retrieving context for batch {batch_id}: {e}")
+        cv_context = project_context = None  # biarkan tiap kandidat mencoba retrieval sendiri
+
+    semaphore = asyncio.Semaphore(max_parallel or settings.BATCH_MAX_PARALLEL_CANDIDATES)
+    running: set[str] = set()
+
+    async def run_candidate(job_id: str, cv_path: str, report_path: str):
+        async with semaphore:
+            running.add(job_id)
+            counts["queued"] -= 1
+            counts["processing"] += 1
+            writer.report()
+            while True:
+                try:
+                    await process_evaluation(
+                        job_id, cv_path, report_path, job_title, use_cache, cv_context, project_context
+                    )
+                    break
+                except ProviderUnavailable as e:
+                    # Provider LLM tidak sehat: kandidat menunggu di dalam batch, bukan gagal.
+                    await asyncio.sleep(e.retry_after)
+            running.discard(job_id)
+        job = await asyncio.to_thread(get_job_status, job_id) or {}
+        counts["processing"] -= 1
+        counts["completed" if job.get("status") == "completed" else "failed"] += 1
+        writer.report()
+
+    try:
+        await asyncio.gather(*(run_candidate(*c) for c in pending))
+    except asyncio.CancelledError:
+        # Batch membawa payload `task`, jadi recover() akan menjalankannya lagi;
+        # kandidat yang sedang berjalan ikut kembali 'queued' di dalam batch.
+        # Hitungan dibaca ulang dari job store: kandidat yang baru saja selesai
+        # mungkin belum sempat tercatat di `counts` saat dibatalkan.
+        await writer.flush()
+        for job_id in running:
+            await asyncio.to_thread(update_job_status, job_id, "queued")
+        counts, _ = await asyncio.to_thread(_count_candidates, candidates)
+        await asyncio.to_thread(update_job_status, batch_id, "queued", progress=dict(counts))
+        raise
+    await writer.flush()
+    await asyncio.to_thread(update_job_status, batch_id, "completed", progress=dict(counts))
+    print(f"Batch {batch_id} finished: {counts['completed']} completed, {counts['failed']} failed")
+
+
+async def _run_batch(job_id: str, **args):
+    await process_batch(batch_id=job_id, **args)
+
+
+# Handler untuk app.executor, berdasarkan `task["type"]` yang disimpan di record job.
+TASK_HANDLERS = {
+    "evaluation": process_evaluation,
+    "batch": _run_batch,
+}
@@ -0,0 +1,101 @@
+# /app/uploads.py
+
+import asyncio
+import hashlib
+import os
+import threading
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from .config import settings
+from .document_store import DocumentStore, get_document_store
+from .job_store import find_document_by_hash, get_document_path, register_document
+
+CHUNK_SIZE = 1024 * 1024
+# Ruang untuk boundary dan header multipart per file di atas MAX_UPLOAD_BYTES.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+_register_lock = threading.Lock()
+
+
+async def save_upload(file: UploadFile, store: Optional[DocumentStore] = None) -> str:
+    """
+    Menyimpan file upload ke document store secara streaming (per chunk) sambil
+    menghitung SHA-256. Upload yang melebihi MAX_UPLOAD_BYTES ditolak begitu
+    batasnya terlewati. File yang identik byte-per-byte mengembalikan
+    document_id lama. Mengembalikan document_id.
+    """
+    store = store or get_document_store()
+    file_id = str(uuid.uuid4())
+    filename = os.path.basename(file.filename or "upload.pdf")
+    tmp_path = store.new_tmp_path()
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if settings.MAX_UPLOAD_BYTES and size > settings.MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File '{filename}' exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes.",
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    content_hash = digest.hexdigest()
+    return await asyncio.to_thread(_register, store, tmp_path, content_hash, filename, file_id)
+
+
+def _register(store: DocumentStore, tmp_path: str, content_hash: str, filename: str, file_id: str) -> str:
+    # Memindahkan file ke document store dan mencatat document_id-nya (di thread).
+    with _register_lock:
+        file_path = store.put(tmp_path, content_hash, filename)
+        existing_id = find_document_by_hash(content_hash)
+        if existing_id and get_document_path(existing_id) == file_path:
+            return existing_id
+        register_document(file_id, file_path, content_hash)
+    return file_id
+
+
+class UploadSizeLimit:
+    """
+    Middleware ASGI: menolak upload dengan Content-Length di atas `files` x
+    MAX_UPLOAD_BYTES (413) sebelum body-nya dibaca, karena form multipart sudah
+    di-spool seluruhnya oleh Starlette sebelum endpoint berjalan. Upload tanpa
+    Content-Length (chunked) tetap dibatasi per file oleh save_upload().
+    """
+
+    def __init__(self, app, path: str = "/upload", files: int = 2):
+        self.app = app
+        self.path = path
+        self.files = files
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] == self.path
+            and settings.MAX_UPLOAD_BYTES
+        ):
+            limit = self.files * (settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > limit:
+                response = JSONResponse(
+                    {"detail": f"Upload exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes per file."},
+                    status_code=413,
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
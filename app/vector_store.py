@@ -0,0 +1,170 @@
+# /app/vector_store.py
+
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa lock antar proses
+    fcntl = None
+
+# Format di disk: satu matriks float32 (.npy) yang barisnya sudah dinormalisasi,
+# ditambah sidecar JSON berisi teks dan metadata untuk setiap baris.
+INDEX_SUFFIX = ".npy"
+META_SUFFIX = ".meta.json"
+LOCK_SUFFIX = ".lock"
+
+
+@contextmanager
+def _index_lock(path: str, exclusive: bool):
+    """
+    Lock antar proses untuk pasangan `<path>.npy` + `<path>.meta.json`: save()
+    mengganti keduanya di bawah lock eksklusif, load() membuka keduanya di bawah
+    lock bersama, jadi pembaca tidak pernah mendapat index dan metadata dari
+    dua penulisan berbeda (mis. beberapa worker gunicorn yang re-embed bersamaan).
+    """
+    try:
+        lock_file = open(path + LOCK_SUFFIX, "a") if fcntl is not None else None
+    except OSError:
+        lock_file = None  # filesystem read-only: tidak ada penulis yang perlu ditunggu
+    if lock_file is None:
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class VectorStore:
+    """Menyimpan embedding sebagai satu matriks float32 yang ter-normalisasi."""
+
+    def __init__(self, matrix: np.ndarray, texts: List[str], metadatas: List[Dict[str, Any]]):
+        if matrix.ndim != 2:
+            raise ValueError("Vector matrix must be 2-dimensional.")
+        if not (matrix.shape[0] == len(texts) == len(metadatas)):
+            raise ValueError("Matrix rows, texts and metadatas must have the same length.")
+        self.matrix = matrix
+        self.texts = texts
+        self.metadatas = metadatas
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @classmethod
+    def from_embeddings(cls, embeddings, texts: List[str], metadatas: List[Dict[str, Any]]) -> "VectorStore":
+        """Membangun store dari embedding mentah; baris dinormalisasi sekali di sini."""
+        matrix = np.array(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = matrix.reshape(0, 0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return cls(matrix, list(texts), list(metadatas))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorStore":
+        """Memuat store dari `<path>.npy` + `<path>.meta.json` (matriks di-memory-map)."""
+        with _index_lock(path, exclusive=False):
+            matrix = np.load(path + INDEX_SUFFIX, mmap_mode="r" if mmap else None)
+            with open(path + META_SUFFIX, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        if matrix.shape != (meta["count"], meta["dim"]):
+            raise ValueError(
+                f"Vector index {path} does not match its metadata: "
+                f"{matrix.shape} vs ({meta['count']}, {meta['dim']})."
+            )
+        return cls(matrix, meta["texts"], meta["metadatas"])
+
+    def save(self, path: str) -> None:
+        """Menyimpan store ke `<path>.npy` + `<path>.meta.json`."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Tulis ke file sementara bernama unik lalu rename keduanya di bawah lock,
+        # supaya proses lain tidak membaca file yang setengah ditulis atau milik
+        # penulis lain, dan index lama yang sedang di-memory-map tetap utuh.
+        token = uuid.uuid4().hex
+        index_tmp = f"{path}{INDEX_SUFFIX}.{token}.tmp"
+        meta_tmp = f"{path}{META_SUFFIX}.{token}.tmp"
+        try:
+            with open(index_tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+            with open(meta_tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"dim": self.dim, "count": len(self), "texts": self.texts, "metadatas": self.metadatas},
+                    f,
+                    ensure_ascii=False,
+                )
+            with _index_lock(path, exclusive=True):
+                os.replace(index_tmp, path + INDEX_SUFFIX)
+                os.replace(meta_tmp, path + META_SUFFIX)
+        finally:
+            for tmp_path in (index_tmp, meta_tmp):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def search(self, query_vec, top_k: int = 5) -> List[tuple[int, float]]:
+        """Mengembalikan (indeks baris, skor cosine) untuk top_k baris, terurut menurun."""
+        n = len(self)
+        if n == 0 or top_k <= 0:
+            return []
+        q = np.asarray(query_vec, dtype=np.float32).ravel()
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        scores = self.matrix @ (q / norm)
+
+        k = min(top_k, n)
+        if k < n:
+            idx = np.argpartition(scores, -k)[-k:]
+        else:
+            idx = np.arange(n)
+        idx = idx[np.argsort(scores[idx])[::-1]]
+        return [(int(i), float(scores[i])) for i in idx]
+
+
+def convert_json(json_path: str, out_path: str, embed_fn=None) -> VectorStore:
+    """
+    Konversi vector.json lama (list of dict dengan `embedding`) ke format .npy + sidecar.
+    Jika `embed_fn` diberikan, teks di-embed ulang dan kolom `embedding` diabaikan.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    texts = [r["text"] for r in records]
+    metadatas = [{k: v for k, v in r.items() if k not in ("text", "embedding")} for r in records]
+    if embed_fn is not None:
+        embeddings = embed_fn(texts)
+    else:
+        embeddings = np.array([r["embedding"] for r in records], dtype=np.float32)
+
+    store = VectorStore.from_embeddings(embeddings, texts, metadatas)
+    store.save(out_path)
+    return store
+
+
+def reembed(store: VectorStore, embed_fn, out_path: str | None = None) -> VectorStore:
+    """Embed ulang seluruh teks di store (mis. saat model embedding berganti)."""
+    rebuilt = VectorStore.from_embeddings(embed_fn(store.texts), store.texts, store.metadatas)
+    if out_path:
+        rebuilt.save(out_path)
+    return rebuilt
+
+
+def load_or_convert(index_path: str, json_path: str) -> VectorStore:
+    """Memuat index biner; jika belum ada, buat dari vector.json lalu simpan."""
+    if os.path.exists(index_path + INDEX_SUFFIX) and os.path.exists(index_path + META_SUFFIX):
+        return VectorStore.load(index_path)
+    print(f"Vector index {index_path} not found, converting from {json_path}...")
+    convert_json(json_path, index_path)
+    return VectorStore.load(index_path)
@@ -0,0 +1,81 @@
+# /app/warmup.py
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# Waktu saat modul ini pertama kali di-import (di-import paling awal oleh
+# app.main), dipakai untuk mengukur waktu import-to-ready.
+IMPORT_STARTED = time.monotonic()
+
+# Resource berat (klien LLM, embedder, vector index, collection Chroma) dibuat
+# lazy saat pertama dipakai. Setiap modul mendaftarkan resource-nya di sini
+# supaya /readyz bisa melaporkan statusnya dan warmup() bisa memuatnya lebih awal.
+_components: Dict[str, tuple[Callable[[], bool], Callable[[], Any]]] = {}
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"warmup": "idle", "errors": {}, "timings": {}, "ready_after": None}
+
+
+def register_component(name: str, is_loaded: Callable[[], bool], load: Callable[[], Any]) -> None:
+    """Mendaftarkan resource lazy: `is_loaded()` murah dipanggil, `load()` memuatnya."""
+    with _lock:
+        _components[name] = (is_loaded, load)
+
+
+def component_status() -> Dict[str, bool]:
+    with _lock:
+        components = dict(_components)
+    status = {}
+    for name, (is_loaded, _) in components.items():
+        try:
+            status[name] = bool(is_loaded())
+        except Exception:
+            status[name] = False
+    return status
+
+
+def warmup() -> Dict[str, float]:
+    """Memuat semua resource terdaftar (blocking). Mengembalikan durasi per resource."""
+    with _lock:
+        components = list(_components.items())
+        _state["warmup"] = "running"
+    for name, (is_loaded, load) in components:
+        if is_loaded():
+            continue
+        started = time.monotonic()
+        try:
+            load()
+        except Exception as e:
+            print(f"Warmup of {name} failed: {e}")
+            _state["errors"][name] = str(e)
+        _state["timings"][name] = round(time.monotonic() - started, 3)
+    _state["warmup"] = "failed" if _state["errors"] else "done"
+    _state["ready_after"] = round(time.monotonic() - IMPORT_STARTED, 3)
+    print(f"Warmup {_state['warmup']} {_state['ready_after']}s after import: {_state['timings']}")
+    return dict(_state["timings"])
+
+
+def start_background_warmup() -> asyncio.Task:
+    """Menjalankan warmup() di thread terpisah tanpa menahan startup server."""
+    _state["warmup"] = "running"
+    return asyncio.create_task(asyncio.to_thread(warmup), name="warmup")
+
+
+def readiness(serving: bool) -> Dict[str, Any]:
+    """
+    Status untuk /readyz. Siap jika server sudah melayani request (`serving`) dan
+    warmup, bila sedang berjalan, sudah selesai. Resource yang belum dimuat tanpa
+    warmup tetap dianggap siap karena akan dimuat saat pertama dipakai.
+    """
+    ready = serving and _state["warmup"] != "running"
+    return {
+        "ready": ready,
+        "warmup": _state["warmup"],
+        "components": component_status(),
+        "warmup_seconds": dict(_state["timings"]),
+        "errors": dict(_state["errors"]),
+        "uptime_seconds": round(time.monotonic() - IMPORT_STARTED, 3),
+        "ready_after_seconds": _state["ready_after"],
+    }
+
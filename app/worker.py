@@ -0,0 +1,40 @@
+# /app/worker.py
+
+import asyncio
+import signal
+
+from .config import settings
+from .document_store import start_document_gc
+from .executor import get_executor
+
+
+async def run_worker():
+    """
+    Worker di luar proses web: mengambil job 'queued' dari job store (SQLite
+    atau Redis) dan menjalankannya dengan JobExecutor yang sama seperti mode inline.
+    """
+    executor = get_executor()
+    await executor.start()
+    start_document_gc()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    while not stop.is_set():
+        await executor.recover()
+        try:
+            await asyncio.wait_for(stop.wait(), settings.EXECUTOR_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    print("Shutting down worker, draining queue...")
+    await executor.drain(settings.EXECUTOR_DRAIN_TIMEOUT)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import format_stats, make_pdf, peak_rss_mb, percentiles, write_report
+
+
+def configure_environment(args) -> None:
+    """Setting untuk run benchmark; harus diset sebelum app.config di-import."""
+    os.environ.setdefault("JOB_STORE_URL", "memory://")
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")  # setiap kandidat unik, cache hanya mengaburkan hasil
+    os.environ.setdefault("LLM_RETRY_MIN_WAIT", "0.05")
+    os.environ.setdefault("LLM_RETRY_MAX_WAIT", "0.2")
+    os.environ.setdefault("EXECUTOR_QUEUE_SIZE", str(max(args.requests, 100)))
+    if args.workers:
+        os.environ["EXECUTOR_WORKERS"] = str(args.workers)
+
+
+def install_stub_llm(args):
+    """Mengganti Gemini dengan FakeLLMClient (latensi ~ N(mean, jitter*mean), gagal acak)."""
+    from app.llm_client import FakeLLMClient, set_llm_client
+
+    rng = random.Random(args.seed)
+
+    def latency() -> float:
+        return max(0.0, rng.gauss(args.llm_latency, args.llm_latency * args.llm_jitter))
+
+    client = FakeLLMClient(latency=latency, failure_rate=args.llm_failure_rate, seed=args.seed)
+    set_llm_client(client)
+    return client
+
+
+async def run_candidate(client, index: int, pages: int, args, samples: dict) -> None:
+    cv_pdf = make_pdf(pages, seed=args.seed * 100_000 + 2 * index)
+    report_pdf = make_pdf(pages, seed=args.seed * 100_000 + 2 * index + 1)
+
+    started = time.perf_counter()
+    response = await client.post(
+        "/upload",
+        files={
+            "cv_file": (f"cv_{index}.pdf", cv_pdf, "application/pdf"),
+            "project_report_file": (f"report_{index}.pdf", report_pdf, "application/pdf"),
+        },
+    )
+    response.raise_for_status()
+    ids = {f["document_type"]: f["document_id"] for f in response.json()["files"]}
+    uploaded = time.perf_counter()
+
+    while True:
+        response = await client.post("/evaluate", json={
+            "job_title": args.job_title,
+            "cv_document_id": ids["cv"],
+            "project_report_id": ids["project_report"],
+        })
+        if response.status_code not in (429, 503):
+            break
+        samples["rejected"] += 1
+        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+    response.raise_for_status()
+    job_id = response.json()["id"]
+
+    while True:
+        response = await client.get(f"/result/{job_id}", params={"wait": 30})
+        response.raise_for_status()
+        job = response.json()
+        if job["status"] in ("completed", "failed"):
+            break
+    finished = time.perf_counter()
+
+    samples["upload"].append(uploaded - started)
+    samples["evaluate"].append(finished - uploaded)
+    samples["total"].append(finished - started)
+    samples[job["status"]] += 1
+
+
+async def run_benchmark(args) -> dict:
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+        lifespan = None
+        stub = None
+    else:
+        from app import warmup
+        from app.main import app
+
+        stub = install_stub_llm(args)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+        lifespan = app.router.lifespan_context(app)
+
+    page_counts = [int(p) for p in args.pages.split(",")]
+    samples = {"upload": [], "evaluate": [], "total": [], "completed": 0, "failed": 0, "rejected": 0}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(index: int):
+        async with semaphore:
+            await run_candidate(client, index, page_counts[index % len(page_counts)], args, samples)
+
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            if lifespan is not None and not args.no_warmup:
+                # Model embedding & index dimuat di luar pengukuran (lifespan
+                # sudah meng-import app.tasks, jadi semua resource terdaftar).
+                await asyncio.to_thread(warmup.warmup)
+            started = time.perf_counter()
+            await asyncio.gather(*(limited(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - started
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    report = {
+        "config": vars(args),
+        "elapsed_seconds": elapsed,
+        "throughput_jobs_per_second": args.requests / elapsed if elapsed else 0.0,
+        "completed": samples["completed"],
+        "failed": samples["failed"],
+        "rejected_retries": samples["rejected"],
+        "latency": {name: percentiles(samples[name]) for name in ("upload", "evaluate", "total")},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if stub is not None:
+        report["llm"] = {"calls": stub.calls, "failures": stub.failures}
+    return report
+
+
+def main():
+    """Benchmark end-to-end /upload -> /evaluate -> /result terhadap app.main:app."""
+    parser = argparse.ArgumentParser(description="End-to-end evaluation benchmark.")
+    parser.add_argument("--requests", type=int, default=50, help="Jumlah kandidat yang dievaluasi")
+    parser.add_argument("--concurrency", type=int, default=8, help="Kandidat yang berjalan bersamaan")
+    parser.add_argument("--pages", default="1,5,20", help="Jumlah halaman PDF sintetis, bergiliran")
+    parser.add_argument("--job-title", default="Backend Engineer")
+    parser.add_argument("--workers", type=int, default=0, help="EXECUTOR_WORKERS (0 = dari setting)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Rata-rata latensi LLM palsu (detik)")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="Simpangan baku relatif latensi")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="Peluang satu panggilan LLM gagal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-warmup", action="store_true", help="Ikutkan pemuatan model di pengukuran")
+    parser.add_argument(
+        "--url", help="Jalankan terhadap server yang sudah hidup (LLM asli; opsi --llm-* diabaikan)"
+    )
+    parser.add_argument("--json", help="Simpan hasil sebagai JSON ke path ini")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    if not args.url:
+        # Upload, cache, dan job store sementara tidak mengotori working tree.
+        os.chdir(tempfile.mkdtemp(prefix="cv-eval-bench-"))
+    report = asyncio.run(run_benchmark(args))
+
+    print(f"{args.requests} jobs in {report['elapsed_seconds']:.2f}s "
+          f"({report['throughput_jobs_per_second']:.2f} jobs/s), "
+          f"{report['completed']} completed, {report['failed']} failed, "
+          f"{report['rejected_retries']} rejected submissions retried")
+    for name, stats in report["latency"].items():
+        print(format_stats(name, stats))
+    rss = report["peak_rss_mb"]
+    print(f"peak RSS: {rss['self']:.1f} MB (parse workers: {rss['children']:.1f} MB)")
+    if "llm" in report:
+        print(f"stub LLM: {report['llm']['calls']} calls, {report['llm']['failures']} simulated failures")
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
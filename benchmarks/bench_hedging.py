@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import format_stats, percentiles, write_report
+
+PRIMARY_MODEL = "fake-primary"
+FALLBACK_MODEL = "fake-fallback"
+
+
+def configure_environment(args) -> None:
+    """Setting untuk run benchmark; harus diset sebelum app.config di-import."""
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    os.environ.setdefault("LLM_STREAMING", "false")
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["LLM_HEDGE_PERCENTILE"] = str(args.percentile)
+    os.environ["LLM_HEDGE_BUDGET"] = str(args.budget)
+
+
+def install_fake_models(args) -> dict:
+    """Model primer (dan fallback, jika diminta) berupa FakeLLMClient dengan latensi ekor panjang."""
+    from app.llm_client import FakeLLMClient, long_tail_latency, register_llm_client
+
+    clients = {
+        PRIMARY_MODEL: FakeLLMClient(
+            latency=long_tail_latency(args.median, args.sigma, args.tail_rate, args.tail_factor, seed=args.seed),
+            model_name=PRIMARY_MODEL,
+        )
+    }
+    if args.fallback_median:
+        clients[FALLBACK_MODEL] = FakeLLMClient(
+            latency=long_tail_latency(
+                args.fallback_median, args.sigma, args.tail_rate, args.tail_factor, seed=args.seed + 1
+            ),
+            model_name=FALLBACK_MODEL,
+        )
+    for client in clients.values():
+        register_llm_client(client)
+    return clients
+
+
+async def run_mode(args, hedge: bool, clients: dict) -> dict:
+    from app import llm_client
+    from app.config import settings
+
+    settings.LLM_HEDGE_ENABLED = hedge
+    settings.LLM_HEDGE_MODEL = FALLBACK_MODEL if args.fallback_median else ""
+    # Mulai dari nol: riwayat latensi dan budget hedging tidak terbawa antar mode.
+    llm_client._latencies = llm_client.LatencyTracker()
+    llm_client._hedge_budget = None
+    calls_before = sum(client.calls for client in clients.values())
+
+    samples = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await llm_client.llm_call_async(f"hedging benchmark {hedge} {index}", model_name=PRIMARY_MODEL)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    calls = sum(client.calls for client in clients.values()) - calls_before
+    return {
+        "latency": percentiles(samples),
+        "seconds": elapsed,
+        "llm_calls": calls,
+        "extra_calls_ratio": calls / args.requests - 1,
+    }
+
+
+def main():
+    """Membandingkan latensi panggilan LLM tanpa dan dengan hedging (LLM palsu berekor panjang)."""
+    parser = argparse.ArgumentParser(description="LLM request hedging benchmark.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median", type=float, default=0.2, help="Median latensi model primer (detik)")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Sigma lognormal latensi")
+    parser.add_argument("--tail-rate", type=float, default=0.02, help="Peluang request macet")
+    parser.add_argument("--tail-factor", type=float, default=10.0, help="Kelipatan latensi request macet")
+    parser.add_argument("--fallback-median", type=float, default=0.0, help="Median model fallback (0 = model sama)")
+    parser.add_argument("--percentile", type=float, default=95.0, help="LLM_HEDGE_PERCENTILE")
+    parser.add_argument("--budget", type=float, default=0.05, help="LLM_HEDGE_BUDGET")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Simpan hasil sebagai JSON ke path ini")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    clients = install_fake_models(args)
+
+    report = {"config": vars(args), "modes": {}}
+    for name, hedge in (("baseline", False), ("hedged", True)):
+        result = asyncio.run(run_mode(args, hedge, clients))
+        report["modes"][name] = result
+        print(format_stats(name, result["latency"]), f"extra_calls={result['extra_calls_ratio']:.1%}")
+
+    baseline_p99 = report["modes"]["baseline"]["latency"]["p99"]
+    hedged_p99 = report["modes"]["hedged"]["latency"]["p99"]
+    report["p99_reduction"] = 1 - hedged_p99 / baseline_p99 if baseline_p99 else 0.0
+    print(f"p99 reduction: {report['p99_reduction']:.1%}")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import format_stats, make_pdf, peak_rss_mb, percentiles, write_report
+
+
+def timeit(fn, repeat: int, warmup: int = 1) -> dict:
+    """Menjalankan `fn` `repeat` kali (setelah `warmup` kali) dan mengembalikan statistik latensi."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def bench_parse_pdf(page_counts, repeat: int) -> dict:
+    """parse_pdf tanpa cache (parsing penuh) dan dengan cache (hash + lookup)."""
+    from app.ai_utils import parse_pdf
+    from app.pdf_parser import extract_text
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="cv-eval-bench-")
+    for pages in page_counts:
+        path = os.path.join(workdir, f"synthetic_{pages}.pdf")
+        with open(path, "wb") as f:
+            f.write(make_pdf(pages, seed=pages))
+        results[f"extract_text[{pages}p]"] = timeit(lambda: extract_text(path), repeat)
+        # Panggilan warmup pertama mengisi cache teks; sisanya adalah cache hit.
+        results[f"parse_pdf_cached[{pages}p]"] = timeit(lambda: parse_pdf(path), repeat)
+    return results
+
+
+def bench_similar_context(sizes, repeat: int) -> dict:
+    """
+    _find_similar_context terhadap index acak berukuran N. Embedding query
+    di-cache (LRU) setelah panggilan pertama, jadi angka ini terutama biaya
+    pencarian di matriks. 1M vektor x 384 dimensi butuh ~1.5 GB RAM.
+    """
+    import numpy as np
+
+    from app import ai_utils
+    from app.embeddings import embedding_dim
+    from app.vector_store import VectorStore
+
+    dim = embedding_dim()
+    rng = np.random.default_rng(0)
+    results = {}
+    original = ai_utils.VECTOR_STORE
+    try:
+        for size in sizes:
+            matrix = rng.standard_normal((size, dim), dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+            texts = [f"chunk {i}" for i in range(size)]
+            ai_utils.VECTOR_STORE = VectorStore(matrix, texts, [{} for _ in range(size)])
+            results[f"find_similar_context[{size}]"] = timeit(
+                lambda: ai_utils._find_similar_context("Backend Engineer requirements"), repeat
+            )
+            del matrix, texts
+            ai_utils.VECTOR_STORE = None
+    finally:
+        ai_utils.VECTOR_STORE = original
+    return results
+
+
+def bench_llm_json(repeat: int) -> dict:
+    """Penanganan JSON respons LLM: parse_json_response dan round-trip llm_call (LLM palsu, tanpa jeda)."""
+    from app.llm_client import FakeLLMClient, llm_call_sync, parse_json_response, set_llm_client
+
+    small = json.dumps(FakeLLMClient.DEFAULT_RESPONSE)
+    large = json.dumps({**FakeLLMClient.DEFAULT_RESPONSE, "cv_feedback": "detail " * 2000})
+    fenced = f"```json\n{large}\n```"
+
+    results = {
+        "parse_json_response[small]": timeit(lambda: parse_json_response(small), repeat),
+        "parse_json_response[large_fenced]": timeit(lambda: parse_json_response(fenced), repeat),
+    }
+    set_llm_client(FakeLLMClient(responder=lambda prompt: fenced))
+    try:
+        results["llm_call[uncached]"] = timeit(lambda: llm_call_sync("benchmark prompt", use_cache=False), repeat)
+    finally:
+        set_llm_client(None)
+    return results
+
+
+def main():
+    """Micro-benchmark parse_pdf, _find_similar_context, dan penanganan JSON llm_call."""
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the evaluation pipeline.")
+    parser.add_argument("--only", choices=["pdf", "retrieval", "llm"], action="append", help="Jalankan sebagian saja")
+    parser.add_argument("--pages", default="1,10,50", help="Jumlah halaman PDF sintetis")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Ukuran index untuk retrieval")
+    parser.add_argument("--repeat", type=int, default=20, help="Jumlah pengulangan per kasus")
+    parser.add_argument("--json", help="Simpan hasil sebagai JSON ke path ini")
+    args = parser.parse_args()
+
+    # Cache LLM dan job store tidak ikut diukur.
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    os.environ.setdefault("JOB_STORE_URL", "memory://")
+    selected = set(args.only or ["pdf", "retrieval", "llm"])
+
+    results = {}
+    if "pdf" in selected:
+        results.update(bench_parse_pdf([int(p) for p in args.pages.split(",")], args.repeat))
+    if "retrieval" in selected:
+        results.update(bench_similar_context([int(s) for s in args.sizes.split(",")], args.repeat))
+    if "llm" in selected:
+        results.update(bench_llm_json(args.repeat))
+
+    for name, stats in results.items():
+        print(format_stats(name, stats))
+    rss = peak_rss_mb()
+    print(f"peak RSS: {rss['self']:.1f} MB")
+    if args.json:
+        write_report(args.json, {"config": vars(args), "results": results, "peak_rss_mb": rss})
+
+
+if __name__ == "__main__":
+    main()
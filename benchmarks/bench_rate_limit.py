@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import format_stats, percentiles, write_report
+
+
+def configure_environment(args) -> None:
+    """Setting untuk run benchmark; harus diset sebelum app.config di-import."""
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    os.environ.setdefault("LLM_STREAMING", "false")
+    os.environ.setdefault("LLM_RETRY_MIN_WAIT", "0.05")
+    os.environ.setdefault("LLM_RETRY_MAX_WAIT", "0.5")
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    os.environ["LLM_CIRCUIT_RESET_SECONDS"] = str(args.circuit_reset)
+
+
+async def run_mode(args, adaptive: bool) -> dict:
+    from app import llm_client, llm_limiter
+    from app.config import settings
+    from app.llm_client import FakeLLMClient, set_llm_client
+
+    settings.LLM_ADAPTIVE_CONCURRENCY = adaptive
+    # Limiter dan breaker dibuat ulang dengan setting mode ini.
+    llm_limiter._limiter = None
+    llm_limiter._breaker = None
+    client = FakeLLMClient(latency=args.latency, capacity=args.capacity)
+    set_llm_client(client)
+
+    samples = []
+    errors: dict = {}
+    limits = []
+
+    async def one(index: int) -> None:
+        started = time.perf_counter()
+        try:
+            await llm_client.llm_call_async(f"rate limit benchmark {adaptive} {index}")
+            samples.append(time.perf_counter() - started)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    async def sample_limit(stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            state = llm_limiter.snapshot()["concurrency"]
+            if state:
+                limits.append(state["limit"])
+            await asyncio.sleep(0.05)
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_limit(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    set_llm_client(None)
+    return {
+        "latency": percentiles(samples),
+        "seconds": elapsed,
+        "completed": len(samples),
+        "errors": errors,
+        "throughput_per_second": len(samples) / elapsed if elapsed else 0.0,
+        "rate_limited_calls": client.rate_limited,
+        "mean_limit": sum(limits) / len(limits) if limits else None,
+    }
+
+
+def main():
+    """Concurrency tetap vs AIMD terhadap provider palsu yang hanya sanggup `capacity` request bersamaan."""
+    parser = argparse.ArgumentParser(description="LLM adaptive concurrency benchmark.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--capacity", type=int, default=6, help="Request bersamaan yang diterima provider palsu")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--latency", type=float, default=0.1, help="Latensi provider palsu (detik)")
+    parser.add_argument("--circuit-reset", type=float, default=2.0, help="LLM_CIRCUIT_RESET_SECONDS")
+    parser.add_argument("--json", help="Simpan hasil sebagai JSON ke path ini")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    report = {"config": vars(args), "modes": {}}
+    for name, adaptive in (("fixed", False), ("adaptive", True)):
+        result = asyncio.run(run_mode(args, adaptive))
+        report["modes"][name] = result
+        print(
+            format_stats(name, result["latency"]),
+            f"completed={result['completed']}/{args.requests} errors={result['errors']} "
+            f"throughput={result['throughput_per_second']:.1f}/s 429s={result['rate_limited_calls']} "
+            f"mean_limit={result['mean_limit'] or 0:.1f}",
+        )
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.common import format_stats, peak_rss_mb, percentiles, write_report
+
+# Jumlah partisi `source_file` sintetis; query terfilter memakai dua di antaranya
+# (seperti CV_CONTEXT_SOURCES / PROJECT_CONTEXT_SOURCES).
+N_SOURCES = 8
+FILTER_SOURCES = ("source_0.pdf", "source_1.pdf")
+
+
+def make_store(size: int, dim: int, seed: int = 0):
+    """
+    Index sintetis yang menyerupai embedding asli: vektor berkelompok di sekitar
+    beberapa ratus topik (vektor acak murni tidak punya struktur tetangga).
+    """
+    from app.vector_store import VectorStore
+
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(16, size // 500), dim), dtype=np.float32)
+    assign = rng.integers(0, topics.shape[0], size)
+    matrix = topics[assign] + 0.6 * rng.standard_normal((size, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    metadatas = [{"source_file": f"source_{i % N_SOURCES}.pdf"} for i in range(size)]
+    queries = topics[rng.integers(0, topics.shape[0], 200)] + 0.6 * rng.standard_normal((200, dim), dtype=np.float32)
+    return VectorStore(matrix, [f"chunk {i}" for i in range(size)], metadatas), queries
+
+
+def run_queries(retriever, queries, top_k: int, sources) -> tuple:
+    """Menjalankan semua query; mengembalikan (statistik latensi, daftar teks hasil per query)."""
+    samples, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = retriever.search(query, top_k, sources)
+        samples.append(time.perf_counter() - started)
+        results.append({hit.text for hit in hits})
+    return percentiles(samples), results
+
+
+def recall(results, truth) -> float:
+    """Rata-rata recall@k terhadap hasil pencarian eksak."""
+    return float(np.mean([len(got & want) / len(want) for got, want in zip(results, truth) if want]))
+
+
+def bench_size(size: int, dim: int, top_k: int, probes, lists: int) -> dict:
+    from app.retriever import ExactRetriever, IVFRetriever
+
+    store, queries = make_store(size, dim)
+    report = {}
+    started = time.perf_counter()
+    exact = ExactRetriever(store)
+    report["build_seconds[exact]"] = time.perf_counter() - started
+    started = time.perf_counter()
+    ivf = IVFRetriever(store, n_lists=lists)
+    report["build_seconds[ivf]"] = time.perf_counter() - started
+    report["ivf_lists"] = ivf.n_lists
+
+    for label, sources in (("all", None), ("filtered", FILTER_SOURCES)):
+        stats, truth = run_queries(exact, queries, top_k, sources)
+        report[f"exact[{label}]"] = {**stats, "recall": 1.0}
+        for n_probe in probes:
+            ivf.n_probe = n_probe
+            stats, results = run_queries(ivf, queries, top_k, sources)
+            report[f"ivf[{label},nprobe={n_probe}]"] = {**stats, "recall": recall(results, truth)}
+    return report
+
+
+def main():
+    """Recall@k vs latensi backend IVF dibanding pencarian eksak, dengan dan tanpa filter partisi."""
+    parser = argparse.ArgumentParser(description="Recall-versus-latency benchmark for retriever backends.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Ukuran index")
+    parser.add_argument("--dim", type=int, default=384, help="Dimensi embedding")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--probes", default="1,4,8,16,32", help="Nilai n_probe IVF yang diuji")
+    parser.add_argument("--lists", type=int, default=0, help="Jumlah kelompok IVF (0 = otomatis)")
+    parser.add_argument("--json", help="Simpan hasil sebagai JSON ke path ini")
+    args = parser.parse_args()
+
+    probes = [int(p) for p in args.probes.split(",")]
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        report = bench_size(size, args.dim, args.top_k, probes, args.lists)
+        results[str(size)] = report
+        print(
+            f"N={size}: build exact {report['build_seconds[exact]']:.2f}s, "
+            f"ivf {report['build_seconds[ivf]']:.2f}s ({report['ivf_lists']} lists)"
+        )
+        for name, stats in report.items():
+            if isinstance(stats, dict):
+                print(f"{format_stats(name, stats)}  recall@{args.top_k} {stats['recall']:.3f}")
+    rss = peak_rss_mb()
+    print(f"peak RSS: {rss['self']:.1f} MB")
+    if args.json:
+        write_report(args.json, {"config": vars(args), "results": results, "peak_rss_mb": rss})
+
+
+if __name__ == "__main__":
+    main()
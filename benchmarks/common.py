@@ -0,0 +1,117 @@
+# /benchmarks/common.py
+
+import json
+import os
+import random
+import resource
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Kosakata untuk teks sintetis: cukup mirip CV/laporan supaya retrieval dan
+# ukuran prompt realistis, tetapi deterministik untuk seed yang sama.
+_WORDS = (
+    "backend engineer python fastapi django postgres redis kafka docker kubernetes aws gcp "
+    "microservices rest api grpc latency throughput testing ci cd observability prometheus "
+    "designed implemented migrated scaled reduced improved led mentored team project users "
+    "requests database queue cache retrieval embedding llm prompt evaluation pipeline report "
+    "architecture deployment monitoring security authentication performance reliability"
+).split()
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int, words_per_page: int = 400, seed: int = 0) -> bytes:
+    """
+    Membuat PDF teks sederhana (Helvetica, tanpa dependensi tambahan) dengan
+    `pages` halaman. Isi berbeda untuk setiap seed, sehingga dedup upload dan
+    cache teks PDF tidak mengaburkan hasil benchmark.
+    """
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    catalog = add(b"")  # diisi setelah /Pages diketahui
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page in range(pages):
+        words = [rng.choice(_WORDS) for _ in range(words_per_page)]
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td ({}) Tj T* ".format(_pdf_escape(f"Page {page + 1} seed {seed}"))
+        stream += "".join(f"({_pdf_escape(line)}) Tj T* " for line in lines) + "ET"
+        data = stream.encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % p for p in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 (nearest-rank), min, max dan mean dalam satuan input."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak RSS proses ini dan child process yang sudah selesai (mis. pool parsing PDF)."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss: byte di macOS, KiB di Linux
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def format_stats(name: str, stats: Dict[str, float], unit: str = "ms", scale: float = 1000.0) -> str:
+    if not stats:
+        return f"{name}: no samples"
+    return (
+        f"{name}: n={stats['count']} p50={stats['p50'] * scale:.2f}{unit} p95={stats['p95'] * scale:.2f}{unit} "
+        f"p99={stats['p99'] * scale:.2f}{unit} max={stats['max'] * scale:.2f}{unit}"
+    )
+
+
+def write_report(path: str, report: dict) -> None:
+    """Menyimpan hasil benchmark sebagai JSON (untuk dibandingkan antar commit)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import metrics
+from app.pipeline import run_graph
+from app.tasks import RESULT_STAGES, build_evaluation_graph
+
+MODES = ("three_call", "single")
+
+# Selisih skor yang masih dianggap "sepakat" antar mode.
+CV_MATCH_TOLERANCE = 0.1
+PROJECT_SCORE_TOLERANCE = 0.5
+
+
+def load_samples(path: str) -> list[dict]:
+    """
+    Sample set berupa JSON: list of {"cv": path, "report": path, "job_title": str}.
+    Path relatif dihitung dari lokasi file JSON.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for sample in samples:
+        sample["cv"] = os.path.join(base, sample["cv"])
+        sample["report"] = os.path.join(base, sample["report"])
+    return samples
+
+
+async def evaluate(sample: dict, mode: str) -> dict:
+    """Menjalankan satu mode tanpa job store; cache LLM dilewati agar latensi nyata."""
+    timings = metrics.begin_job_timings()
+    started = time.perf_counter()
+    stages = build_evaluation_graph(sample["cv"], sample["report"], sample["job_title"], use_cache=False, mode=mode)
+    results = await run_graph(stages)
+    elapsed = time.perf_counter() - started
+    metrics.finish_job_timings(timings, "completed")
+
+    result = {}
+    for name in RESULT_STAGES:
+        result.update(results.get(name, {}))
+    prompt_chars = sum(call["prompt_chars"] for call in timings["llm_calls"])
+    return {"seconds": elapsed, "llm_calls": len(timings["llm_calls"]), "prompt_chars": prompt_chars, "result": result}
+
+
+def summarize(runs: dict) -> dict:
+    report = {"modes": {}, "agreement": {}}
+    for mode, samples in runs.items():
+        seconds = [r["seconds"] for r in samples]
+        report["modes"][mode] = {
+            "mean_seconds": statistics.mean(seconds),
+            "median_seconds": statistics.median(seconds),
+            "max_seconds": max(seconds),
+            "llm_calls_per_job": statistics.mean(r["llm_calls"] for r in samples),
+            "prompt_chars_per_job": statistics.mean(r["prompt_chars"] for r in samples),
+        }
+
+    pairs = list(zip(runs["three_call"], runs["single"]))
+    cv_diffs = [abs(a["result"]["cv_match_rate"] - b["result"]["cv_match_rate"]) for a, b in pairs]
+    project_diffs = [abs(a["result"]["project_score"] - b["result"]["project_score"]) for a, b in pairs]
+    report["agreement"] = {
+        "samples": len(pairs),
+        "cv_match_rate_mean_abs_diff": statistics.mean(cv_diffs),
+        "cv_match_rate_within_tolerance": sum(d <= CV_MATCH_TOLERANCE for d in cv_diffs) / len(pairs),
+        "project_score_mean_abs_diff": statistics.mean(project_diffs),
+        "project_score_within_tolerance": sum(d <= PROJECT_SCORE_TOLERANCE for d in project_diffs) / len(pairs),
+    }
+    return report
+
+
+async def compare(samples: list[dict], repeats: int) -> dict:
+    runs = {mode: [] for mode in MODES}
+    for index, sample in enumerate(samples):
+        for _ in range(repeats):
+            # Urutan mode bergantian supaya efek warmup/rate limit tidak berat sebelah.
+            modes = MODES if index % 2 == 0 else MODES[::-1]
+            for mode in modes:
+                run = await evaluate(sample, mode)
+                runs[mode].append({**run, "sample": index})
+                print(f"sample {index} [{mode}]: {run['seconds']:.2f}s, {run['llm_calls']} LLM calls")
+    for mode in MODES:
+        runs[mode].sort(key=lambda r: r["sample"])
+    return {"summary": summarize(runs), "runs": runs}
+
+
+def main():
+    """Membandingkan latensi dan kesepakatan skor mode evaluasi "three_call" vs "single"."""
+    parser = argparse.ArgumentParser(description="Compare single-call and three-call evaluation modes.")
+    parser.add_argument("samples", help="File JSON sample set (list of {cv, report, job_title})")
+    parser.add_argument("--repeats", type=int, default=1, help="Pengulangan per sample per mode")
+    parser.add_argument("--json", help="Simpan hasil lengkap sebagai JSON ke path ini")
+    args = parser.parse_args()
+
+    output = asyncio.run(compare(load_samples(args.samples), args.repeats))
+    summary = output["summary"]
+    for mode, stats in summary["modes"].items():
+        print(
+            f"{mode:>10}: mean {stats['mean_seconds']:.2f}s, median {stats['median_seconds']:.2f}s, "
+            f"max {stats['max_seconds']:.2f}s, {stats['llm_calls_per_job']:.1f} LLM calls/job, "
+            f"{stats['prompt_chars_per_job']:.0f} prompt chars/job"
+        )
+    agreement = summary["agreement"]
+    print(
+        f"agreement over {agreement['samples']} runs: "
+        f"cv_match_rate |diff| {agreement['cv_match_rate_mean_abs_diff']:.3f} "
+        f"({agreement['cv_match_rate_within_tolerance']:.0%} within {CV_MATCH_TOLERANCE}), "
+        f"project_score |diff| {agreement['project_score_mean_abs_diff']:.2f} "
+        f"({agreement['project_score_within_tolerance']:.0%} within {PROJECT_SCORE_TOLERANCE})"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.vector_store import convert_json
+
+# --- Konfigurasi ---
+DEFAULT_JSON_PATH = "app/vectors.json"
+DEFAULT_INDEX_PATH = "app/vector_index"
+
+
+def main():
+    """Konversi vector.json ke index biner (.npy + .meta.json) yang dipakai app/ai_utils."""
+    parser = argparse.ArgumentParser(description="Convert vector.json to a memory-mappable vector index.")
+    parser.add_argument("--json", default=DEFAULT_JSON_PATH, help="Path ke vector.json sumber")
+    parser.add_argument("--out", default=DEFAULT_INDEX_PATH, help="Prefix output (tanpa ekstensi)")
+    parser.add_argument(
+        "--reembed",
+        action="store_true",
+        help="Embed ulang teks dengan EMBEDDING_MODEL alih-alih memakai embedding di JSON",
+    )
+    args = parser.parse_args()
+
+    embed_fn = None
+    if args.reembed:
+        from app.embeddings import embed_texts
+        embed_fn = embed_texts
+
+    store = convert_json(args.json, args.out, embed_fn=embed_fn)
+    print(f"Converted {len(store)} vectors (dim={store.dim}) to {args.out}.npy")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,171 @@
+import argparse
+import hashlib
+import json
 import os
+import sys
 import chromadb
+import numpy as np
 from chromadb.utils import embedding_functions
-from pypdf import PdfReader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.chunking import chunk_by_tokens
+from app.config import settings
+from app.embeddings import embed_texts, get_embedder
+from app.pdf_parser import iter_page_texts
+from app.retrieval_cache import MANIFEST_NAME
+from app.vector_store import VectorStore
 
 # --- Konfigurasi ---
 GROUND_TRUTH_PATH = "ground_truth_docs"
 CHROMA_PATH = "chroma_db_storage"
 COLLECTION_NAME = "job_screening_docs"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2" # Model embedding yang efisien
-
-# Inisialisasi embedding function
-# mengunduh model saat pertama kali dijalankan
-sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name=EMBEDDING_MODEL
-)
-
-# Inisialisasi ChromaDB Client
-# menyimpan data di disk pada folder CHROMA_PATH
-client = chromadb.PersistentClient(path=CHROMA_PATH)
-
-# Dapatkan atau buat collection baru
-collection = client.get_or_create_collection(
-    name=COLLECTION_NAME,
-    embedding_function=sentence_transformer_ef,
-    metadata={"hnsw:space": "cosine"} # Menggunakan cosine similarity
-)
-
-def ingest_documents():
+EMBEDDING_MODEL = settings.EMBEDDING_MODEL # Model embedding yang efisien (all-MiniLM-L6-v2)
+MANIFEST_PATH = os.path.join(CHROMA_PATH, MANIFEST_NAME) # `version` dibaca cache retrieval di api/ai_utils.py
+SNAPSHOT_PATH = "app/vector_index" # Snapshot .npy + .meta.json yang dibaca app/ai_utils.py
+
+CHUNK_TOKENS = 200  # MiniLM memotong input di 256 token
+CHUNK_OVERLAP = 40
+EMBED_BATCH_SIZE = 64
+
+
+def get_collection():
+    """Membuka (atau membuat) collection ChromaDB di CHROMA_PATH."""
+    # Embedding function dipakai Chroma untuk query_texts di api/ai_utils.py
+    sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=EMBEDDING_MODEL
+    )
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        embedding_function=sentence_transformer_ef,
+        metadata={"hnsw:space": "cosine"} # Menggunakan cosine similarity
+    )
+
+
+def load_manifest() -> dict:
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"version": 0, "files": {}}
+
+
+def save_manifest(manifest: dict):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_chunks(file_path: str, filename: str, content_hash: str):
+    """Memecah setiap halaman menjadi potongan berbasis token (dengan overlap)."""
+    tokenizer = get_embedder().tokenizer
+    documents, metadatas, ids = [], [], []
+    for page_num, text in iter_page_texts(file_path):
+        for chunk_num, chunk in enumerate(chunk_by_tokens(text, tokenizer, CHUNK_TOKENS, CHUNK_OVERLAP)):
+            documents.append(chunk)
+            metadatas.append({
+                "source_file": filename,
+                "page": page_num,
+                "chunk": chunk_num,
+                "content_hash": content_hash,
+            })
+            # ID deterministik: isi file yang sama selalu menghasilkan ID yang sama
+            ids.append(f"{filename}:{content_hash[:12]}:{page_num}:{chunk_num}")
+    return documents, metadatas, ids
+
+
+def add_in_batches(collection, documents, metadatas, ids):
+    """Meng-embed dan menambahkan potongan per batch berukuran EMBED_BATCH_SIZE."""
+    for start in range(0, len(documents), EMBED_BATCH_SIZE):
+        end = start + EMBED_BATCH_SIZE
+        embeddings = embed_texts(documents[start:end], batch_size=EMBED_BATCH_SIZE)
+        collection.upsert(
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+            ids=ids[start:end],
+            embeddings=embeddings.tolist(),
+        )
+
+
+def export_snapshot(collection, out_path: str = SNAPSHOT_PATH):
+    """Menulis seluruh isi collection sebagai snapshot vektor untuk app/ai_utils.py."""
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+    store = VectorStore.from_embeddings(embeddings, data["documents"], data["metadatas"])
+    store.save(out_path)
+    print(f"Exported {len(store)} vectors (dim={store.dim}) to {out_path}.npy")
+
+
+def ingest_documents(force: bool = False):
     """
-    Membaca semua file PDF dari folder ground_truth_docs,
-    memecahnya menjadi potongan teks, dan memasukkannya ke ChromaDB.
+    Ingesti inkremental: hanya file PDF yang isinya berubah (berdasarkan SHA-256
+    di manifest) yang di-chunk dan di-embed ulang. Potongan lama dari file yang
+    berubah atau sudah dihapus ikut dihapus dari collection.
     """
     print("Starting document ingestion...")
-    documents = []
-    metadatas = []
-    ids = []
-    doc_id_counter = 1
-
-    for filename in os.listdir(GROUND_TRUTH_PATH):
-        if filename.endswith(".pdf"):
-            file_path = os.path.join(GROUND_TRUTH_PATH, filename)
-            print(f"Processing {filename}...")
-
-            try:
-                reader = PdfReader(file_path)
-                for page_num, page in enumerate(reader.pages):
-                    text = page.extract_text()
-                    if text:
-                        # Di sini menggunakan satu halaman sebagai satu dokumen
-                        # Untuk teks yang sangat panjang, bisa dipecah lebih lanjut
-                        documents.append(text)
-                        metadatas.append({
-                            "source_file": filename,
-                            "page": page_num + 1
-                        })
-                        ids.append(f"doc_{doc_id_counter}")
-                        doc_id_counter += 1
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
-
-    if documents:
-        print(f"Adding {len(documents)} document chunks to the collection...")
-        collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+    collection = get_collection()
+    manifest = load_manifest()
+    files = manifest["files"]
+    changed = False
+
+    present = sorted(f for f in os.listdir(GROUND_TRUTH_PATH) if f.endswith(".pdf"))
+
+    for filename in sorted(set(files) - set(present)):
+        print(f"Removing chunks of deleted file {filename}...")
+        collection.delete(where={"source_file": filename})
+        del files[filename]
+        changed = True
+
+    for filename in present:
+        file_path = os.path.join(GROUND_TRUTH_PATH, filename)
+        content_hash = file_sha256(file_path)
+        entry = files.get(filename)
+        if not force and entry and entry["sha256"] == content_hash:
+            print(f"Skipping {filename} (unchanged)")
+            continue
+
+        print(f"Processing {filename}...")
+        try:
+            documents, metadatas, ids = build_chunks(file_path, filename, content_hash)
+        except Exception as e:
+            print(f"Error reading {filename}: {e}")
+            continue
+
+        # Hapus potongan versi lama sebelum menambahkan yang baru
+        collection.delete(where={"source_file": filename})
+        if documents:
+            print(f"Adding {len(documents)} chunks from {filename}...")
+            add_in_batches(collection, documents, metadatas, ids)
+        files[filename] = {"sha256": content_hash, "chunks": len(documents)}
+        changed = True
+
+    if changed or not os.path.exists(SNAPSHOT_PATH + ".npy"):
+        manifest["version"] = manifest.get("version", 0) + (1 if changed else 0)
+        manifest["embedding_model"] = EMBEDDING_MODEL
+        save_manifest(manifest)
+        export_snapshot(collection)
         print("Ingestion complete!")
     else:
-        print("No documents found to ingest.")
+        print("No changes to ingest.")
+
 
 if __name__ == "__main__":
-    ingest_documents()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Incrementally ingest ground truth documents.")
+    parser.add_argument("--force", action="store_true", help="Re-embed semua file meskipun tidak berubah")
+    parser.add_argument("--export-only", action="store_true", help="Hanya tulis ulang snapshot vektor")
+    args = parser.parse_args()
+
+    if args.export_only:
+        export_snapshot(get_collection())
+    else:
+        ingest_documents(force=args.force)
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dijalankan di proses Python baru supaya setiap pengukuran benar-benar cold.
+CHILD_CODE = """
+import json, time
+t0 = time.perf_counter()
+import {module}
+t_import = time.perf_counter() - t0
+timings = {{}}
+if {warm}:
+    import app.tasks  # mendaftarkan resource lazy milik pipeline
+    {extra_import}
+    from app import warmup
+    timings = warmup.warmup()
+print(json.dumps({{"import": t_import, "warmup": timings, "total": time.perf_counter() - t0}}))
+"""
+
+
+def measure_once(module: str, warm: bool, with_chroma: bool) -> dict:
+    code = CHILD_CODE.format(
+        module=module, warm=warm, extra_import="import api.ai_utils" if with_chroma else "pass"
+    )
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    # Termasuk start-up interpreter, seperti yang dialami platform serverless.
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    """Mengukur waktu import-to-ready: import modul app, lalu (opsional) warmup semua resource lazy."""
+    parser = argparse.ArgumentParser(description="Measure cold import-to-ready time.")
+    parser.add_argument("--module", default="app.main", help="Modul entrypoint yang di-import")
+    parser.add_argument("--runs", type=int, default=5, help="Jumlah proses cold yang diukur")
+    parser.add_argument("--no-warmup", action="store_true", help="Hanya ukur import (resource tetap lazy)")
+    parser.add_argument("--chroma", action="store_true", help="Ikut buka collection Chroma (api/ai_utils)")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.module, not args.no_warmup, args.chroma) for _ in range(args.runs)]
+    for key in ("import", "total", "process"):
+        values = [r[key] for r in runs]
+        print(f"{key:>8}: median {statistics.median(values):.3f}s  min {min(values):.3f}s  max {max(values):.3f}s")
+    for name in runs[0]["warmup"]:
+        values = [r["warmup"].get(name, 0.0) for r in runs]
+        print(f"{name:>20}: median {statistics.median(values):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import pytest
+
+from app import job_store, llm_client, tasks
+from app.config import settings
+from app.document_store import DocumentStore
+from app.job_store import MemoryBackend
+
+
+@pytest.fixture
+def memory_store():
+    """Job store memory:// baru untuk setiap test (backend global dikembalikan setelahnya)."""
+    previous = job_store._backend
+    backend = MemoryBackend(ttl_seconds=3600, max_finished=1000)
+    job_store.set_backend(backend)
+    yield backend
+    job_store.set_backend(previous)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """FakeLLMClient untuk semua model, tanpa cache LLM dan tanpa hedging."""
+    client = llm_client.FakeLLMClient()
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", False)
+    llm_client.set_llm_client(client)
+    yield client
+    llm_client.set_llm_client(None)
+
+
+@pytest.fixture
+def fake_documents(monkeypatch):
+    """Parsing PDF dan retrieval konteks diganti teks tetap (tanpa PDF dan vector index)."""
+
+    async def parse_pdf_async(path):
+        return f"text of {path}"
+
+    monkeypatch.setattr(tasks, "parse_pdf_async", parse_pdf_async)
+    monkeypatch.setattr(tasks, "get_cv_context", lambda job_title: f"context for {job_title}")
+    monkeypatch.setattr(tasks, "get_project_context", lambda: "project context")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(str(tmp_path / "documents"), ttl_seconds=3600, max_bytes=0)
@@ -0,0 +1,77 @@
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+
+EMPTY_QUEUE = {"workers": 4, "running": 0, "queued": 0, "queue_size": 100, "accepting": True}
+
+
+def make_controller(per_client_max: int = 4) -> AdmissionController:
+    return AdmissionController(max_queue_wait=120, default_service_seconds=30, per_client_max=per_client_max)
+
+
+def test_batch_larger_than_quota_is_admitted_with_capped_weight():
+    controller = make_controller(per_client_max=4)
+    for candidates in (5, 50, 101):
+        weight = controller.batch_weight(candidates, max_parallel=8)
+        assert weight == 4
+        controller.admit(f"batch-{candidates}", f"client-{candidates}", EMPTY_QUEUE, cost=weight)
+
+
+def test_batch_waits_for_other_jobs_of_the_same_client():
+    controller = make_controller(per_client_max=4)
+    controller.admit("job-1", "client", EMPTY_QUEUE)
+    weight = controller.batch_weight(50, max_parallel=8)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("batch", "client", EMPTY_QUEUE, cost=weight)
+    assert rejected.value.reason == "client_quota"
+    assert rejected.value.retryable
+    controller.release("job-1")
+    controller.admit("batch", "client", EMPTY_QUEUE, cost=weight)
+
+
+def test_small_batch_weighs_its_candidate_count():
+    controller = make_controller(per_client_max=4)
+    controller.admit("batch", "client", EMPTY_QUEUE, cost=controller.batch_weight(2, max_parallel=8))
+    controller.admit("job-1", "client", EMPTY_QUEUE)
+    controller.admit("job-2", "client", EMPTY_QUEUE)
+    with pytest.raises(AdmissionRejected):
+        controller.admit("job-3", "client", EMPTY_QUEUE)
+
+
+def test_cost_that_can_never_fit_is_not_retryable():
+    controller = make_controller(per_client_max=4)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("job", "client", EMPTY_QUEUE, cost=5)
+    assert rejected.value.reason == "too_large"
+    assert not rejected.value.retryable
+
+
+def test_batch_takes_one_queue_slot():
+    controller = make_controller(per_client_max=0)
+    nearly_full = dict(EMPTY_QUEUE, queued=99, workers=100)
+    controller.admit("batch", "client", nearly_full, cost=8, queue_slots=1)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("other", "client", dict(nearly_full, queued=100))
+    assert rejected.value.reason == "queue_full"
+
+
+def test_overload_rejection_carries_retry_after():
+    controller = make_controller(per_client_max=0)
+    busy = dict(EMPTY_QUEUE, queued=40, running=4)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("job", "client", busy)
+    assert rejected.value.reason == "overloaded"
+    assert rejected.value.retry_after >= 1
+
+
+def test_jobs_finished_elsewhere_are_pruned_outside_admit():
+    finished = set()
+    controller = AdmissionController(
+        max_queue_wait=120, default_service_seconds=30, per_client_max=1, is_finished=finished.__contains__
+    )
+    controller.admit("job-1", "client", None)
+    finished.add("job-1")
+    with pytest.raises(AdmissionRejected):
+        controller.admit("job-2", "client", None)  # admit() sendiri tidak membaca job store
+    controller.prune_finished("client")
+    controller.admit("job-2", "client", None)
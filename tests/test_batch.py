@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app import job_store, tasks
+from app.tasks import process_batch
+
+
+def create_batch(size: int):
+    job_store.create_job("batch", task={"type": "batch", "args": {}})
+    candidates = [(f"candidate-{i}", f"cv-{i}.pdf", f"report-{i}.pdf") for i in range(size)]
+    for job_id, _, _ in candidates:
+        job_store.create_job(job_id, batch_id="batch")
+    return candidates
+
+
+@pytest.mark.usefixtures("memory_store", "fake_documents")
+def test_batch_evaluates_every_candidate(fake_llm):
+    candidates = create_batch(5)
+
+    asyncio.run(process_batch("batch", "Backend Engineer", candidates, use_cache=False, max_parallel=2))
+
+    batch = job_store.get_job_status("batch")
+    assert batch["status"] == "completed"
+    assert batch["progress"] == {"total": 5, "queued": 0, "processing": 0, "completed": 5, "failed": 0}
+    for job_id, _, _ in candidates:
+        job = job_store.get_job_status(job_id)
+        assert job["status"] == "completed"
+        assert job["result"]["cv_match_rate"] == fake_llm.DEFAULT_RESPONSE["cv_match_rate"]
+        assert job["result"]["overall_summary"] == fake_llm.DEFAULT_RESPONSE["overall_summary"]
+
+
+@pytest.mark.usefixtures("memory_store", "fake_documents", "fake_llm")
+def test_failed_candidate_does_not_fail_the_batch(monkeypatch):
+    async def parse_pdf_async(path):
+        return "" if path == "cv-1.pdf" else f"text of {path}"
+
+    monkeypatch.setattr(tasks, "parse_pdf_async", parse_pdf_async)
+    candidates = create_batch(3)
+
+    asyncio.run(process_batch("batch", "Backend Engineer", candidates, use_cache=False))
+
+    batch = job_store.get_job_status("batch")
+    assert batch["status"] == "completed"
+    assert batch["progress"]["completed"] == 2
+    assert batch["progress"]["failed"] == 1
+    assert job_store.get_job_status("candidate-1")["status"] == "failed"
+
+
+@pytest.mark.usefixtures("memory_store", "fake_documents")
+def test_cancelled_batch_is_requeued_and_resumes(fake_llm):
+    candidates = create_batch(4)
+
+    async def cancel_midway():
+        fake_llm.latency = 0.2
+        task = asyncio.create_task(
+            process_batch("batch", "Backend Engineer", candidates, use_cache=False, max_parallel=2)
+        )
+        while job_store.get_job_status("candidate-0")["status"] != "completed":
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+
+    batch = job_store.get_job_status("batch")
+    assert batch["status"] == "queued"
+    statuses = {job_id: job_store.get_job_status(job_id)["status"] for job_id, _, _ in candidates}
+    assert "processing" not in statuses.values()
+    finished = [job_id for job_id, status in statuses.items() if status == "completed"]
+    assert batch["progress"]["completed"] == len(finished)
+
+    # Dijalankan ulang (seperti oleh recover()): kandidat yang sudah selesai dilewati.
+    fake_llm.latency = 0.0
+    calls_before = fake_llm.calls
+    asyncio.run(process_batch("batch", "Backend Engineer", candidates, use_cache=False, max_parallel=2))
+
+    batch = job_store.get_job_status("batch")
+    assert batch["status"] == "completed"
+    assert batch["progress"]["completed"] == 4
+    assert fake_llm.calls - calls_before == 3 * (4 - len(finished))
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+from app import document_store
+
+
+def put_document(store, data: bytes) -> str:
+    tmp_path = store.new_tmp_path()
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    return store.put(tmp_path, hashlib.sha256(data).hexdigest(), "cv.pdf")
+
+
+def age(path: str, seconds: float) -> None:
+    meta = os.path.join(os.path.dirname(path), document_store.META_NAME)
+    past = os.path.getmtime(meta) - seconds
+    os.utime(meta, (past, past))
+
+
+def never_active(job_id: str) -> bool:
+    return False
+
+
+def test_reupload_returns_the_same_document(store):
+    first = put_document(store, b"%PDF same")
+    second = put_document(store, b"%PDF same")
+    assert first == second
+    assert os.listdir(os.path.join(store.root, ".tmp")) == []
+
+
+def test_expired_documents_are_collected(store):
+    old = put_document(store, b"%PDF old")
+    fresh = put_document(store, b"%PDF fresh")
+    age(old, store.ttl_seconds + 10)
+
+    summary = store.collect(never_active)
+
+    assert summary["removed"] == {"expired": 1, "over_limit": 0}
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
+
+
+def test_documents_referenced_by_active_jobs_are_kept(store):
+    path = put_document(store, b"%PDF in use")
+    assert document_store.acquire("job-1", path)
+    age(path, store.ttl_seconds + 10)
+
+    store.collect(lambda job_id: job_id == "job-1")
+    assert os.path.exists(path)
+
+    document_store.release("job-1", path)
+    age(path, store.ttl_seconds + 10)
+    store.collect(never_active)
+    assert not os.path.exists(path)
+
+
+def test_stale_reference_of_a_finished_job_is_dropped(store):
+    path = put_document(store, b"%PDF stale ref")
+    assert document_store.acquire("crashed-job", path)
+    ref = os.path.join(os.path.dirname(path), document_store.REFS_DIR, "crashed-job")
+    past = os.path.getmtime(ref) - document_store.LEFTOVER_SECONDS - 10
+    os.utime(ref, (past, past))
+    age(path, store.ttl_seconds + 10)
+
+    store.collect(never_active)
+    assert not os.path.exists(path)
+
+
+def test_document_reuploaded_after_scan_is_not_removed(store):
+    path = put_document(store, b"%PDF race")
+    age(path, store.ttl_seconds + 10)
+    content_hash = document_store.hash_from_path(path)
+    doc_dir = os.path.dirname(path)
+    last_used = os.path.getmtime(os.path.join(doc_dir, document_store.META_NAME))
+
+    # GC sudah memindai dokumen sebagai kedaluwarsa, lalu dokumen di-upload ulang.
+    assert put_document(store, b"%PDF race") == path
+    assert not store._remove(content_hash, doc_dir, last_used)
+    assert os.path.exists(path)
+
+
+def test_least_recently_used_documents_go_first_over_the_size_limit(store):
+    older = put_document(store, b"%PDF older")
+    newer = put_document(store, b"%PDF newer")
+    age(older, 100)
+    store.max_bytes = store.collect(never_active)["bytes"] - 1
+
+    summary = store.collect(never_active)
+    assert summary["removed"] == {"expired": 0, "over_limit": 1}
+    assert not os.path.exists(older)
+    assert os.path.exists(newer)
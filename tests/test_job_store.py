@@ -0,0 +1,66 @@
+from app import job_store
+from app.job_store import MemoryBackend, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def finish(backend, job_id: str) -> None:
+    backend.create_job(job_id, {"status": "queued", "created_at": 0})
+    backend.update_job(job_id, {"status": "completed"})
+
+
+def test_finished_jobs_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_store.time, "time", clock)
+    backend = MemoryBackend(ttl_seconds=60, max_finished=100)
+    finish(backend, "done")
+    backend.create_job("waiting", {"status": "queued", "created_at": 0})
+
+    clock.now += 30
+    backend.create_job("other", {"status": "queued", "created_at": 0})
+    assert backend.get_job("done") is not None
+
+    clock.now += 31
+    backend.create_job("another", {"status": "queued", "created_at": 0})
+    assert backend.get_job("done") is None
+    assert backend.get_job("waiting")["status"] == "queued"  # job yang belum selesai tidak kedaluwarsa
+
+
+def test_finished_jobs_over_the_cap_evict_oldest_first(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_store.time, "time", clock)
+    backend = MemoryBackend(ttl_seconds=0, max_finished=2)
+    for job_id in ("a", "b", "c"):
+        clock.now += 1
+        finish(backend, job_id)
+    assert backend.get_job("a") is None
+    assert backend.get_job("b") is not None
+    assert backend.get_job("c") is not None
+    assert backend.count_jobs() == 2
+
+
+def test_sqlite_finished_jobs_expire_after_ttl(monkeypatch, tmp_path):
+    clock = FakeClock()
+    monkeypatch.setattr(job_store.time, "time", clock)
+    backend = SQLiteBackend(str(tmp_path / "jobs.sqlite3"), ttl_seconds=60, max_finished=100)
+    finish(backend, "done")
+    backend.create_job("waiting", {"status": "queued", "created_at": 0})
+    assert backend.count_jobs() == 2
+
+    clock.now += 61
+    finish(backend, "later")
+    assert backend.get_job("done") is None
+    assert backend.get_job("waiting") is not None
+    assert backend.count_jobs() == 2
+
+
+def test_claim_job_only_succeeds_once(memory_store):
+    job_store.create_job("job", task={"type": "evaluation", "args": {}})
+    assert job_store.claim_job("job")["status"] == "processing"
+    assert job_store.claim_job("job") is None